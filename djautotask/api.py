@@ -1,11 +1,19 @@
+import codecs
+import contextvars
 import datetime
 import decimal
 import json
 import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
 from json import JSONDecodeError
+from urllib.parse import urlsplit
 
 import pytz
 import requests
+from requests.adapters import HTTPAdapter
 from django.apps import apps
 from django.conf import settings
 from django.core.cache import cache
@@ -14,10 +22,30 @@ from django.utils import timezone
 from djautotask.utils import DjautotaskSettings, encode_file_to_base64
 from retrying import retry
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 RETRY_WAIT_EXPONENTIAL_MULTAPPLIER = 1000  # Initial number of milliseconds to
 # wait before retrying a request.
 RETRY_WAIT_EXPONENTIAL_MAX = 10000  # Maximum number of milliseconds to wait
 CACHE_TIMEOUT = 43200
+SESSION_POOL_SIZE = 10  # Connections kept alive per zone
+SESSION_IDLE_TIMEOUT = 300  # Seconds before an unused session is closed
+CONCURRENCY_INITIAL = 4  # Requests allowed in flight per zone at start
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = 16
+CONCURRENCY_LATENCY_TARGET = 5.0  # Seconds; slower responses shrink the limit
+CONCURRENCY_DECREASE_FACTOR = 0.5
+REQUEST_BUDGET_POLL_INTERVAL = 60  # Seconds between ThresholdInformation
+# requests.
+REQUEST_BUDGET_SHARE = 0.8  # Share of the threshold syncs may use
+REQUEST_BUDGET_LOW_PRIORITY_SHARE = 0.5
+REQUEST_BUDGET_MAX_WAIT = 300  # Seconds a sync waits for budget
+THROTTLE_COOLDOWN = 1.0  # Seconds to pause a zone after a 429 without
+# a Retry-After header.
+STREAM_CHUNK_SIZE = 65536  # Bytes read at a time from a streamed page
 AT_URL_KEY = 'url'
 AT_WEB_KEY = 'webUrl'
 FORBIDDEN_ERROR_MESSAGE = \
@@ -28,6 +56,19 @@ NO_RECORD_ERROR_MESSAGE = \
 
 logger = logging.getLogger(__name__)
 
+_sessions = {}
+_sessions_lock = threading.Lock()
+_limiters = {}
+_limiters_lock = threading.Lock()
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'
+_request_priority = contextvars.ContextVar(
+    'djautotask_request_priority', default=PRIORITY_NORMAL)
+
 
 class AutotaskAPIError(Exception):
     """Raise this, not request exceptions."""
@@ -50,6 +91,19 @@ class AutotaskAPIServerError(AutotaskAPIError):
     pass
 
 
+class AutotaskAPIThrottledError(AutotaskAPIClientError):
+    """Autotask rejected the request because of its request throttling."""
+    pass
+
+
+class AutotaskRequestBudgetExceeded(AutotaskAPIError):
+    """
+    The request was not sent because the requests allowed for its priority
+    in the current Autotask threshold timeframe are used up.
+    """
+    pass
+
+
 class AutotaskRecordNotFoundError(AutotaskAPIClientError):
     """The record was not found."""
     pass
@@ -82,6 +136,566 @@ def retry_if_api_error(exception):
     return type(exception) is AutotaskAPIError
 
 
+class PooledSession:
+    """A keep-alive session shared by every client talking to one zone."""
+
+    def __init__(self, pool_size):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.session.close()
+
+
+def _session_key(url):
+    parts = urlsplit(url)
+    return '{}://{}'.format(parts.scheme, parts.netloc)
+
+
+def get_session(url, pool_size=None, idle_timeout=None):
+    """
+    Return the process-wide session for the zone serving the given URL, so
+    connections are reused across requests, pages and synchronizers instead
+    of paying a TCP and TLS handshake on every call. Sessions left idle for
+    longer than idle_timeout seconds are closed and rebuilt on next use.
+    """
+    if pool_size is None or idle_timeout is None:
+        request_settings = DjautotaskSettings().get_settings()
+        if pool_size is None:
+            pool_size = request_settings.get(
+                'session_pool_size', SESSION_POOL_SIZE)
+        if idle_timeout is None:
+            idle_timeout = request_settings.get(
+                'session_idle_timeout', SESSION_IDLE_TIMEOUT)
+
+    key = _session_key(url)
+    now = time.monotonic()
+
+    with _sessions_lock:
+        for stale_key, pooled in list(_sessions.items()):
+            if now - pooled.last_used > idle_timeout:
+                logger.debug('Closing idle session for {}'.format(stale_key))
+                del _sessions[stale_key]
+                pooled.close()
+
+        pooled = _sessions.get(key)
+        if pooled is None:
+            pooled = PooledSession(pool_size)
+            _sessions[key] = pooled
+        pooled.last_used = now
+
+        return pooled.session
+
+
+def close_session(url):
+    """Close and forget the session for the zone serving the given URL."""
+    with _sessions_lock:
+        pooled = _sessions.pop(_session_key(url), None)
+    if pooled:
+        pooled.close()
+
+
+def close_all_sessions():
+    with _sessions_lock:
+        pooled_sessions = list(_sessions.values())
+        _sessions.clear()
+    for pooled in pooled_sessions:
+        pooled.close()
+
+
+class RequestOutcome:
+    """What a request that passed through an AdaptiveLimiter reported."""
+
+    def __init__(self):
+        self.throttled = False
+        self.retry_after = None
+
+    def record_response(self, response):
+        if response.status_code != 429:
+            return
+        self.throttled = True
+        try:
+            self.retry_after = float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            self.retry_after = None
+
+
+class AdaptiveLimiter:
+    """
+    Bound the number of requests in flight against one zone, adapting the
+    bound with an AIMD policy: each healthy response grows the limit by
+    one request per limit's worth of responses, while a 429, a timeout or
+    a response slower than latency_target cuts it by decrease_factor.
+    Latency cuts are applied at most once per latency_target seconds, so a
+    burst of slow responses to one overloaded window only counts once.
+    """
+
+    def __init__(self, initial=CONCURRENCY_INITIAL, minimum=CONCURRENCY_MIN,
+                 maximum=CONCURRENCY_MAX,
+                 latency_target=CONCURRENCY_LATENCY_TARGET,
+                 decrease_factor=CONCURRENCY_DECREASE_FACTOR):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                delay = self.resume_at - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    break
+            self.in_flight += 1
+
+    def release(self, latency, throttled=False, retry_after=None):
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if throttled:
+                self._decrease(now)
+                self.resume_at = max(
+                    self.resume_at,
+                    now + (THROTTLE_COOLDOWN if retry_after is None
+                           else retry_after)
+                )
+                logger.warning(
+                    'Autotask throttled a request; concurrency limit is '
+                    'now {}.'.format(int(self.limit))
+                )
+            elif latency > self.latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self._decrease(now)
+                    logger.info(
+                        'Autotask responded in {:.2f}s; concurrency limit '
+                        'is now {}.'.format(latency, int(self.limit))
+                    )
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+            self._condition.notify_all()
+
+    def _decrease(self, now):
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        self._last_decrease = now
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a request slot for the duration of the block. The block
+        reports throttling through the yielded RequestOutcome; timeouts are
+        treated as throttling too.
+        """
+        self.acquire()
+        outcome = RequestOutcome()
+        start = time.monotonic()
+        try:
+            yield outcome
+        except requests.Timeout:
+            outcome.throttled = True
+            raise
+        finally:
+            self.release(
+                time.monotonic() - start,
+                throttled=outcome.throttled,
+                retry_after=outcome.retry_after,
+            )
+
+
+def get_limiter(url):
+    """
+    Return the process-wide AdaptiveLimiter for the zone serving the given
+    URL. Autotask throttles per database, so every client and synchronizer
+    talking to a zone shares one limiter.
+    """
+    key = _session_key(url)
+
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            request_settings = DjautotaskSettings().get_settings()
+            limiter = AdaptiveLimiter(
+                initial=request_settings.get(
+                    'concurrency_initial', CONCURRENCY_INITIAL),
+                minimum=request_settings.get(
+                    'concurrency_min', CONCURRENCY_MIN),
+                maximum=request_settings.get(
+                    'concurrency_max', CONCURRENCY_MAX),
+                latency_target=request_settings.get(
+                    'concurrency_latency_target', CONCURRENCY_LATENCY_TARGET),
+            )
+            _limiters[key] = limiter
+
+        return limiter
+
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Issue the requests made inside the block with the given priority, one
+    of PRIORITY_INTERACTIVE, PRIORITY_NORMAL or PRIORITY_LOW.
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def get_request_priority():
+    return _request_priority.get()
+
+
+class RequestBudget:
+    """
+    Track usage of the hourly request threshold of one Autotask database.
+
+    Usage is taken from the ThresholdInformation endpoint every
+    poll_interval seconds, and the requests this process makes in between
+    are counted locally, since the threshold is shared with every other
+    integration using the database. Low priority requests may push usage
+    up to low_priority_share of the threshold and normal ones up to share;
+    past that, normal requests wait up to max_wait seconds for the
+    timeframe to roll over and low priority requests are refused straight
+    away. Whatever is left above share is reserved for interactive
+    requests, which are only counted.
+    """
+
+    def __init__(self, share=REQUEST_BUDGET_SHARE,
+                 low_priority_share=REQUEST_BUDGET_LOW_PRIORITY_SHARE,
+                 poll_interval=REQUEST_BUDGET_POLL_INTERVAL,
+                 max_wait=REQUEST_BUDGET_MAX_WAIT):
+        self.share = share
+        self.low_priority_share = min(low_priority_share, share)
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.threshold = None
+        self.used = 0
+        self.polled_at = None
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+    def ceiling(self, priority):
+        if self.threshold is None or priority == PRIORITY_INTERACTIVE:
+            return None
+        share = self.low_priority_share if priority == PRIORITY_LOW \
+            else self.share
+        return int(self.threshold * share)
+
+    def update(self, threshold_info):
+        """Replace the local estimate with a ThresholdInformation result."""
+        with self._lock:
+            self.threshold = threshold_info.get('externalRequestThreshold')
+            self.used = threshold_info.get(
+                'currentTimeframeRequestCount', 0)
+            self.polled_at = time.monotonic()
+
+    def poll_due(self):
+        return self.polled_at is None or \
+            time.monotonic() - self.polled_at >= self.poll_interval
+
+    def refresh(self, client, force=False):
+        if not (force or self.poll_due()):
+            return
+        with self._poll_lock:
+            if not (force or self.poll_due()):
+                # Another thread polled while we waited for the lock.
+                return
+            try:
+                self.update(client.fetch_threshold_information())
+            except AutotaskAPIError as e:
+                # Carry on with local counts rather than fail the sync.
+                logger.warning(
+                    'Failed to fetch Autotask threshold information: '
+                    '{}'.format(e))
+                with self._lock:
+                    self.polled_at = time.monotonic()
+
+    def reserve(self, client, priority=None):
+        """
+        Count one request of the given priority, defaulting to the priority
+        of the current context, waiting or raising
+        AutotaskRequestBudgetExceeded if its share is used up.
+        """
+        if priority is None:
+            priority = get_request_priority()
+        self.refresh(client)
+        deadline = time.monotonic() + self.max_wait
+
+        while True:
+            with self._lock:
+                ceiling = self.ceiling(priority)
+                if ceiling is None or self.used < ceiling:
+                    self.used += 1
+                    return
+                used, threshold = self.used, self.threshold
+
+            msg = 'Autotask request budget for {} priority requests is ' \
+                'used up: {} of {} requests used.'.format(
+                    priority, used, threshold)
+            remaining = deadline - time.monotonic()
+            if priority == PRIORITY_LOW or remaining <= 0:
+                raise AutotaskRequestBudgetExceeded(msg)
+
+            logger.info('{} Waiting for the threshold timeframe to roll '
+                        'over.'.format(msg))
+            time.sleep(min(self.poll_interval, remaining))
+            self.refresh(client, force=True)
+
+
+def get_budget(url):
+    """
+    Return the process-wide RequestBudget for the zone serving the given
+    URL, or None if request budgeting is turned off.
+    """
+    request_settings = DjautotaskSettings().get_settings()
+    if not request_settings.get('request_budget', False):
+        return None
+
+    key = _session_key(url)
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = RequestBudget(
+                share=request_settings.get(
+                    'request_budget_share', REQUEST_BUDGET_SHARE),
+                low_priority_share=request_settings.get(
+                    'request_budget_low_priority_share',
+                    REQUEST_BUDGET_LOW_PRIORITY_SHARE),
+                poll_interval=request_settings.get(
+                    'request_budget_poll_interval',
+                    REQUEST_BUDGET_POLL_INTERVAL),
+                max_wait=request_settings.get(
+                    'request_budget_max_wait', REQUEST_BUDGET_MAX_WAIT),
+            )
+            _budgets[key] = budget
+
+        return budget
+
+
+def reset_budgets():
+    with _budgets_lock:
+        _budgets.clear()
+
+
+# A JSON string escape of either a backslash or NUL. Matching both keeps
+# an escaped backslash followed by the text u0000 intact.
+JSON_ESCAPED_NULL_RE = re.compile(rb'\\\\|\\u0000')
+
+
+class ResponseDecoder:
+    """
+    Decode the JSON body of an API response into values ready to be synced.
+
+    decimals: decode numbers with a fraction as Decimal instead of float.
+    strip_nulls: remove NUL characters from strings, which the database
+        can't store.
+    fast: decode with orjson, if it is installed. orjson has no way to
+        decode Decimals, so it isn't used along with decimals. Content
+        orjson rejects, such as lone surrogates or integers over 64 bits,
+        is decoded again with json.
+    """
+
+    def __init__(self, decimals=False, strip_nulls=True, fast=False):
+        self.decimals = decimals
+        self.strip_nulls = strip_nulls
+        self.fast = fast and not decimals and orjson is not None
+
+    @classmethod
+    def from_settings(cls, request_settings):
+        return cls(
+            decimals=request_settings.get('decode_decimals', False),
+            strip_nulls=request_settings.get('decode_strip_nulls', True),
+            fast=request_settings.get('decode_fast_json', False),
+        )
+
+    def decode(self, content):
+        if self.strip_nulls and b'\\u0000' in content:
+            content = JSON_ESCAPED_NULL_RE.sub(self._remove_null, content)
+        if self.fast:
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                logger.debug('orjson failed to decode a response, '
+                             'decoding it with json.')
+        if self.decimals:
+            return json.loads(content, parse_float=decimal.Decimal)
+        return json.loads(content)
+
+    @staticmethod
+    def _remove_null(match):
+        escape = match.group()
+        return b'' if escape == b'\\u0000' else escape
+
+
+class StreamedPage:
+    """
+    A page of query results that is decoded while it is read from the
+    response, so only the record being decoded is held in memory. Iterate
+    items() first, then get('pageDetails'); getting fields that come after
+    items before iterating them reads the remaining items into a list.
+    """
+
+    def __init__(self, response, decoder, chunk_size=STREAM_CHUNK_SIZE):
+        self.response = response
+        self.decoder = decoder
+        self.json_decoder = json.JSONDecoder(
+            parse_float=decimal.Decimal if decoder.decimals else None)
+        self._chunks = response.iter_content(chunk_size)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._value_start = 0
+        self._eof = False
+        self._fields = {}
+        self._field_count = 0
+        self._started = False
+        self._items_read = False
+        self._done = False
+
+    def get(self, key, default=None):
+        if key == 'items' and not self._items_read:
+            return list(self.items())
+        while not self._done and key not in self._fields:
+            if self._next_field() == 'items':
+                self._fields['items'] = list(self._read_items())
+        return self._fields.get(key, default)
+
+    def items(self):
+        """Yield the records of the page one at a time."""
+        if self._items_read:
+            return
+        while not self._done:
+            if self._next_field() == 'items':
+                yield from self._read_items()
+                # Keep the fields after items, and finish reading the
+                # response so its connection can be reused.
+                while not self._done:
+                    self._next_field()
+
+    def close(self):
+        self._done = True
+        self.response.close()
+
+    def _read_items(self):
+        self._items_read = True
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._read_record()
+            if self._expect(',]') == ']':
+                return
+
+    def _next_field(self):
+        """
+        Read the next top-level field of the page. Its value is kept, apart
+        from that of items, whose name is returned with the stream
+        positioned at the start of the array.
+        """
+        if not self._started:
+            self._started = True
+            self._expect('{')
+        if self._peek() == '}':
+            self.close()
+            return None
+        if self._field_count:
+            self._expect(',')
+        self._field_count += 1
+        name = self._read_value()
+        self._expect(':')
+        if name == 'items' and not self._items_read:
+            return name
+        self._fields[name] = self._read_value()
+        return name
+
+    def _read_record(self):
+        record = self._read_value()
+        if self.decoder.strip_nulls:
+            text = self._buffer[self._value_start:self._pos]
+            if '\\u0000' in text:
+                record = self.decoder.decode(text.encode())
+        return record
+
+    def _fill(self):
+        """Read the next chunk of the response into the buffer."""
+        if self._eof:
+            return
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            chunk = b''
+        except requests.RequestException as e:
+            self.close()
+            raise AutotaskAPIError('{}'.format(e))
+        self._buffer += self._text_decoder.decode(chunk, final=self._eof)
+
+    def _skip_whitespace(self):
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer) or self._eof:
+                return pos
+            self._fill()
+
+    def _peek(self):
+        pos = self._skip_whitespace()
+        return self._buffer[pos] if pos < len(self._buffer) else None
+
+    def _expect(self, characters):
+        character = self._peek()
+        if character is None or character not in characters:
+            self.close()
+            raise AutotaskAPIError(
+                'Unexpected {!r} in streamed page, expected {!r}.'.format(
+                    character, characters))
+        self._pos += 1
+        return character
+
+    def _read_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(
+                    self._buffer, self._pos)
+                # A value at the end of the buffer, like a number, may
+                # continue in the next chunk.
+                if end < len(self._buffer) or self._eof:
+                    self._value_start = self._pos
+                    self._pos = end
+                    return value
+            except JSONDecodeError as e:
+                if self._eof:
+                    self.close()
+                    raise AutotaskAPIError(
+                        'Invalid JSON in streamed page: {}'.format(e))
+            self._fill()
+
+
 def get_cached_url(cache_key):
     return cache.get(f'zone_{cache_key}')
 
@@ -136,7 +750,7 @@ def get_zone_info(username):
 
     try:
         logger.debug('Making GET request to {}'.format(endpoint_url))
-        response = requests.get(endpoint_url, timeout=3)
+        response = get_session(endpoint_url).get(endpoint_url, timeout=3)
         if 200 == response.status_code:
             resp_json = response.json()
             return resp_json
@@ -251,6 +865,13 @@ class ApiConditionList:
                 'MaxRecords': max_records
             })
 
+        include_fields = kwargs.get('include_fields')
+        if include_fields and not kwargs.get('record_count'):
+            # Ask for only these fields of each record
+            condition_filters.update({
+                'IncludeFields': list(include_fields)
+            })
+
         endpoint = self.METHODS[method]
         filters = json.dumps(condition_filters)
 
@@ -263,7 +884,10 @@ class ApiConditionList:
                 endpoint += filters
 
             filters = None
-        elif method != "post":
+        elif method == "post":
+            if kwargs.get('record_count'):
+                endpoint = 'query/count'
+        else:
             raise TypeError("Unsupported method")
 
         return endpoint, filters
@@ -312,8 +936,15 @@ class AutotaskAPIClient(object):
 
         self.request_settings = DjautotaskSettings().get_settings()
         self.timeout = self.request_settings['timeout']
+        self.session_pool_size = self.request_settings.get(
+            'session_pool_size', SESSION_POOL_SIZE)
+        self.session_idle_timeout = self.request_settings.get(
+            'session_idle_timeout', SESSION_IDLE_TIMEOUT)
         self.impersonation_resource = impersonation_resource
         self.conditions = ApiConditionList()
+        # API field names to request from queries, or None for all fields.
+        self.include_fields = None
+        self.decoder = ResponseDecoder.from_settings(self.request_settings)
 
         self.cached_body = None
 
@@ -333,6 +964,43 @@ class AutotaskAPIClient(object):
             endpoint,
         )
 
+    def get_session(self, endpoint_url):
+        return get_session(
+            endpoint_url,
+            pool_size=self.session_pool_size,
+            idle_timeout=self.session_idle_timeout,
+        )
+
+    def reserve_budget(self, endpoint_url):
+        budget = get_budget(endpoint_url)
+        if budget is not None:
+            budget.reserve(self)
+
+    def fetch_threshold_information(self):
+        """
+        Return the request threshold and current usage of the database. This
+        request bypasses the request budget so it can be made while the
+        budget is exhausted.
+        """
+        endpoint_url = '{}ThresholdInformation'.format(self.api_base_url)
+        logger.debug('Making GET request to {}'.format(endpoint_url))
+        try:
+            response = self.get_session(endpoint_url).get(
+                endpoint_url,
+                timeout=self.timeout,
+                headers=self.get_headers('get'),
+            )
+        except requests.RequestException as e:
+            raise AutotaskAPIError('{}'.format(e))
+
+        if 200 <= response.status_code < 300:
+            try:
+                return response.json()
+            except JSONDecodeError as e:
+                raise AutotaskAPIError('{}'.format(e))
+        self._log_failed(response)
+        raise AutotaskAPIError(self._prepare_error_response(response))
+
     def _log_failed(self, response):
         logger.error('Failed API call: {0} - {1} - {2}'.format(
             response.url, response.status_code, response.content))
@@ -436,7 +1104,12 @@ class AutotaskAPIClient(object):
         """
         retry_counter is a dict in the form {'count': 0} that is passed in
         to verify the number of attempts that were made.
+
+        Pass stream=True to get a successful response as a StreamedPage,
+        which decodes the page as it is read.
         """
+        stream = kwargs.pop('stream', False)
+
         @retry(stop_max_attempt_number=self.request_settings['max_attempts'],
                wait_exponential_multiplier=RETRY_WAIT_EXPONENTIAL_MULTAPPLIER,
                wait_exponential_max=RETRY_WAIT_EXPONENTIAL_MAX,
@@ -451,13 +1124,20 @@ class AutotaskAPIClient(object):
             try:
                 self.log_message(endpoint_url, request_method, request_body)
 
-                response = requests.request(
-                    request_method,
-                    endpoint_url,
-                    data=request_body,
-                    timeout=self.timeout,
-                    headers=self.get_headers(request_method),
-                )
+                # Build headers before taking a slot; the impersonation
+                # check may issue a request of its own.
+                headers = self.get_headers(request_method)
+                self.reserve_budget(endpoint_url)
+                with get_limiter(endpoint_url).slot() as outcome:
+                    response = self.get_session(endpoint_url).request(
+                        request_method,
+                        endpoint_url,
+                        data=request_body,
+                        timeout=self.timeout,
+                        headers=headers,
+                        stream=stream,
+                    )
+                    outcome.record_response(response)
 
             except requests.RequestException as e:
                 logger.error('Request failed: {} {}: {}'.format(
@@ -465,8 +1145,10 @@ class AutotaskAPIClient(object):
                 raise AutotaskAPIError('{}'.format(e))
 
             if 200 <= response.status_code < 300:
+                if stream:
+                    return StreamedPage(response, self.decoder)
                 try:
-                    return response.json()
+                    return self.decoder.decode(response.content)
                 except JSONDecodeError as e:
                     logger.error(
                         'Request failed during JSON decode: {} {}: {}'.format(
@@ -485,6 +1167,9 @@ class AutotaskAPIClient(object):
                     ):
                         logger.info('Zone information has been changed, '
                                     'so this request will be retried.')
+                        # Drop pooled connections to the old zone so the
+                        # retry starts from a clean session.
+                        close_session(endpoint_url)
                         raise AutotaskAPIError(response.content)
                 raise AutotaskAPIClientError(msg)
             elif response.status_code == 403:
@@ -492,6 +1177,10 @@ class AutotaskAPIClient(object):
                 raise AutotaskSecurityPermissionsException(
                     self._prepare_error_response(response),
                     response.status_code)
+            elif response.status_code == 429:
+                self._log_failed(response)
+                raise AutotaskAPIThrottledError(
+                    self._prepare_error_response(response))
             elif 400 <= response.status_code < 499:
                 self._log_failed(response)
                 raise AutotaskAPIClientError(
@@ -515,6 +1204,8 @@ class AutotaskAPIClient(object):
             url = next_url
         else:
             # Query endpoint is different between GET and POST
+            if self.include_fields:
+                kwargs.setdefault('include_fields', self.include_fields)
             query_endpoint, self.cached_body = \
                 self.conditions.build_query(method=method, **kwargs)
             url = "{}{}".format(self.get_api_url(), query_endpoint)
@@ -550,13 +1241,17 @@ class AutotaskAPIClient(object):
                 'Making {} request to {}'.format(method, endpoint_url)
             )
 
-            response = requests.request(
-                method,
-                endpoint_url,
-                json=body,
-                timeout=self.timeout,
-                headers=self.get_headers(method),
-            )
+            headers = self.get_headers(method)
+            self.reserve_budget(endpoint_url)
+            with get_limiter(endpoint_url).slot() as outcome:
+                response = self.get_session(endpoint_url).request(
+                    method,
+                    endpoint_url,
+                    json=body,
+                    timeout=self.timeout,
+                    headers=headers,
+                )
+                outcome.record_response(response)
         except AutotaskImpersonationLimitedException as e:
             logger.error(
                 'Request failed: {} {}: {}'.format(method, endpoint_url, e)
@@ -580,6 +1275,10 @@ class AutotaskAPIClient(object):
             msg = 'Resource not found: {}'.format(response.url)
             logger.warning(msg)
             raise AutotaskRecordNotFoundError(msg)
+        elif response.status_code == 429:
+            self._log_failed(response)
+            raise AutotaskAPIThrottledError(
+                self._prepare_error_response(response))
         elif 400 <= response.status_code < 499:
             self._log_failed(response)
             raise AutotaskAPIClientError(
@@ -626,6 +1325,15 @@ class AutotaskAPIClient(object):
     def get(self, next_url, *args, **kwargs):
         return self.fetch_resource(next_url, *args, **kwargs)
 
+    def count(self, *args, **kwargs):
+        """
+        Return the number of records matching the conditions, in the form
+        {'queryCount': n}.
+        """
+        kwargs['record_count'] = True
+
+        return self.fetch_resource(*args, **kwargs)
+
     def get_single(self, instance_id):
         endpoint_url = '{}{}'.format(self.get_api_url(), instance_id)
         response = self.fetch_resource(endpoint_url)
@@ -712,10 +1420,6 @@ class ResourceRoleDepartmentsAPIClient(AutotaskAPIClient):
 class TicketsAPIClient(AutotaskAPIClient):
     API = 'Tickets'
 
-    def count(self, next_url, *args, **kwargs):
-        # Make get request using Api conditions
-        return self.fetch_resource(next_url, *args, **kwargs)
-
 
 class ConfigurationItemsAPIClient(AutotaskAPIClient):
     API = 'ConfigurationItems'
@@ -724,6 +1428,11 @@ class ConfigurationItemsAPIClient(AutotaskAPIClient):
     def get(self, next_url, *args, **kwargs):
         return self.fetch_resource(next_url, method='post', *args, **kwargs)
 
+    def count(self, *args, **kwargs):
+        kwargs['record_count'] = True
+
+        return self.fetch_resource(method='post', *args, **kwargs)
+
 
 class ConfigurationItemCategoriesAPIClient(AutotaskAPIClient):
     API = 'ConfigurationItemCategories'
@@ -1013,7 +1722,7 @@ class AttachmentInfoAPIClient(AutotaskAPIClient):
 
         try:
             logger.debug('Making GET request to {}'.format(endpoint))
-            response = requests.get(
+            response = self.get_session(endpoint).get(
                 endpoint,
                 timeout=self.timeout,
                 headers=self.get_headers('GET'),
@@ -1053,8 +1762,3 @@ class AttachmentInfoAPIClient(AutotaskAPIClient):
 
     def get_attachment(self, object_id, document_id, record_type):
         return self.document_download(object_id, document_id, record_type)
-
-    def count(self, *args, **kwargs):
-        kwargs['record_count'] = True
-
-        return self.fetch_resource(*args, **kwargs)
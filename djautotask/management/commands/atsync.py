@@ -1,6 +1,13 @@
-from collections import OrderedDict
+import os
+import subprocess
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.utils.translation import gettext_lazy as _
 from djautotask import sync
 from djautotask import api
@@ -8,6 +15,74 @@ from djautotask import api
 OPTION_NAME = 'autotask_object'
 ERROR_MESSAGE_TEMPLATE = 'Failed to sync {}. Autotask API returned an ' \
                          'error(s): {}.'
+DEFERRED_MESSAGE_TEMPLATE = '{} Sync deferred: {}'
+SHARD_ERROR_MESSAGE_TEMPLATE = 'Failed to sync {}: {}.'
+
+
+def sync_dependencies(sync_class):
+    """
+    Return the concrete models a synchronizer reads while it syncs, i.e.
+    the targets of its relations, its UDF definitions and the models its
+    batch conditions are built from.
+    """
+    dependencies = set()
+    related_meta = getattr(sync_class, 'related_meta', None) or {}
+    for model_class, field_name in related_meta.values():
+        dependencies.add(model_class._meta.concrete_model)
+    for attr in ('udf_class', 'related_instance_model'):
+        model_class = getattr(sync_class, attr, None)
+        if model_class is not None:
+            dependencies.add(model_class._meta.concrete_model)
+    return dependencies
+
+
+def build_dependency_graph(sync_items):
+    """
+    Map each synchronizer name to the names of the synchronizers that must
+    finish before it starts. sync_items is a list of
+    (name, (sync_class, obj_name)) tuples; dependencies on models that
+    aren't synced by any of them, and on the synchronizer's own model, are
+    ignored.
+    """
+    synced_by = defaultdict(set)
+    for name, (sync_class, obj_name) in sync_items:
+        synced_by[sync_class.model_class._meta.concrete_model].add(name)
+
+    graph = OrderedDict()
+    for name, (sync_class, obj_name) in sync_items:
+        graph[name] = set()
+        for model_class in sync_dependencies(sync_class):
+            graph[name] |= synced_by[model_class]
+        graph[name].discard(name)
+    return graph
+
+
+def run_in_dependency_order(graph, run, workers):
+    """
+    Call run(name) for every name in graph on a pool of worker threads,
+    starting each one only when all of its dependencies have finished.
+    If the remaining graph has a cycle, the first pending name in graph
+    order is started anyway so the run can't stall.
+    """
+    pending = OrderedDict((name, set(deps)) for name, deps in graph.items())
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready and not running:
+                ready = [next(iter(pending))]
+
+            for name in ready:
+                del pending[name]
+                running[executor.submit(run, name)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished = running.pop(future)
+                future.result()
+                for deps in pending.values():
+                    deps.discard(finished)
 
 
 class Command(BaseCommand):
@@ -15,6 +90,8 @@ class Command(BaseCommand):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Serialises output from synchronizers running in parallel.
+        self._output_lock = threading.Lock()
 
         # This can be replaced with a single instantiation of an OrderedDict
         # using kwargs in Python 3.6. But we need Python 3.5 compatibility for
@@ -160,12 +237,54 @@ class Command(BaseCommand):
                             action='store_true',
                             dest='full',
                             default=False)
+        parser.add_argument('--parallel',
+                            type=int,
+                            dest='parallel',
+                            default=1,
+                            help='Number of synchronizers to run at once. '
+                                 'A synchronizer only starts once the '
+                                 'objects it references are synced.')
+        parser.add_argument('--force-reassign',
+                            action='store_true',
+                            dest='force_reassign',
+                            default=False,
+                            help='Assign every record, even those whose '
+                                 'fingerprint shows they are unchanged. '
+                                 'Use after upgrading, if field mapping '
+                                 'changed.')
+        parser.add_argument('--resume',
+                            action='store_true',
+                            dest='resume',
+                            default=False,
+                            help='Run a full sync, continuing each '
+                                 'synchronizer from the checkpoint of its '
+                                 'last full sync if that did not finish.')
+        parser.add_argument('--workers',
+                            type=int,
+                            dest='workers',
+                            default=1,
+                            help='Number of processes to split the records '
+                                 'of each synchronizer between.')
+        parser.add_argument('--shard-worker',
+                            dest='shard_worker',
+                            metavar='RUN_KEY',
+                            help='Sync the shards of a run started with '
+                                 '--workers. Used by the worker processes.')
 
-    def sync_by_class(self, sync_class, obj_name, full_option=False):
-        synchronizer = sync_class(full=full_option)
+    def sync_by_class(self, sync_class, obj_name, full_option=False,
+                      metadata_cache=None, force_reassign=False,
+                      resume=False, workers=1):
+        synchronizer = sync_class(
+            full=full_option, metadata_cache=metadata_cache,
+            force_reassign=force_reassign, resume=resume)
 
-        created_count, updated_count, skipped_count, deleted_count = \
-            synchronizer.sync()
+        if workers > 1:
+            created_count, updated_count, skipped_count, deleted_count = \
+                synchronizer.sync(workers=workers,
+                                  spawn=self.spawn_shard_workers)
+        else:
+            created_count, updated_count, skipped_count, deleted_count = \
+                synchronizer.sync()
 
         msg = _('{} Sync Summary - Created: {}, Updated: {}, Skipped: {}')
         fmt_msg = msg.format(obj_name, created_count, updated_count,
@@ -177,19 +296,73 @@ class Command(BaseCommand):
             fmt_msg = msg.format(obj_name, created_count, updated_count,
                                  skipped_count, deleted_count)
 
-        self.stdout.write(fmt_msg)
+        with self._output_lock:
+            self.stdout.write(fmt_msg)
+
+        return created_count, updated_count, skipped_count, deleted_count
+
+    def spawn_shard_workers(self, run_key, workers):
+        """
+        Run workers processes of this command with --shard-worker, and wait
+        for them to exit. Workers that fail are reported, since the shards
+        they leave pending don't say why.
+
+        The workers are started with django-admin rather than through
+        sys.argv[0], which isn't manage.py when this command is run with
+        call_command, e.g. from a task queue.
+        """
+        env = dict(os.environ)
+        env['DJANGO_SETTINGS_MODULE'] = self.get_settings_module()
+        # Let the workers import what this process can, such as the
+        # project's settings.
+        env['PYTHONPATH'] = os.pathsep.join(
+            os.path.abspath(path) for path in sys.path)
+        args = [sys.executable, '-m', 'django', 'atsync',
+                '--shard-worker', run_key]
+        processes = [subprocess.Popen(args, env=env) for _ in range(workers)]
+        for process in processes:
+            returncode = process.wait()
+            if returncode:
+                with self._output_lock:
+                    self.stderr.write(
+                        'Shard worker {} exited with code {}.'.format(
+                            process.pid, returncode))
+
+    @staticmethod
+    def get_settings_module():
+        return getattr(settings, 'SETTINGS_MODULE', None) or \
+            os.environ.get('DJANGO_SETTINGS_MODULE')
 
     def handle(self, *args, **options):
+        if options.get('shard_worker'):
+            sync.run_shard_worker(options['shard_worker'])
+            return
+
         sync_classes = []
         autotask_object_arg = options[OPTION_NAME]
         full_option = options.get('full', False)
+        parallel = options.get('parallel') or 1
+        force_reassign = options.get('force_reassign', False)
+        resume = options.get('resume', False)
+        if resume:
+            # Only full syncs are checkpointed.
+            full_option = True
+        workers = options.get('workers') or 1
+        if resume and workers > 1:
+            raise CommandError(
+                _('Sharded syncs are not checkpointed, --resume and '
+                  '--workers can\'t be used together.'))
+        if workers > 1 and not self.get_settings_module():
+            raise CommandError(
+                _('--workers needs a settings module, for the worker '
+                  'processes to load; set DJANGO_SETTINGS_MODULE.'))
 
         if autotask_object_arg:
             object_arg = autotask_object_arg
             sync_tuple = self.synchronizer_map.get(object_arg)
 
             if sync_tuple:
-                sync_classes.append(sync_tuple)
+                sync_classes.append((object_arg, sync_tuple))
             else:
                 msg = _('Invalid AT object {}, '
                         'choose one of the following: \n{}')
@@ -197,26 +370,63 @@ class Command(BaseCommand):
                 msg = msg.format(sync_tuple, options_txt)
                 raise CommandError(msg)
         else:
-            sync_classes = self.synchronizer_map.values()
+            sync_classes = list(self.synchronizer_map.items())
 
         failed_classes = 0
         error_messages = ''
+        # Picklist and UDF synchronizers of the same entity read the same
+        # metadata documents, download each of them once per run.
+        metadata_cache = sync.MetadataCache()
 
-        for sync_class, obj_name in sync_classes:
+        def run(name):
+            sync_class, obj_name = self.synchronizer_map[name]
             error_msg = None
             try:
                 self.sync_by_class(sync_class, obj_name,
-                                   full_option=full_option)
+                                   full_option=full_option,
+                                   metadata_cache=metadata_cache,
+                                   force_reassign=force_reassign,
+                                   resume=resume, workers=workers)
             except api.AutotaskSecurityPermissionsException as e:
-                self.stderr.write(ERROR_MESSAGE_TEMPLATE.format(obj_name, e))
+                with self._output_lock:
+                    self.stderr.write(
+                        ERROR_MESSAGE_TEMPLATE.format(obj_name, e))
+            except api.AutotaskRequestBudgetExceeded as e:
+                # Not a failure; the next run picks up where this left off.
+                with self._output_lock:
+                    self.stdout.write(DEFERRED_MESSAGE_TEMPLATE.format(
+                        obj_name, e))
             except api.AutotaskAPIError as e:
                 error_msg = ERROR_MESSAGE_TEMPLATE.format(obj_name, e)
+            except sync.ShardSyncError as e:
+                error_msg = SHARD_ERROR_MESSAGE_TEMPLATE.format(obj_name, e)
 
             finally:
                 if error_msg:
-                    self.stderr.write(error_msg)
-                    error_messages += '{}\n'.format(error_msg)
-                    failed_classes += 1
+                    with self._output_lock:
+                        self.stderr.write(error_msg)
+                if parallel > 1:
+                    # Worker threads each open their own DB connections.
+                    connections.close_all()
+            return error_msg
+
+        if parallel > 1:
+            errors = {}
+
+            def run_parallel(name):
+                errors[name] = run(name)
+
+            run_in_dependency_order(
+                build_dependency_graph(sync_classes), run_parallel, parallel)
+            # Report errors in the same order as a serial run would.
+            error_msgs = [errors[name] for name, _ in sync_classes]
+        else:
+            error_msgs = [run(name) for name, _ in sync_classes]
+
+        for error_msg in error_msgs:
+            if error_msg:
+                error_messages += '{}\n'.format(error_msg)
+                failed_classes += 1
 
         if failed_classes > 0:
             msg = '{} class{} failed to sync.\n'.format(
@@ -0,0 +1,227 @@
+import logging
+import random
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.core.management.base import CommandError
+from django.db import connections
+from django.utils.translation import gettext_lazy as _
+from djautotask import sync
+from djautotask import api
+from djautotask.utils import DjautotaskSettings
+
+from .atsync import Command as SyncCommand, DEFERRED_MESSAGE_TEMPLATE, \
+    ERROR_MESSAGE_TEMPLATE
+
+logger = logging.getLogger(__name__)
+
+FAILED_MESSAGE_TEMPLATE = 'Failed to sync {}: {}'
+# The longest the scheduler sleeps before checking whether it should stop.
+MAX_SLEEP = 1.0
+
+
+class Scheduler:
+    """
+    Run each of a set of jobs over and over on a pool of threads. A job is
+    due again its interval, give or take jitter, after its last run
+    finished, so runs of a job never overlap and a slow job doesn't hold up
+    the others. jobs maps job names to (interval, run) tuples, where run is
+    called with the name.
+    """
+
+    def __init__(self, jobs, threads=4, jitter=0.1, clock=time.monotonic):
+        self.jobs = jobs
+        self.threads = threads
+        self.jitter = jitter
+        self.clock = clock
+        self.stopping = threading.Event()
+        now = clock()
+        # Spread the first runs out, so the jobs don't all start at once.
+        self.next_run = {
+            name: now + random.uniform(0, jitter * interval)
+            for name, (interval, run) in jobs.items()
+        }
+
+    def delay(self, interval):
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def stop(self):
+        """Start no more jobs; run() returns once the running ones finish."""
+        self.stopping.set()
+
+    def run(self):
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.threads,
+                                thread_name_prefix='atsync') as executor:
+            while not self.stopping.is_set():
+                now = self.clock()
+                busy = set(running.values())
+                for name, due in self.next_run.items():
+                    if due <= now and name not in busy:
+                        future = executor.submit(self._run, name)
+                        running[future] = name
+
+                busy = set(running.values())
+                waiting = [due for name, due in self.next_run.items()
+                           if name not in busy]
+                timeout = MAX_SLEEP
+                if waiting:
+                    timeout = max(0, min(min(waiting) - now, MAX_SLEEP))
+
+                if running:
+                    done, pending = wait(running, timeout=timeout,
+                                         return_when=FIRST_COMPLETED)
+                else:
+                    done = ()
+                    self.stopping.wait(timeout)
+
+                for future in done:
+                    name = running.pop(future)
+                    interval, run = self.jobs[name]
+                    self.next_run[name] = self.clock() + self.delay(interval)
+
+    def _run(self, name):
+        interval, run = self.jobs[name]
+        try:
+            run(name)
+        except Exception:
+            logger.exception('Scheduled job {} failed.'.format(name))
+
+
+class Command(SyncCommand):
+    help = str(_('Keep synchronizing objects with the Autotask API, each on '
+                 'its own interval, until stopped with SIGTERM or SIGINT.'))
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval',
+                            action='append',
+                            dest='intervals',
+                            default=[],
+                            metavar='OBJECT=SECONDS',
+                            help='Sync OBJECT every SECONDS seconds, or '
+                                 'never if SECONDS is 0. Can be repeated.')
+        parser.add_argument('--threads',
+                            type=int,
+                            dest='threads',
+                            default=None,
+                            help='Number of synchronizers to run at once.')
+
+    def get_intervals(self, settings, interval_options):
+        """
+        Return how often to run each synchronizer, in seconds. Picklist and
+        UDF synchronizers default to the daemon_metadata_interval setting,
+        the others to daemon_interval. daemon_intervals and the --interval
+        options override them by name.
+        """
+        overrides = dict(settings.get('daemon_intervals') or {})
+        for option in interval_options:
+            name, sep, seconds = option.partition('=')
+            if name not in self.synchronizer_map:
+                raise CommandError(
+                    _('Invalid AT object {}, choose one of the following: '
+                      '\n{}').format(
+                        name, ', '.join(self.synchronizer_map.keys())))
+            try:
+                overrides[name] = float(seconds)
+            except ValueError:
+                raise CommandError(
+                    _('Invalid interval {}.').format(option))
+
+        intervals = {}
+        for name, (sync_class, obj_name) in self.synchronizer_map.items():
+            if name in overrides:
+                interval = overrides[name]
+            elif issubclass(sync_class, (sync.PicklistSynchronizer,
+                                         sync.UDFSynchronizer)):
+                interval = settings.get('daemon_metadata_interval', 3600)
+            else:
+                interval = settings.get('daemon_interval', 300)
+            if interval > 0:
+                intervals[name] = interval
+        return intervals
+
+    def run_synchronizer(self, name):
+        sync_class, obj_name = self.synchronizer_map[name]
+        started = time.monotonic()
+        full_option = bool(self.full_interval) and \
+            started - self.last_full[name] >= self.full_interval
+        try:
+            # Each sync starts with a new RelationResolver, since records
+            # may be deleted between syncs by callbacks, other syncs or
+            # cascades the daemon doesn't see.
+            self.sync_by_class(
+                sync_class, obj_name,
+                full_option=full_option,
+                metadata_cache=self.get_metadata_cache(),
+            )
+            if full_option:
+                self.last_full[name] = started
+        except api.AutotaskRequestBudgetExceeded as e:
+            with self._output_lock:
+                self.stdout.write(DEFERRED_MESSAGE_TEMPLATE.format(
+                    obj_name, e))
+        except api.AutotaskAPIError as e:
+            with self._output_lock:
+                self.stderr.write(ERROR_MESSAGE_TEMPLATE.format(obj_name, e))
+        except Exception as e:
+            # Keep going, the next run may succeed.
+            logger.exception('Failed to sync {}.'.format(obj_name))
+            with self._output_lock:
+                self.stderr.write(FAILED_MESSAGE_TEMPLATE.format(obj_name, e))
+        finally:
+            # Don't keep this thread's DB connections open until its next
+            # sync.
+            connections.close_all()
+
+    def get_metadata_cache(self):
+        """
+        Return the metadata cache shared by the synchronizers, starting a
+        new one when it's older than half the metadata interval, so
+        picklists and UDFs are read fresh when they're next synced.
+        """
+        with self._metadata_lock:
+            now = time.monotonic()
+            if now - self.metadata_cache_started >= self.metadata_max_age:
+                self.metadata_cache = sync.MetadataCache()
+                self.metadata_cache_started = now
+            return self.metadata_cache
+
+    def handle(self, *args, **options):
+        settings = DjautotaskSettings().get_settings()
+        intervals = self.get_intervals(settings, options['intervals'])
+        threads = options.get('threads') or settings.get('daemon_threads', 4)
+
+        self.full_interval = settings.get('daemon_full_interval', 0)
+        now = time.monotonic()
+        self.last_full = dict.fromkeys(intervals, now)
+        self._metadata_lock = threading.Lock()
+        self.metadata_cache = sync.MetadataCache()
+        self.metadata_cache_started = now
+        self.metadata_max_age = \
+            settings.get('daemon_metadata_interval', 3600) / 2
+
+        scheduler = Scheduler(
+            {name: (interval, self.run_synchronizer)
+             for name, interval in intervals.items()},
+            threads=threads,
+            jitter=settings.get('daemon_jitter', 0.1),
+        )
+
+        def stop(signum, frame):
+            with self._output_lock:
+                self.stdout.write(
+                    'Stopping once the running syncs have finished.')
+            scheduler.stop()
+
+        previous_handlers = {
+            signum: signal.signal(signum, stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            scheduler.run()
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            api.close_all_sessions()
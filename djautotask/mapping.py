@@ -0,0 +1,163 @@
+"""
+Declarative mappings of Autotask API records to model fields.
+
+A synchronizer lists its fields as a field_map of Field specs, e.g.
+
+    field_map = (
+        Field('id', 'id', required=True),
+        Field('estimated_hours', 'estimatedHours', decimal(2)),
+        Field('due_date_time', 'dueDateTime', api_datetime()),
+    )
+
+which is compiled once into a FieldMapper that assigns a record to an
+instance in a single pass.
+
+Values may come from api.ResponseDecoder as Decimals rather than floats,
+and with NUL characters already removed.
+"""
+from decimal import Decimal
+
+from .utils import parse_api_datetime, parse_api_datetime_cached
+
+
+class Converter:
+    """
+    A conversion applied to a field's value. It is only applied to empty
+    values (None, '', 0, False) if convert_empty is set.
+    """
+
+    def __init__(self, func, convert_empty=False):
+        self.func = func
+        self.convert_empty = convert_empty
+
+
+def api_datetime(cache=False):
+    """
+    Parse an API datetime string. Pass cache for fields whose values repeat
+    across records, such as dates.
+    """
+    if cache:
+        return Converter(parse_api_datetime_cached)
+    return Converter(parse_api_datetime)
+
+
+def api_date(cache=False):
+    """Parse an API datetime string and keep only its date."""
+    parse = api_datetime(cache).func
+    return Converter(lambda value: parse(value).date())
+
+
+def decimal(places=None):
+    """Convert a number to a Decimal, rounded to places if given."""
+    if places is None:
+        def convert(value):
+            if isinstance(value, Decimal):
+                return value
+            return Decimal(str(value))
+    else:
+        def convert(value):
+            if isinstance(value, Decimal):
+                return round(value, places)
+            return Decimal(str(round(value, places)))
+    return Converter(convert)
+
+
+def truncate(length):
+    """Cut a string to the length of its column."""
+    return Converter(lambda value: value[:length])
+
+
+# These are applied to empty values too, e.g. a missing flag becomes False.
+integer = Converter(int, convert_empty=True)
+boolean = Converter(bool, convert_empty=True)
+text = Converter(str, convert_empty=True)
+
+
+class Field:
+    """
+    Map the API field source to the model attribute target.
+
+    A missing source is assigned as None, unless the field is required, in
+    which case a KeyError is raised. An empty value is replaced by default,
+    if given. convert is applied to the value if it is not empty, or if the
+    Converter says to convert empty values as well.
+    """
+
+    def __init__(self, target, source, convert=None, required=False,
+                 default=None):
+        self.target = target
+        self.source = source
+        self.convert = convert
+        self.required = required
+        self.default = default
+
+    def __repr__(self):
+        return 'Field({!r}, {!r})'.format(self.target, self.source)
+
+    def compile(self, strip_nulls=True):
+        """
+        Return a function that reads this field's value from a record, built
+        with only the steps the field needs. Pass strip_nulls=False if the
+        records were decoded without NUL characters.
+        """
+        source = self.source
+        default = self.default
+        convert = self.convert.func if self.convert else None
+        convert_empty = self.convert.convert_empty if self.convert else False
+
+        if not strip_nulls:
+            if self.required:
+                def read(record):
+                    return record[source]
+            else:
+                def read(record):
+                    return record.get(source)
+        elif self.required:
+            def read(record):
+                value = record[source]
+                if isinstance(value, str):
+                    return value.replace('\x00', '')
+                return value
+        else:
+            def read(record):
+                value = record.get(source)
+                if isinstance(value, str):
+                    return value.replace('\x00', '')
+                return value
+
+        if default is not None:
+            read_value = read
+
+            def read(record):
+                return read_value(record) or default
+
+        if convert is None:
+            return read
+        if convert_empty:
+            return lambda record: convert(read(record))
+
+        def read_converted(record):
+            value = read(record)
+            return convert(value) if value else value
+        return read_converted
+
+
+class FieldMapper:
+    """A field_map compiled for assigning records to instances."""
+
+    def __init__(self, fields, strip_nulls=True):
+        self.fields = tuple(fields)
+        self.steps = tuple(
+            (field.target, field.compile(strip_nulls))
+            for field in self.fields
+        )
+
+    def assign(self, instance, record):
+        for target, read in self.steps:
+            setattr(instance, target, read(record))
+        return instance
+
+
+def source_fields(fields):
+    """Return the API field names read by a field_map."""
+    return tuple(field.source for field in fields)
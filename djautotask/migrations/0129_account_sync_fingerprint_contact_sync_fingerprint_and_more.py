@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djautotask', '0128_remove_udfdefinition_is_list'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='phase',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='servicecall',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasknote',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticketnote',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djautotask', '0129_account_sync_fingerprint_contact_sync_fingerprint_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncStagingID',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sync_key', models.CharField(max_length=32)),
+                ('record_id', models.BigIntegerField()),
+                ('initial', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('sync_key', 'initial', 'record_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djautotask', '0131_syncwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('synchronizer', models.CharField(max_length=100)),
+                ('scope', models.CharField(blank=True, default='', max_length=32)),
+                ('sync_key', models.CharField(max_length=32)),
+                ('cursor', models.JSONField(blank=True, default=dict)),
+                ('started', models.DateTimeField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('synchronizer', 'scope')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djautotask', '0132_synccheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_key', models.CharField(max_length=32)),
+                ('index', models.PositiveIntegerField()),
+                ('synchronizer', models.CharField(max_length=100)),
+                ('full', models.BooleanField(default=False)),
+                ('sync_key', models.CharField(blank=True, default='', max_length=32)),
+                ('spec', models.JSONField(default=dict)),
+                ('status', models.CharField(default='pending', max_length=16)),
+                ('worker', models.PositiveIntegerField(null=True)),
+                ('added', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(null=True)),
+                ('message', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('run_key', 'index')},
+            },
+        ),
+    ]
@@ -31,7 +31,93 @@ class SyncJob(models.Model):
             return self.end_time - self.start_time
 
 
-class Ticket(TimeStampedModel):
+class SyncStagingID(models.Model):
+    """
+    The ID of a record staged by a full sync for pruning stale records in
+    the database; see sync.StagedIDSet. initial rows are the records that
+    existed when the sync started, the others the records it synced.
+    """
+    sync_key = models.CharField(max_length=32)
+    record_id = models.BigIntegerField()
+    initial = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('sync_key', 'initial', 'record_id')
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Where an interrupted full sync can resume: the cursor of the last page
+    or batch of records it persisted, and the sync_key of the record IDs it
+    staged in SyncStagingID.
+    """
+    synchronizer = models.CharField(max_length=100)
+    scope = models.CharField(max_length=32, blank=True, default='')
+    sync_key = models.CharField(max_length=32)
+    cursor = models.JSONField(default=dict, blank=True)
+    started = models.DateTimeField()
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('synchronizer', 'scope')
+
+
+class SyncShard(models.Model):
+    """
+    A part of a synchronizer's records, synced by one of the worker
+    processes of a sharded sync; see sync.run_shard_worker. spec holds the
+    shard's ID range or IDs. The worker records its results, which the
+    sync that created the shards adds up.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    run_key = models.CharField(max_length=32)
+    index = models.PositiveIntegerField()
+    synchronizer = models.CharField(max_length=100)
+    full = models.BooleanField(default=False)
+    sync_key = models.CharField(max_length=32, blank=True, default='')
+    spec = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, default=PENDING)
+    worker = models.PositiveIntegerField(null=True)
+    added = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    last_updated = models.DateTimeField(null=True)
+    message = models.TextField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('run_key', 'index')
+
+
+class SyncWatermark(models.Model):
+    """
+    How far a synchronizer has synced the records of a filter scope: the
+    latest last-updated time it has seen, less a safety overlap. Partial
+    syncs fetch the records updated after it.
+    """
+    synchronizer = models.CharField(max_length=100)
+    scope = models.CharField(max_length=32, blank=True, default='')
+    watermark = models.DateTimeField()
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('synchronizer', 'scope')
+
+
+class SyncedModel(TimeStampedModel):
+    # Digest of the API record last assigned to this row, so partial syncs
+    # can skip records that haven't changed since.
+    sync_fingerprint = models.CharField(blank=True, null=True, max_length=32)
+
+    class Meta(TimeStampedModel.Meta):
+        abstract = True
+
+
+class Ticket(SyncedModel):
     ticket_number = models.CharField(blank=True, null=True, max_length=50)
     completed_date = models.DateTimeField(blank=True, null=True)
     create_date = models.DateTimeField(blank=True, null=True)
@@ -449,7 +535,7 @@ class NonInternalTicketNoteManager(models.Manager):
         return super().get_queryset().exclude(publish=Note.INTERNAL_USERS)
 
 
-class TicketNote(TimeStampedModel, Note):
+class TicketNote(SyncedModel, Note):
     title = models.CharField(max_length=250, blank=True, null=True)
     description = models.CharField(max_length=3200)
     create_date_time = models.DateTimeField(blank=True, null=True)
@@ -488,7 +574,7 @@ class NonInternalTaskNoteManager(models.Manager):
         return super().get_queryset().exclude(publish=Note.INTERNAL_USERS)
 
 
-class TaskNote(TimeStampedModel, Note):
+class TaskNote(SyncedModel, Note):
     title = models.CharField(max_length=250)
     description = models.CharField(max_length=3200)
     create_date_time = models.DateTimeField(blank=True, null=True)
@@ -524,7 +610,7 @@ class TaskNote(TimeStampedModel, Note):
         })
 
 
-class Contact(TimeStampedModel):
+class Contact(SyncedModel):
 
     first_name = models.CharField(blank=True, null=True, max_length=200,
                                   db_index=True)
@@ -549,7 +635,7 @@ class Contact(TimeStampedModel):
                               self.last_name if self.last_name else '')
 
 
-class Account(TimeStampedModel):
+class Account(SyncedModel):
     MY_ACCOUNT = 0
     name = models.CharField(max_length=100,
                             db_index=True)
@@ -601,7 +687,7 @@ class AvailableProjectManager(models.Manager):
         )
 
 
-class Project(TimeStampedModel):
+class Project(SyncedModel):
     name = models.CharField(max_length=100)
     number = models.CharField(null=True, max_length=50)
     description = models.CharField(max_length=2000)
@@ -668,7 +754,7 @@ class Project(TimeStampedModel):
         return self.name
 
 
-class Phase(TimeStampedModel):
+class Phase(SyncedModel):
     title = models.CharField(blank=True, null=True, max_length=255)
     description = models.CharField(blank=True, null=True, max_length=8000)
     start_date = models.DateTimeField(blank=True, null=True)
@@ -695,7 +781,7 @@ class Phase(TimeStampedModel):
         return self.title
 
 
-class Task(TimeStampedModel):
+class Task(SyncedModel):
     MAX_DESCRIPTION = 8000
     title = models.CharField(blank=True, null=True, max_length=255)
     number = models.CharField(blank=True, null=True, max_length=50)
@@ -799,7 +885,7 @@ class TaskSecondaryResource(TimeStampedModel):
         return '{} {}'.format(self.resource, self.task)
 
 
-class TimeEntry(TimeStampedModel):
+class TimeEntry(SyncedModel):
     date_worked = models.DateTimeField(blank=True, null=True)
     start_date_time = models.DateTimeField(blank=True, null=True)
     end_date_time = models.DateTimeField(blank=True, null=True)
@@ -1016,7 +1102,7 @@ class ContractExclusionSetExcludedRole(models.Model):
         return str(self.id) or ''
 
 
-class ServiceCall(TimeStampedModel):
+class ServiceCall(SyncedModel):
     description = models.TextField(blank=True, null=True, max_length=2000)
     duration = models.DecimalField(
         blank=True, null=True, decimal_places=4, max_digits=9)
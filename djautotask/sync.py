@@ -1,28 +1,61 @@
 import logging
 import os
 import base64
-from dateutil.parser import parse
-from decimal import Decimal
-
-from django.db import transaction, IntegrityError
-from django.db.models import Q
+import contextvars
+import copy
+import datetime
+import hashlib
+import json
+import queue
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, connections, transaction, IntegrityError
+from django.db.models import BooleanField, CharField, DateTimeField, \
+    Exists, Max, OuterRef, Q, Value
 from django.utils import timezone
 
 from djautotask import api
+from djautotask import mapping
 from djautotask import models
 from .api import ApiCondition as A, AutotaskRecordNotFoundError
-from .utils import DjautotaskSettings, caption_to_snake_case, \
-    parse_udf, AT_DATA_TYPE_MAP
+from .mapping import Field as F
+from .utils import DjautotaskSettings, CompactIDSet, \
+    caption_to_snake_case, parse_api_datetime, parse_udf, AT_DATA_TYPE_MAP
 
 CREATED = 1
 UPDATED = 2
 SKIPPED = 3
 FILE_UMASK = 0o022
+# Part of every record fingerprint. Bump it when assignment code shared by
+# all synchronizers changes, so unchanged records are assigned again.
+FINGERPRINT_VERSION = 1
 
 
 logger = logging.getLogger(__name__)
 
 
+# Sent by the pipelined fetch producer after the last page.
+PAGES_DONE = object()
+
+
+class PageFetchError:
+    """Carries an error raised by the fetch producer to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class ShardSyncError(Exception):
+    """Raised by a sharded sync if any of its shards failed."""
+    pass
+
+
 class InvalidObjectException(Exception):
     """
     If for any reason an object can't be created (for example, it references
@@ -32,6 +65,128 @@ class InvalidObjectException(Exception):
     pass
 
 
+class RelationResolver:
+    """
+    Remember which primary keys of related models exist, so foreign keys can
+    be assigned by ID without a query per relation per record. Call prime()
+    with the IDs referenced by a page to look them all up with one query per
+    related model; IDs that weren't primed are looked up on demand.
+    """
+
+    def __init__(self):
+        self.known_ids = defaultdict(set)
+        self.missing_ids = defaultdict(set)
+
+    @staticmethod
+    def _key(model_class):
+        return model_class._meta.concrete_model
+
+    @staticmethod
+    def to_pk(model_class, uid):
+        """Normalise an ID from the API to the related model's PK type."""
+        try:
+            return model_class._meta.pk.to_python(uid)
+        except ValidationError:
+            return None
+
+    def prime(self, model_ids):
+        """
+        Resolve the given {model_class: ids} mapping, querying only IDs that
+        aren't already known to exist. IDs previously found missing are
+        checked again, as they may have been synced since.
+        """
+        for model_class, ids in model_ids.items():
+            key = self._key(model_class)
+            pks = {self.to_pk(model_class, uid) for uid in ids}
+            pks.discard(None)
+            pks -= self.known_ids[key]
+            self.missing_ids[key] = set()
+            if not pks:
+                continue
+
+            found = set(
+                key.objects.filter(pk__in=pks).values_list('pk', flat=True)
+            )
+            self.known_ids[key] |= found
+            self.missing_ids[key] = pks - found
+
+    def exists(self, model_class, pk):
+        key = self._key(model_class)
+        if pk in self.known_ids[key]:
+            return True
+        if pk in self.missing_ids[key]:
+            return False
+
+        if key.objects.filter(pk=pk).exists():
+            self.known_ids[key].add(pk)
+            return True
+        self.missing_ids[key].add(pk)
+        return False
+
+    def add(self, model_class, pk):
+        """Record a PK that was just saved, e.g. by the current sync."""
+        key = self._key(model_class)
+        self.known_ids[key].add(pk)
+        self.missing_ids[key].discard(pk)
+
+
+class MetadataCache:
+    """
+    Thread-safe cache of entity metadata documents, such as the
+    entityInformation/fields document that every picklist of an entity is
+    read from. Documents are keyed by URL, so synchronizers sharing a cache
+    download each document only once. Scope a cache to a single sync run.
+    """
+
+    def __init__(self):
+        self._documents = {}
+        self._lock = threading.Lock()
+        self._url_locks = defaultdict(threading.Lock)
+
+    def get(self, url, fetch):
+        """
+        Return the document at url, calling fetch() to download it if it
+        isn't cached yet. Concurrent callers for the same URL wait for the
+        first download instead of repeating it.
+        """
+        with self._lock:
+            url_lock = self._url_locks[url]
+
+        with url_lock:
+            if url not in self._documents:
+                self._documents[url] = fetch()
+            return self._documents[url]
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+def interactive_requests(f):
+    """
+    Make the API requests of the decorated method with interactive priority,
+    so they can use the share of the request budget reserved for users
+    waiting on a result.
+    """
+    def wrapper(*args, **kwargs):
+        with api.request_priority(api.PRIORITY_INTERACTIVE):
+            return f(*args, **kwargs)
+
+    return wrapper
+
+
+def prioritized_requests(f):
+    """
+    Make the API requests of the decorated synchronizer method with the
+    priority given by its sync_request_priority().
+    """
+    def wrapper(*args, **kwargs):
+        with api.request_priority(args[0].sync_request_priority()):
+            return f(*args, **kwargs)
+
+    return wrapper
+
+
 def log_sync_job(f):
     def wrapper(*args, **kwargs):
         sync_instance = args[0]
@@ -71,6 +226,13 @@ def log_sync_job(f):
     return wrapper
 
 
+def _as_utc(value):
+    # Autotask datetimes without an offset are in UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
 class SyncResults:
     """Track results of a sync job."""
 
@@ -79,7 +241,91 @@ class SyncResults:
         self.updated_count = 0
         self.skipped_count = 0
         self.deleted_count = 0
-        self.synced_ids = set()
+        self.synced_ids = CompactIDSet()
+        # The latest last_updated_field value of the records synced.
+        self.last_updated = None
+
+
+class StagedIDSet:
+    """
+    The IDs of the records seen by a full sync, written to the
+    SyncStagingID table in batches instead of being held in memory. The IDs
+    of the rows that existed when the sync started are staged with one
+    INSERT ... SELECT, so stale rows can be found with an anti-join in the
+    database.
+    """
+    flush_size = 1000
+
+    def __init__(self, sync_key=None):
+        # Pass the sync_key of IDs staged earlier to carry on with them.
+        self.sync_key = sync_key or uuid.uuid4().hex
+        self._pending = set()
+
+    def add(self, record_id):
+        if record_id is None:
+            return
+        self._pending.add(record_id)
+        if len(self._pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        models.SyncStagingID.objects.bulk_create(
+            [
+                models.SyncStagingID(
+                    sync_key=self.sync_key, record_id=record_id)
+                for record_id in self._pending
+            ],
+            ignore_conflicts=True,
+        )
+        self._pending.clear()
+
+    def stage_initial(self, queryset):
+        """Stage the primary keys of queryset as the initial IDs."""
+        staging = models.SyncStagingID._meta
+        select = queryset.order_by().annotate(
+            staged_sync_key=Value(self.sync_key, output_field=CharField()),
+            staged_initial=Value(True, output_field=BooleanField()),
+            staged_created=Value(
+                timezone.now(), output_field=DateTimeField()),
+        ).values_list(
+            'staged_sync_key', 'pk', 'staged_initial', 'staged_created')
+        sql, params = select.query.sql_with_params()
+        columns = ', '.join(
+            connection.ops.quote_name(staging.get_field(name).column)
+            for name in ('sync_key', 'record_id', 'initial', 'created')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {} ({}) {}'.format(
+                    connection.ops.quote_name(staging.db_table),
+                    columns, sql),
+                params
+            )
+
+    def initial_count(self):
+        return models.SyncStagingID.objects.filter(
+            sync_key=self.sync_key, initial=True).count()
+
+    def stale_ids(self):
+        """
+        Return a queryset of the initial IDs that weren't synced, for use
+        as a subquery.
+        """
+        self.flush()
+        synced = models.SyncStagingID.objects.filter(
+            sync_key=self.sync_key,
+            initial=False,
+            record_id=OuterRef('record_id'),
+        )
+        return models.SyncStagingID.objects.filter(
+            sync_key=self.sync_key, initial=True
+        ).filter(~Exists(synced)).values_list('record_id', flat=True)
+
+    def clear(self):
+        self._pending.clear()
+        models.SyncStagingID.objects.filter(sync_key=self.sync_key).delete()
 
 
 class ParentSynchronizer:
@@ -112,7 +358,7 @@ class ChildSynchronizer:
             ticket__id=query_params[1]
         ).values_list('id', flat=True)
 
-        return set(ids)
+        return CompactIDSet(ids.iterator())
 
     def _get_children(self, results, query_params):
         self._build_children_conditions(query_params)
@@ -154,16 +400,19 @@ class BatchQueryMixin:
     condition_pool = None
     condition_field_name = None
     batch_query_size = None
+    batch_query_workers = 1
     client = None
 
     def __init__(self, full=False, *args, **kwargs):
         settings = DjautotaskSettings().get_settings()
         self.batch_query_size = settings.get('batch_query_size')
+        self.batch_query_workers = max(
+            1, settings.get('batch_query_workers', 1))
         super().__init__(full, *args, **kwargs)
         self._add_conditions()
 
     def _add_conditions(self):
-        self.condition_pool = list(self.active_ids)
+        self.condition_pool = CompactIDSet(self.active_ids)
         self.client.add_condition(
             A(
                 op='in',
@@ -181,16 +430,89 @@ class BatchQueryMixin:
         field_ids = self.condition_pool
         batch_query_size = self.batch_query_size
 
-        while field_ids:
-            batch_condition = field_ids[:batch_query_size]
-            del field_ids[:batch_query_size]
+        if self.batch_query_workers > 1 and self.checkpoint is None:
+            return self.fetch_concurrently(
+                results,
+                [self.client_for(conditions).get
+                 for conditions in self._batch_conditions(field_ids)],
+                self.batch_query_workers,
+            )
+
+        after_id = self.resume_batch(results)
+        for batch_condition in field_ids.chunks(batch_query_size, after_id):
             self._replace_batch_conditions(self.client.conditions,
                                            batch_condition,
                                            self.condition_field_name)
-            self.fetch_records(results)
+            self.fetch_batch(results, batch_condition)
 
         return results
 
+    def shard_specs(self, shards):
+        groups = self._group_batches(
+            list(self.condition_pool.chunks(self.batch_query_size)), shards)
+        if groups is None:
+            return None
+        return [
+            {'ids': [i for batch in group for i in batch]}
+            for group in groups
+        ]
+
+    def apply_shard(self, spec):
+        self.condition_pool = CompactIDSet(spec['ids'])
+
+    @staticmethod
+    def _group_batches(batches, shards):
+        """
+        Split batches into up to shards lists of consecutive batches, or
+        return None if there aren't enough batches to split.
+        """
+        if len(batches) < 2:
+            return None
+        size = -(-len(batches) // shards)
+        return [batches[i:i + size] for i in range(0, len(batches), size)]
+
+    def resume_batch(self, results, field=None):
+        """
+        Finish the batch a resumed sync was fetching, if it stopped part way
+        through one, and return the ID the remaining batches start after.
+        """
+        after_id = self.resume_cursor.get('after_id')
+        if self.resume_cursor.get('next_url'):
+            self._set_batch_cursor(after_id, field)
+            self.fetch_records(results)
+            self.save_checkpoint(results)
+        return after_id
+
+    def fetch_batch(self, results, batch_condition, field=None):
+        # Everything up to the batch's last ID is synced once it's fetched.
+        self._set_batch_cursor(batch_condition[-1], field)
+        self.fetch_records(results)
+        self.save_checkpoint(results)
+
+    def _set_batch_cursor(self, after_id, field):
+        self.checkpoint_cursor = {'after_id': after_id}
+        if field:
+            self.checkpoint_cursor['field'] = field
+
+    def _batch_conditions(self, field_ids):
+        """
+        Yield a separate copy of the client conditions for each batch, so
+        batches can be fetched concurrently.
+        """
+        for batch_condition in field_ids.chunks(self.batch_query_size):
+            # The pool is replaced by the batch, so don't copy it.
+            conditions = copy.deepcopy(self.client.conditions,
+                                       {id(field_ids): field_ids})
+            self._replace_batch_conditions(conditions,
+                                           batch_condition,
+                                           self.condition_field_name)
+            yield conditions
+
+    def watermark_conditions(self):
+        # The pool of IDs changes between syncs, but not what's synced.
+        return [c for c in self.client.conditions
+                if c.field != self.condition_field_name]
+
     def _replace_batch_conditions(self, conditions, batch_condition,
                                   condition_field_name):
         for c in conditions:
@@ -211,13 +533,34 @@ class MultiConditionBatchQueryMixin(BatchQueryMixin):
                 field_name: A(
                     op='in',
                     field=field_name,
-                    value=active_ids
+                    value=CompactIDSet(active_ids)
                 )
             })
 
     def get(self, results):
 
+        if self.batch_query_workers > 1 and self.checkpoint is None:
+            return self.fetch_concurrently(
+                results,
+                [self.client_for(conditions).get
+                 for conditions in self._batch_conditions()],
+                self.batch_query_workers,
+            )
+
+        resume_field = self.resume_cursor.get('field')
+        if resume_field not in self.multi_conditions:
+            # The cursor is from the start of the sync or a field that has
+            # no IDs now.
+            self.resume_cursor = {}
+
         for condition_field_name, condition in self.multi_conditions.items():
+            after_id = None
+            if self.resume_cursor:
+                if condition_field_name != resume_field:
+                    continue
+                after_id = self.resume_batch(results, condition_field_name)
+                self.resume_cursor = {}
+
             field_ids = condition.value
             batch_query_size = self.batch_query_size
             idx_condition = self.client.add_condition(
@@ -228,23 +571,85 @@ class MultiConditionBatchQueryMixin(BatchQueryMixin):
                 )
             )
 
-            while field_ids:
-                batch_condition = field_ids[:batch_query_size]
-                del field_ids[:batch_query_size]
+            for batch_condition in field_ids.chunks(batch_query_size,
+                                                    after_id):
                 self._replace_batch_conditions(self.client.conditions,
                                                batch_condition,
                                                condition_field_name)
-                self.fetch_records(results)
+                self.fetch_batch(
+                    results, batch_condition, condition_field_name)
 
             self.client.remove_condition(idx_condition)
 
         return results
 
+    def shard_specs(self, shards):
+        groups = self._group_batches([
+            (field_name, batch)
+            for field_name, condition in self.multi_conditions.items()
+            for batch in condition.value.chunks(self.batch_query_size)
+        ], shards)
+        if groups is None:
+            return None
+
+        specs = []
+        for group in groups:
+            fields = defaultdict(list)
+            for field_name, batch in group:
+                fields[field_name].extend(batch)
+            specs.append({'fields': dict(fields)})
+        return specs
+
+    def apply_shard(self, spec):
+        self.multi_conditions = {
+            field_name: A(
+                op='in',
+                field=field_name,
+                value=CompactIDSet(ids)
+            )
+            for field_name, ids in spec['fields'].items()
+        }
+
+    def _batch_conditions(self):
+        for condition_field_name, condition in self.multi_conditions.items():
+            field_ids = condition.value
+            for batch_condition in field_ids.chunks(self.batch_query_size):
+                conditions = copy.deepcopy(self.client.conditions)
+                conditions.add(
+                    A(
+                        op='in',
+                        field=condition_field_name,
+                        value=batch_condition
+                    )
+                )
+                yield conditions
+
 
 class Synchronizer:
     lookup_key = 'id'
     last_updated_field = 'lastActivityDate'
     bulk_prune = True
+    # Set to False on synchronizers whose records can't be matched to rows
+    # by primary key alone, so pages are always persisted record by record.
+    bulk_persist_supported = True
+    # Set to False on synchronizers that don't page through a query of
+    # records with integer IDs, so they are never split into ID ranges.
+    partition_supported = True
+    # Priority of the requests made by sync() against the request budget.
+    # Full syncs always run at low priority.
+    request_priority = api.PRIORITY_NORMAL
+    # The model fields assigned from each API record, as a tuple of
+    # mapping.Field. Relations are assigned from related_meta.
+    field_map = None
+    # API fields read by _assign_field_data, apart from the relations in
+    # related_meta. If set, and the include_fields setting is on, queries
+    # only ask Autotask for the fields the synchronizer uses; if None, every
+    # field is returned. Subclasses that read other fields must add them.
+    include_fields = None
+    # Part of the fingerprints of this synchronizer's records. Bump it when
+    # field_map or _assign_field_data changes, so unchanged records are
+    # assigned again.
+    mapping_version = 1
 
     def __init__(self, full=False, *args, **kwargs):
         self.client = self.client_class(
@@ -252,8 +657,96 @@ class Synchronizer:
         )
         self.full = full
         request_settings = DjautotaskSettings().get_settings()
+        if request_settings.get('include_fields', False):
+            self.client.include_fields = self.get_include_fields()
         self.mass_delete_protection = request_settings.get(
             'mass_delete_protection', True)
+        self.staged_prune = request_settings.get('staged_prune', False)
+        self.bulk_persist = self.bulk_persist_supported and \
+            request_settings.get('bulk_persist', False)
+        self.relations = RelationResolver()
+        self.metadata_cache = kwargs.get('metadata_cache')
+        if self.metadata_cache is None:
+            self.metadata_cache = MetadataCache()
+        self.pipeline_fetch = request_settings.get('pipeline_fetch', False)
+        self.stream_pages = request_settings.get('stream_pages', False)
+        self.stream_batch_size = max(
+            1, request_settings.get('stream_batch_size', 50))
+        self.pipeline_queue_pages = max(
+            1, request_settings.get('pipeline_queue_pages', 2))
+        self.partition_workers = max(
+            1, request_settings.get('partition_workers', 1))
+        self.partition_min_records = request_settings.get(
+            'partition_min_records', 5000)
+        self.force_reassign = kwargs.get('force_reassign', False)
+        self.watermark_overlap = datetime.timedelta(
+            minutes=request_settings.get('watermark_overlap_minutes', 5))
+        # Full syncs can save checkpoints to resume from if they fail.
+        self.resume = kwargs.get('resume', False)
+        self.checkpoints = self.full and (
+            self.resume or request_settings.get('sync_checkpoints', False))
+        self.checkpoint_expiry = datetime.timedelta(
+            hours=request_settings.get('checkpoint_expiry_hours', 24))
+        # The SyncCheckpoint of the running sync, the cursor it resumes
+        # from, and the part of the cursor that locates the current batch.
+        self.checkpoint = None
+        self.resume_cursor = {}
+        self.checkpoint_cursor = {}
+        # The last_updated_field value a partial sync fetches records after.
+        self.watermark_cutoff = None
+        # The client removes NUL characters while decoding, unless that's
+        # turned off, in which case the field mapper removes them.
+        self.mapper_strips_nulls = not request_settings.get(
+            'decode_strip_nulls', True)
+        # Fields like the modified timestamp that set themselves on save,
+        # and must be written along with whatever changed.
+        self.auto_update_fields = [
+            f.attname for f in self.model_class._meta.concrete_fields
+            if getattr(f, 'auto_now', False)
+        ]
+        self.fingerprint_enabled = any(
+            f.name == 'sync_fingerprint'
+            for f in self.model_class._meta.concrete_fields
+        )
+        # The FK columns of related_meta, checked before skipping a record
+        # whose fingerprint matches.
+        self.relation_attnames = [
+            (json_field, self.model_class._meta.get_field(field_name).attname)
+            for json_field, (_, field_name) in (
+                getattr(self, 'related_meta', None) or {}).items()
+        ]
+
+    def get_include_fields(self):
+        """
+        Return the sorted API field names this synchronizer consumes, or
+        None if it doesn't declare them.
+        """
+        if self.include_fields is None:
+            return None
+
+        fields = set(self.include_fields)
+        fields.update(getattr(self, 'related_meta', None) or {})
+        fields.add(self.lookup_key)
+        if self.last_updated_field:
+            fields.add(self.last_updated_field)
+        return sorted(fields)
+
+    def prime_relations(self, records):
+        """
+        Look up all the related records referenced by a page of records,
+        with one query per related model.
+        """
+        related_meta = getattr(self, 'related_meta', None)
+        if not related_meta:
+            return
+
+        model_ids = defaultdict(set)
+        for json_field, (model_class, _) in related_meta.items():
+            for record in records:
+                uid = record.get(json_field)
+                if uid is not None and uid != '':
+                    model_ids[model_class].add(uid)
+        self.relations.prime(model_ids)
 
     def set_relations(self, instance, json_data):
         for json_field, value in self.related_meta.items():
@@ -292,13 +785,16 @@ class Synchronizer:
         """
         uid = json_data.get(json_field)
 
-        try:
-            if uid is not None and uid != '':
-                related_instance = model_class.objects.get(pk=uid)
-                setattr(instance, model_field, related_instance)
-            else:
-                self._assign_null_relation(instance, model_field)
-        except model_class.DoesNotExist:
+        if uid is None or uid == '':
+            self._assign_null_relation(instance, model_field)
+            return
+
+        pk = self.relations.to_pk(model_class, uid)
+        if pk is not None and self.relations.exists(model_class, pk):
+            # Assign by ID, the resolver has already confirmed it exists.
+            setattr(instance, instance._meta.get_field(model_field).attname,
+                    pk)
+        else:
             logger.warning(
                 'Failed to find {} {} for {} {}.'.format(
                     json_field,
@@ -308,6 +804,9 @@ class Synchronizer:
                 )
             )
             self._assign_null_relation(instance, model_field)
+            # Don't let the fingerprint skip this record next time, the
+            # related record may have been synced by then.
+            instance._unresolved_relation = True
 
     def _instance_ids(self, filter_params=None):
         # self.lookup_key is used only for json_data. In DB, id is fixed for
@@ -319,33 +818,401 @@ class Synchronizer:
         else:
             ids = self.model_class.objects.filter(filter_params).values_list(
                 db_lookup_key, flat=True)
-        return set(ids)
+        return CompactIDSet(ids.iterator())
 
     def get(self, results):
+        # Pages fetched concurrently arrive out of order, so a checkpointed
+        # sync fetches them one after another.
+        if self.partition_supported and self.partition_workers > 1 and \
+                self.checkpoint is None:
+            partitions = self.partition_conditions(self.partition_workers)
+            if partitions:
+                return self.fetch_concurrently(
+                    results,
+                    [self.client_for(conditions).get
+                     for conditions in partitions],
+                    self.partition_workers,
+                )
         return self.fetch_records(results)
 
     def fetch_records(self, results):
         """
         For all pages of results, save each page of results to the DB.
         """
-        next_url = None
+        if self.pipeline_fetch and self.checkpoint is None:
+            return self.fetch_records_pipelined(results)
+
+        next_url = self.resume_cursor.pop('next_url', None)
+        if next_url:
+            self.client.cached_body = self.resume_cursor.pop(
+                'request_body', None)
         while True:
             logger.info(
                 'Fetching {} records'.format(
                     self.model_class.__bases__[0].__name__)
             )
-            api_return = self.get_page(next_url)
-            page = api_return.get("items")
-            next_url = api_return.get("pageDetails").get("nextPageUrl")
-            self.persist_page(page, results)
+            if self.stream_pages:
+                next_url = self.persist_streamed_page(next_url, results)
+            else:
+                api_return = self.get_page(next_url)
+                page = api_return.get("items")
+                next_url = api_return.get("pageDetails").get("nextPageUrl")
+                self.persist_page(page, results)
 
             if not next_url:
                 break
+            self.save_checkpoint(results, next_url=next_url)
 
         return results
 
+    def save_checkpoint(self, results, next_url=None):
+        """
+        Save where a checkpointed sync has got to: the current batch and,
+        within it, the URL of the next page, if any. The IDs synced so far
+        are flushed first, so they're staged along with the cursor.
+        """
+        if self.checkpoint is None:
+            return
+
+        results.synced_ids.flush()
+        cursor = dict(self.checkpoint_cursor)
+        if next_url:
+            cursor['next_url'] = next_url
+            if self.client.cached_body:
+                # POST queries send their query again with each page.
+                cursor['request_body'] = self.client.cached_body
+        self.checkpoint.cursor = cursor
+        self.checkpoint.save(update_fields=['cursor', 'updated'])
+
+    def start_checkpoint(self, scope, started):
+        """
+        Return the StagedIDSet of a checkpointed full sync of scope. If
+        resume is set and the scope has a checkpoint that hasn't expired,
+        carry on from it; otherwise discard any checkpoint and start again
+        by staging the IDs of the existing records. Expired checkpoints of
+        any scope are discarded, so those of killed syncs don't pile up.
+        """
+        checkpoints = models.SyncCheckpoint.objects.filter(
+            synchronizer=self.__class__.__name__)
+        expired = checkpoints.filter(
+            updated__lt=timezone.now() - self.checkpoint_expiry)
+        for checkpoint in expired:
+            StagedIDSet(checkpoint.sync_key).clear()
+            checkpoint.delete()
+
+        checkpoint = checkpoints.filter(scope=scope).first()
+        if checkpoint is not None:
+            if self.resume:
+                logger.info('Resuming {} sync from checkpoint {}'.format(
+                    self.model_class.__bases__[0].__name__,
+                    checkpoint.cursor))
+                self.checkpoint = checkpoint
+                self.resume_cursor = dict(checkpoint.cursor)
+                return StagedIDSet(checkpoint.sync_key)
+
+            # An old cursor may point at pages that have since changed.
+            StagedIDSet(checkpoint.sync_key).clear()
+            checkpoint.delete()
+
+        staged_ids = StagedIDSet()
+        staged_ids.stage_initial(self.model_class.objects.all())
+        self.checkpoint = models.SyncCheckpoint.objects.create(
+            synchronizer=self.__class__.__name__,
+            scope=scope,
+            sync_key=staged_ids.sync_key,
+            started=started,
+        )
+        return staged_ids
+
+    def persist_streamed_page(self, next_url, results):
+        """
+        Fetch a page as a StreamedPage and persist its records in batches
+        of stream_batch_size as they are decoded, so the whole page is never
+        held in memory. Returns the URL of the next page.
+        """
+        page = self.get_page(next_url, stream=True)
+        if not isinstance(page, api.StreamedPage):
+            # The client returned the page decoded as a whole.
+            self.persist_page(page.get('items'), results)
+            return page.get('pageDetails').get('nextPageUrl')
+
+        with closing(page):
+            records = page.items()
+            while True:
+                batch = list(islice(records, self.stream_batch_size))
+                if not batch:
+                    break
+                self.persist_page(batch, results)
+            return page.get('pageDetails', {}).get('nextPageUrl')
+
+    def fetch_records_pipelined(self, results):
+        """
+        Like fetch_records, but download the next pages on a producer thread
+        while the current page is persisted on this thread.
+        """
+        return self.fetch_concurrently(results, [self.get_page])
+
+    def fetch_concurrently(self, results, page_getters, workers=1):
+        """
+        Follow the pages of each of page_getters on up to workers threads,
+        and persist the pages on this thread as they arrive. A page getter
+        is called like get_page, with the nextPageUrl of the previous page.
+        At most max(workers, pipeline_queue_pages) pages are buffered; the
+        fetching threads wait when the buffer is full. All DB work stays on
+        the calling thread.
+        """
+        pages = queue.Queue(
+            maxsize=max(workers, self.pipeline_queue_pages))
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(get_page):
+            next_url = None
+            try:
+                while True:
+                    logger.info(
+                        'Fetching {} records'.format(
+                            self.model_class.__bases__[0].__name__)
+                    )
+                    api_return = get_page(next_url)
+                    next_url = api_return.get("pageDetails").get(
+                        "nextPageUrl")
+                    if not put(api_return.get("items")) or not next_url:
+                        break
+                put(PAGES_DONE)
+            except Exception as e:
+                put(PageFetchError(e))
+            finally:
+                # Close any connection opened on this thread.
+                connections.close_all()
+
+        executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='{}-fetch'.format(self.__class__.__name__),
+        )
+        # Run each producer in a copy of this context, so its requests keep
+        # this thread's request priority.
+        futures = [
+            executor.submit(contextvars.copy_context().run, produce, get_page)
+            for get_page in page_getters
+        ]
+        try:
+            remaining = len(futures)
+            while remaining:
+                page = pages.get()
+                if page is PAGES_DONE:
+                    remaining -= 1
+                elif isinstance(page, PageFetchError):
+                    raise page.error
+                else:
+                    self.persist_page(page, results)
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        return results
+
+    def client_for(self, conditions):
+        """
+        Return a copy of the client that queries with conditions, so it can
+        be used on another thread without sharing query state.
+        """
+        client = copy.copy(self.client)
+        client.conditions = conditions
+        client.cached_body = None
+        return client
+
+    def count_records(self, conditions):
+        return self.client_for(conditions).count().get('queryCount', 0)
+
+    @staticmethod
+    def _with_id_range(conditions, start=None, end=None):
+        conditions = copy.deepcopy(conditions)
+        if start is not None:
+            conditions.add(A(op='gte', field='id', value=start))
+        if end is not None:
+            conditions.add(A(op='lt', field='id', value=end))
+        return conditions
+
+    def partition_conditions(self, partitions):
+        """
+        Split the client conditions into ID ranges holding about the same
+        number of records, using count queries to find the boundaries. The
+        first and last ranges are open-ended, so together the ranges match
+        exactly the records of the original query. Returns None if there
+        are fewer than partition_min_records records.
+        """
+        ranges = self.partition_ranges(partitions)
+        if ranges is None:
+            return None
+        return [
+            self._with_id_range(self.client.conditions, start, end)
+            for start, end in ranges
+        ]
+
+    def partition_ranges(self, partitions):
+        """
+        Return the (start, end) ID ranges of partition_conditions, with None
+        for the open ends.
+        """
+        conditions = self.client.conditions
+        total = self.count_records(conditions)
+        if total < max(self.partition_min_records, partitions):
+            return None
+
+        # Boundaries don't need to be exact, stop searching when a range
+        # is within 10% of its target size.
+        tolerance = max(1, total // (partitions * 10))
+        upper = self._id_upper_bound(conditions)
+
+        boundaries = []
+        lower = 0
+        for i in range(1, partitions):
+            boundary = self._id_boundary(
+                conditions, total * i // partitions, lower, upper, tolerance)
+            if lower < boundary < upper:
+                boundaries.append(boundary)
+                lower = boundary
+
+        edges = [None] + boundaries + [None]
+        logger.info('Partitioned {} {} records at IDs {}'.format(
+            total, self.model_class.__bases__[0].__name__, boundaries))
+        return list(zip(edges, edges[1:]))
+
+    def _id_upper_bound(self, conditions):
+        """Return an ID greater than the ID of every matching record."""
+        upper = self.model_class.objects.aggregate(
+            Max('id'))['id__max'] or 0
+        upper = max(upper + 1, 1024)
+        while self.count_records(
+                self._with_id_range(conditions, start=upper)):
+            upper *= 2
+        return upper
+
+    def _id_boundary(self, conditions, target, lower, upper, tolerance):
+        """
+        Binary search for an ID that about target matching records are
+        below.
+        """
+        while upper - lower > 1:
+            middle = (lower + upper) // 2
+            below = self.count_records(
+                self._with_id_range(conditions, end=middle))
+            if abs(below - target) <= tolerance:
+                return middle
+            if below < target:
+                lower = middle
+            else:
+                upper = middle
+        return upper
+
+    def fingerprint_salt(self):
+        return '{}:{}:{}'.format(
+            FINGERPRINT_VERSION, self.__class__.__name__, self.mapping_version)
+
+    def fingerprint(self, record):
+        """
+        Return a digest of the API record and of the code that assigns it,
+        which changes if either does.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.fingerprint_salt().encode())
+        digest.update(json.dumps(
+            record, sort_keys=True, separators=(',', ':'), default=str
+        ).encode())
+        return digest.hexdigest()
+
+    def relations_lost(self, record, fk_values):
+        """
+        Return True if a relation the record refers to is null on its row,
+        given the row's {attname: value} FK values. That happens when the
+        related row was deleted and the FK set to null, and the record must
+        then be assigned again, though its fingerprint hasn't changed.
+        """
+        for json_field, attname in self.relation_attnames:
+            uid = record.get(json_field)
+            if uid is not None and uid != '' and \
+                    fk_values.get(attname) is None:
+                return True
+        return False
+
+    def _assign_fingerprint(self, instance, fingerprint):
+        if not self.fingerprint_enabled:
+            return
+        if getattr(instance, '_unresolved_relation', False):
+            instance.sync_fingerprint = None
+        else:
+            instance.sync_fingerprint = fingerprint
+
+    def skip_unchanged(self, records, results):
+        """
+        Count the records whose fingerprint matches the one stored on their
+        row as skipped, with one query, and return the others.
+        """
+        if not self.fingerprint_enabled or self.force_reassign:
+            return records
+
+        records = [self.remove_null_characters(r) for r in records]
+        attnames = [attname for _, attname in self.relation_attnames]
+        stored = {
+            row['pk']: row for row in self.model_class.objects.filter(
+                pk__in=[self.get_record_id(r) for r in records]
+            ).exclude(
+                sync_fingerprint=None
+            ).values('pk', 'sync_fingerprint', *attnames)
+        }
+        if not stored:
+            return records
+
+        changed = []
+        for record in records:
+            record_id = self.get_record_id(record)
+            row = stored.get(record_id)
+            if row is not None and \
+                    row['sync_fingerprint'] == self.fingerprint(record) and \
+                    not self.relations_lost(record, row):
+                results.skipped_count += 1
+                results.synced_ids.add(record_id)
+            else:
+                changed.append(record)
+        return changed
+
     def persist_page(self, records, results):
         """Persist one page of records to DB."""
+        self.track_last_updated(records, results)
+        records = self.skip_unchanged(records, results)
+        self.prime_relations(records)
+        if self.bulk_persist:
+            return self.bulk_persist_page(records, results)
+        return self.persist_records(records, results)
+
+    def track_last_updated(self, records, results):
+        """Keep the latest last_updated_field value of records in results."""
+        if not self.last_updated_field or not records:
+            return
+
+        values = [
+            record.get(self.last_updated_field) for record in records]
+        latest = max(
+            (_as_utc(parse_api_datetime(value)) for value in values if value),
+            default=None
+        )
+        if latest is not None and (results.last_updated is None or
+                                   latest > results.last_updated):
+            results.last_updated = latest
+
+    def persist_records(self, records, results):
+        """Persist records to DB one at a time."""
         for record in records:
             try:
                 with transaction.atomic():
@@ -363,6 +1230,121 @@ class Synchronizer:
 
         return results
 
+    def bulk_persist_page(self, records, results):
+        """
+        Persist one page of records with a fixed number of queries. Existing
+        rows are loaded with one in_bulk, field data is assigned in memory,
+        and rows are written with bulk_create and bulk_update. If the bulk
+        write raises an IntegrityError, the page is persisted again record
+        by record.
+        """
+        records = [self.remove_null_characters(r) for r in records]
+        record_ids = [self.get_record_id(r) for r in records]
+        existing = self.model_class.objects.in_bulk(set(record_ids))
+
+        created = []
+        updated = []
+        skipped_count = 0
+        for record_id, record in zip(record_ids, records):
+            instance = existing.get(record_id)
+            is_new = instance is None
+            if is_new:
+                instance = self.model_class()
+
+            fingerprint = self.fingerprint(record) \
+                if self.fingerprint_enabled else None
+            try:
+                self._assign_field_data(instance, record)
+            except InvalidObjectException as e:
+                logger.warning('{}'.format(e))
+                continue
+            self._assign_fingerprint(instance, fingerprint)
+
+            if is_new:
+                created.append(instance)
+            elif instance.tracker.changed():
+                updated.append(instance)
+            else:
+                skipped_count += 1
+
+        try:
+            with transaction.atomic():
+                self._bulk_write(created, updated)
+        except IntegrityError as e:
+            logger.warning(
+                'IntegrityError during bulk write of {} records, falling '
+                'back to per-record writes. Error: {}'.format(
+                    self.model_class.__bases__[0].__name__, e)
+            )
+            return self.persist_records(records, results)
+
+        for instance in created:
+            self.relations.add(self.model_class, instance.pk)
+
+        logger.info(
+            'Bulk persisted {} page - Created: {}, Updated: {}, '
+            'Skipped: {}'.format(self.model_class.__bases__[0].__name__,
+                                 len(created), len(updated), skipped_count)
+        )
+
+        results.created_count += len(created)
+        results.updated_count += len(updated)
+        results.skipped_count += skipped_count
+        for record_id in record_ids:
+            results.synced_ids.add(record_id)
+
+        return results
+
+    def _bulk_write(self, created, updated):
+        fields = [
+            f for f in self.model_class._meta.concrete_fields
+            if not f.primary_key
+        ]
+
+        if created:
+            if getattr(connection.features,
+                       'supports_update_conflicts_with_target', False):
+                # INSERT ... ON CONFLICT, so a row created by another
+                # process since in_bulk ran is updated instead of failing
+                # the whole page. Its creation time is kept.
+                self.model_class.objects.bulk_create(
+                    created,
+                    update_conflicts=True,
+                    unique_fields=[self.model_class._meta.pk.name],
+                    update_fields=[
+                        f.name for f in fields
+                        if not getattr(f, 'auto_now_add', False)
+                    ],
+                )
+            else:
+                self.model_class.objects.bulk_create(created)
+
+        # Write each set of changed fields with its own bulk_update, so a
+        # page where only activity dates moved doesn't rewrite descriptions
+        # and UDF data.
+        groups = defaultdict(list)
+        for instance in updated:
+            groups[tuple(self.changed_fields(instance))].append(instance)
+
+        for changed_fields, instances in groups.items():
+            for instance in instances:
+                # bulk_update skips Model.save, so apply auto-updated values
+                # such as the modified timestamp ourselves.
+                for field in fields:
+                    setattr(instance, field.attname,
+                            field.pre_save(instance, False))
+            self.model_class.objects.bulk_update(instances, changed_fields)
+
+    def changed_fields(self, instance):
+        """
+        Return the fields to write when updating instance, i.e. the fields
+        FieldTracker reports as changed plus the auto-updated ones, so large
+        columns that didn't change aren't rewritten.
+        """
+        fields = set(instance.tracker.changed())
+        fields.update(self.auto_update_fields)
+        return sorted(fields)
+
     def get_record_id(self, record):
         return int(record[self.lookup_key])
 
@@ -372,16 +1354,31 @@ class Synchronizer:
     def get_single(self, instance_id):
         return self.client.get_single(instance_id)
 
-    def _assign_field_data(self, instance, api_instance):
-        raise NotImplementedError
+    @classmethod
+    def get_field_mapper(cls, strip_nulls=True):
+        """Return field_map compiled, once per synchronizer class."""
+        mappers = cls.__dict__.get('_field_mappers')
+        if mappers is None:
+            mappers = cls._field_mappers = {}
+        mapper = mappers.get(strip_nulls)
+        if mapper is None:
+            mapper = mapping.FieldMapper(cls.field_map, strip_nulls)
+            mappers[strip_nulls] = mapper
+        return mapper
 
-    def _set_datetime_attribute(self, instance, attribute_name):
-        if getattr(instance, attribute_name):
-            setattr(instance,
-                    attribute_name,
-                    parse(getattr(instance, attribute_name))
-                    )
+    def _assign_field_data(self, instance, json_data):
+        if self.field_map is None:
+            raise NotImplementedError
+
+        mapper = self.get_field_mapper(self.mapper_strips_nulls)
+        mapper.assign(instance, json_data)
+
+        if getattr(self, 'related_meta', None):
+            self.set_relations(instance, json_data)
 
+        return instance
+
+    @interactive_requests
     def fetch_sync_by_id(self, instance_id):
         api_instance = self.get_single(instance_id)
         instance, created = \
@@ -401,8 +1398,19 @@ class Synchronizer:
             instance = self.model_class()
             result = CREATED
 
+        fingerprint = self.fingerprint(api_instance) \
+            if self.fingerprint_enabled else None
+        if result != CREATED and not self.force_reassign and \
+                fingerprint is not None and \
+                instance.sync_fingerprint == fingerprint and \
+                not self.relations_lost(api_instance, instance.__dict__):
+            logger.info('Skipped unchanged: {} {}'.format(
+                self.model_class.__bases__[0].__name__, instance))
+            return instance, SKIPPED
+
         try:
             self._assign_field_data(instance, api_instance)
+            self._assign_fingerprint(instance, fingerprint)
 
             # This will return the created instance, the updated instance, or
             # if the instance is skipped an unsaved copy of the instance.
@@ -411,8 +1419,9 @@ class Synchronizer:
                     instance.save(force_insert=True)
                 else:
                     instance.save()
+                self.relations.add(self.model_class, instance.pk)
             elif instance.tracker.changed():
-                instance.save()
+                instance.save(update_fields=self.changed_fields(instance))
                 result = UPDATED
             else:
                 result = SKIPPED
@@ -444,11 +1453,16 @@ class Synchronizer:
         Delete records that existed when sync started but were
         not seen as we iterated through all records from REST API.
         """
-        stale_ids = initial_ids - synced_ids
-
-        if stale_ids and self.full and self.mass_delete_protection:
+        if isinstance(synced_ids, StagedIDSet):
+            stale_ids = synced_ids.stale_ids()
+            total_count = synced_ids.initial_count()
+            delete_count = stale_ids.count()
+        else:
+            stale_ids = initial_ids - synced_ids
             total_count = len(initial_ids)
             delete_count = len(stale_ids)
+
+        if delete_count and self.full and self.mass_delete_protection:
             if total_count > 0 and delete_count / total_count > 0.9:
                 logger.exception(
                     'Mass delete protection: Aborting deletion of '
@@ -460,13 +1474,13 @@ class Synchronizer:
                 return 0
 
         deleted_count = 0
-        if stale_ids:
+        if delete_count:
             delete_qset = self.get_delete_qset(stale_ids)
             deleted_count = delete_qset.count()
 
             logger.info(
                 'Removing {} stale records for model: {}'.format(
-                    len(stale_ids), self.model_class.__bases__[0].__name__,
+                    delete_count, self.model_class.__bases__[0].__name__,
                 )
             )
             if self.bulk_prune:
@@ -496,38 +1510,241 @@ class Synchronizer:
     def create(self, **kwargs):
         raise NotImplementedError()
 
-    @log_sync_job
-    def sync(self):
+    def sync_request_priority(self):
+        if self.full:
+            return api.PRIORITY_LOW
+        return self.request_priority
+
+    def watermark_conditions(self):
+        """Return the client conditions that select the records synced."""
+        return list(self.client.conditions)
+
+    def watermark_scope(self):
+        """
+        Return a digest of the sync's filter conditions, so a watermark is
+        only used by syncs of the same records, or '' if there are none.
+        """
+        conditions = [
+            c.format_condition() for c in self.watermark_conditions()]
+        if not conditions:
+            return ''
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(
+            conditions, sort_keys=True, separators=(',', ':'), default=str
+        ).encode())
+        return digest.hexdigest()
+
+    def get_watermark(self, scope):
+        """
+        Return the time a partial sync of scope fetches the records updated
+        after. Until any watermark is saved for this synchronizer, that's the
+        start of the last successful sync job, as it was before watermarks;
+        after that, a scope without a watermark is synced in full.
+        """
+        watermarks = {
+            w.scope: w.watermark for w in models.SyncWatermark.objects.filter(
+                synchronizer=self.__class__.__name__)
+        }
+        if watermarks:
+            return watermarks.get(scope)
+
         sync_job_qset = self.get_sync_job_qset().filter(success=True)
+        if sync_job_qset.count() > 1:
+            return sync_job_qset.last().start_time
+        return None
 
-        if sync_job_qset.count() > 1 and self.last_updated_field \
-                and not self.full:
-            last_sync_job_time = sync_job_qset.last().start_time.strftime(
-                '%Y-%m-%dT%H:%M:%S.%fZ')
-            self.client.add_condition(
-                A(
-                    field=self.last_updated_field,
-                    value=last_sync_job_time,
-                    op="gt"
-                )
+    def save_watermark(self, scope, results, started, previous=None):
+        """
+        Save the latest last-updated time synced, less the overlap, as the
+        watermark of scope. It's never later than the sync's start, so
+        records changed while it ran are fetched again, and partial syncs
+        never move it back.
+        """
+        if results.last_updated is None:
+            return
+
+        watermark = min(results.last_updated, started) - self.watermark_overlap
+        if previous is not None and not self.full:
+            watermark = max(watermark, previous)
+        models.SyncWatermark.objects.update_or_create(
+            synchronizer=self.__class__.__name__,
+            scope=scope,
+            defaults={'watermark': watermark},
+        )
+
+    def shard_specs(self, shards):
+        """
+        Return the specs of up to shards parts of the records to sync, for
+        a sharded sync, or None if they aren't split.
+        """
+        if not self.partition_supported:
+            return None
+        ranges = self.partition_ranges(shards)
+        if ranges is None:
+            return None
+        return [{'id_range': [start, end]} for start, end in ranges]
+
+    def apply_shard(self, spec):
+        """Limit the sync to the records of the shard spec."""
+        start, end = spec['id_range']
+        self.client.conditions = self._with_id_range(
+            self.client.conditions, start, end)
+        self.partition_workers = 1
+
+    def get_sharded(self, results, workers, spawn):
+        """
+        Split the records into shards, saved as SyncShard rows, and call
+        spawn(run_key, workers) to sync them. spawn runs run_shard_worker in
+        that many processes and returns once they have exited. The shards'
+        results are added to results. Falls back to get if the records
+        aren't split.
+        """
+        specs = self.shard_specs(workers)
+        if not specs:
+            return self.get(results)
+
+        run_key = uuid.uuid4().hex
+        models.SyncShard.objects.bulk_create([
+            models.SyncShard(
+                run_key=run_key,
+                index=index,
+                synchronizer=self.__class__.__name__,
+                full=self.full,
+                sync_key=getattr(results.synced_ids, 'sync_key', ''),
+                spec=dict(spec, after=self.watermark_cutoff,
+                          force_reassign=self.force_reassign),
+            )
+            for index, spec in enumerate(specs)
+        ])
+        logger.info('Syncing {} records in {} shards'.format(
+            self.model_class.__bases__[0].__name__, len(specs)))
+        try:
+            spawn(run_key, min(workers, len(specs)))
+            shards = list(models.SyncShard.objects.filter(
+                run_key=run_key).order_by('index'))
+        finally:
+            models.SyncShard.objects.filter(run_key=run_key).delete()
+
+        for shard in shards:
+            results.created_count += shard.added
+            results.updated_count += shard.updated
+            results.skipped_count += shard.skipped
+            if shard.last_updated is not None and (
+                    results.last_updated is None or
+                    shard.last_updated > results.last_updated):
+                results.last_updated = shard.last_updated
+
+        failed = [s for s in shards if s.status != models.SyncShard.DONE]
+        if failed:
+            raise ShardSyncError('{} of {} {} shards failed: {}'.format(
+                len(failed), len(shards),
+                self.model_class.__bases__[0].__name__,
+                '; '.join(s.message or self.shard_status(s) for s in failed)
+            ))
+        return results
+
+    def shard_status(self, shard):
+        if shard.status == models.SyncShard.PENDING:
+            return 'shard {} was never claimed by a worker'.format(
+                shard.index)
+        return 'shard {} {}'.format(shard.index, shard.status)
+
+    @prioritized_requests
+    def sync_shard(self, shard):
+        """Sync the records of a shard, in a worker process."""
+        if shard.spec.get('after'):
+            self.add_watermark_condition(shard.spec['after'])
+        self.apply_shard(shard.spec)
+
+        results = SyncResults()
+        if shard.sync_key:
+            results.synced_ids = StagedIDSet(shard.sync_key)
+        results = self.get(results)
+        if shard.sync_key:
+            results.synced_ids.flush()
+        return results
+
+    def add_watermark_condition(self, cutoff):
+        self.watermark_cutoff = cutoff
+        self.client.add_condition(
+            A(
+                field=self.last_updated_field,
+                value=cutoff,
+                op="gt"
             )
+        )
+
+    @log_sync_job
+    @prioritized_requests
+    def sync(self, workers=1, spawn=None):
+        """
+        Sync the records, and return the created, updated, skipped and
+        deleted counts. If workers and spawn are given, the records are
+        split into shards synced by worker processes; see get_sharded.
+        """
+        sharded = workers > 1 and spawn is not None
+        started = timezone.now()
+        watermark_scope = self.watermark_scope()
+        watermark = None
+        if self.last_updated_field and not self.full:
+            watermark = self.get_watermark(watermark_scope)
+        if watermark is not None:
+            self.add_watermark_condition(
+                _as_utc(watermark).strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
         results = SyncResults()
 
-        # Set of IDs of all records prior to sync,
-        # to find stale records for deletion.
-        initial_ids = self._instance_ids() if self.full else []
+        # Set of IDs of all records prior to sync,
+        # to find stale records for deletion. Shards stage the IDs they
+        # sync for the pruning done here.
+        staged = self.full and (
+            self.staged_prune or self.checkpoints or sharded)
+        if self.checkpoints and not sharded:
+            # The staged IDs are kept with the checkpoint until the sync
+            # completes.
+            results.synced_ids = initial_ids = \
+                self.start_checkpoint(watermark_scope, started)
+            started = self.checkpoint.started
+        elif staged:
+            # Keep the IDs in the database rather than in memory.
+            results.synced_ids = initial_ids = StagedIDSet()
+            initial_ids.stage_initial(self.model_class.objects.all())
+        else:
+            initial_ids = \
+                self._instance_ids() if self.full else CompactIDSet()
+
+        try:
+            if sharded:
+                results = self.get_sharded(results, workers, spawn)
+            else:
+                results = self.get(results)
+
+            if self.full:
+                results.deleted_count = self.prune_stale_records(
+                    initial_ids, results.synced_ids
+                )
 
-        results = self.get(results)
+            if self.last_updated_field:
+                self.save_watermark(
+                    watermark_scope, results, started, watermark)
+        except BaseException:
+            if staged and self.checkpoint is None:
+                initial_ids.clear()
+            raise
 
-        if self.full:
-            results.deleted_count = self.prune_stale_records(
-                initial_ids, results.synced_ids
-            )
+        if staged:
+            initial_ids.clear()
+        if self.checkpoint is not None:
+            self.checkpoint.delete()
+            self.checkpoint = None
 
         return results.created_count, results.updated_count, \
             results.skipped_count, results.deleted_count
 
     def remove_null_characters(self, json_data):
+        if self.field_map is not None:
+            # The field mapper strips them from the values it assigns.
+            return json_data
+
         for value in json_data:
             if isinstance(json_data.get(value), str):
                 json_data[value] = json_data[value].replace('\x00', '')
@@ -548,41 +1765,118 @@ class Synchronizer:
         return api_fields
 
 
+# Incremented whenever a UDFSynchronizer changes the definitions of a UDF
+# model, so cached name-to-UDF maps know to reload.
+_udf_generations = defaultdict(int)
+_udf_generations_lock = threading.Lock()
+
+
+def udf_generation(udf_class):
+    return _udf_generations[udf_class._meta.concrete_model]
+
+
+def bump_udf_generation(udf_class):
+    with _udf_generations_lock:
+        _udf_generations[udf_class._meta.concrete_model] += 1
+
+
 class SyncRecordUDFMixin:
 
+    _udf_map = None
+    _udf_map_generation = None
+    _udf_map_digest = None
+
+    def get_include_fields(self):
+        fields = super().get_include_fields()
+        if fields is not None:
+            fields = sorted(set(fields) | {'userDefinedFields'})
+        return fields
+
+    @property
+    def udf_map(self):
+        """
+        Map of UDF name to its definition and picklist labels, loaded once
+        per synchronizer and reloaded if the UDF definitions are synced.
+        """
+        generation = udf_generation(self.udf_class)
+        if self._udf_map is None or self._udf_map_generation != generation:
+            udf_map = {}
+            for udf in self.udf_class.objects.all():
+                udf_map[udf.name] = {
+                    'id': str(udf.id),
+                    'label': udf.label,
+                    'type': udf.type,
+                    'is_picklist': udf.is_picklist,
+                    'picklist_labels': {
+                        value: item['label']
+                        for value, item in (udf.picklist or {}).items()
+                    } if udf.is_picklist else {},
+                }
+            self._udf_map = udf_map
+            self._udf_map_generation = generation
+            self._udf_map_digest = None
+        return self._udf_map
+
+    @property
+    def udf_map_digest(self):
+        """Digest of udf_map, which changes with the UDF definitions."""
+        udf_map = self.udf_map
+        if self._udf_map_digest is None:
+            self._udf_map_digest = hashlib.blake2b(
+                json.dumps(udf_map, sort_keys=True).encode(),
+                digest_size=16,
+            ).hexdigest()
+        return self._udf_map_digest
+
+    def _assign_field_data(self, instance, json_data):
+        super()._assign_field_data(instance, json_data)
+
+        udfs = json_data.get('userDefinedFields')
+
+        # Refresh udf field to eliminate stale udfs
+        instance.udf = dict()
+
+        if len(udfs):
+            self._assign_udf_data(instance, udfs)
+
+        instance.udf_data = parse_udf(udfs)
+
+        return instance
+
+    def fingerprint_salt(self):
+        # UDF data is assigned differently when the definitions change.
+        return '{}:{}'.format(
+            super().fingerprint_salt(), self.udf_map_digest)
+
     def _assign_udf_data(self, instance, udfs):
+        udf_map = self.udf_map
         for item in udfs:
             try:
                 name = item['name']
                 value = item['value']
 
-                udf = self.udf_class.objects.get(
-                    name=name
-                )
+                if name not in udf_map:
+                    # Can happen if sync not 100% up to date, debug log and
+                    # continue
+                    logger.debug(
+                        'No UDF records returned for name: {}'.format(name))
+                    continue
 
-                instance.udf[str(udf.id)] = {
+                udf = udf_map[name]
+                instance.udf[udf['id']] = {
                     'name': name,
                     'value': value,
-                    'label': udf.label,
-                    'type': udf.type,
-                    'is_picklist': udf.is_picklist
+                    'label': udf['label'],
+                    'type': udf['type'],
+                    'is_picklist': udf['is_picklist']
                 }
 
-                if value and udf.is_picklist:
+                if value and udf['is_picklist']:
                     # On a picklist item, the label is different from
                     # the name.
-                    instance.udf[str(udf.id)]['label'] = \
-                        udf.picklist[value]['label']
-
-            except self.udf_class.MultipleObjectsReturned as e:
-                # Shouldn't ever happen but just in case, log and continue
-                logger.error(
-                    'Multiple UDF records returned for 1 name: {}'.format(e))
-            except self.udf_class.DoesNotExist as e:
-                # Can happen if sync not 100% up to date, debug log and
-                # continue
-                logger.debug(
-                    'No UDF records returned for name: {}'.format(e))
+                    instance.udf[udf['id']]['label'] = \
+                        udf['picklist_labels'][value]
+
             except KeyError as e:
                 # UDF has likely been updated but we don't have the
                 # updated changes locally until the UDF class has been synced.
@@ -597,6 +1891,8 @@ class UDFSynchronizer(Synchronizer):
     model_class = None
     last_updated_field = None
     record_type = None  # Override in subclasses
+    bulk_persist_supported = False
+    partition_supported = False
 
     def get_record_id(self, record):
         try:
@@ -613,14 +1909,22 @@ class UDFSynchronizer(Synchronizer):
         logger.info(
             'Fetching {} records.'.format(self.model_class)
         )
-        api_return = self.get_page(next_url)
+        api_return = self.metadata_cache.get(
+            next_url, lambda: self.get_page(next_url))
         total_page = api_return.get("fields")
         if total_page:
             self.persist_page(total_page, results)
             self._sync_udf_definitions(total_page)
+            bump_udf_generation(self.model_class)
 
         return results
 
+    def prune_stale_records(self, initial_ids, synced_ids):
+        deleted_count = super().prune_stale_records(initial_ids, synced_ids)
+        if deleted_count:
+            bump_udf_generation(self.model_class)
+        return deleted_count
+
     def _assign_field_data(self, instance, object_data):
 
         instance.name = object_data.get('name')
@@ -772,6 +2076,19 @@ class ContactSynchronizer(Synchronizer):
     client_class = api.ContactsAPIClient
     model_class = models.ContactTracker
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('first_name', 'firstName'),
+        F('last_name', 'lastName'),
+        F('email_address', 'emailAddress'),
+        F('email_address2', 'emailAddress2'),
+        F('email_address3', 'emailAddress3'),
+        F('phone', 'phone'),
+        F('alternate_phone', 'alternatePhone'),
+        F('mobile_phone', 'mobilePhone'),
+        F('extension', 'extension'),
+    )
+
     related_meta = {
         'companyID': (models.Account, 'account'),
     }
@@ -780,46 +2097,22 @@ class ContactSynchronizer(Synchronizer):
         super().__init__(*args, **kwargs)
         self.client.add_condition(A(op='eq', field='isActive', value='true'))
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.first_name = json_data.get('firstName')
-        instance.last_name = json_data.get('lastName')
-        instance.email_address = json_data.get('emailAddress')
-        instance.email_address2 = json_data.get('emailAddress2')
-        instance.email_address3 = json_data.get('emailAddress3')
-        instance.phone = json_data.get('phone')
-        instance.alternate_phone = json_data.get('alternatePhone')
-        instance.mobile_phone = json_data.get('mobilePhone')
-        instance.extension = json_data.get('extension')
-
-        self.set_relations(instance, json_data)
-
-        return instance
-
 
 class RoleSynchronizer(Synchronizer):
     client_class = api.RolesAPIClient
     model_class = models.RoleTracker
     last_updated_field = None
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.active = json_data.get('isActive')
-        instance.name = json_data.get('name')
-        instance.description = json_data.get('description')
-        instance.hourly_factor = json_data.get('hourlyFactor')
-        instance.hourly_rate = json_data.get('hourlyRate')
-        instance.role_type = json_data.get('roleType')
-        instance.system_role = json_data.get('isSystemRole')
-
-        if instance.hourly_factor:
-            instance.hourly_factor = \
-                Decimal(str(round(instance.hourly_factor, 2)))
-        if instance.hourly_rate:
-            instance.hourly_rate = \
-                Decimal(str(round(instance.hourly_rate, 2)))
-
-        return instance
+    field_map = (
+        F('id', 'id', required=True),
+        F('active', 'isActive'),
+        F('name', 'name'),
+        F('description', 'description'),
+        F('hourly_factor', 'hourlyFactor', mapping.decimal(2)),
+        F('hourly_rate', 'hourlyRate', mapping.decimal(2)),
+        F('role_type', 'roleType'),
+        F('system_role', 'isSystemRole'),
+    )
 
 
 class DepartmentSynchronizer(Synchronizer):
@@ -827,13 +2120,12 @@ class DepartmentSynchronizer(Synchronizer):
     model_class = models.DepartmentTracker
     last_updated_field = None
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.name = json_data.get('name')
-        instance.description = json_data.get('description')
-        instance.number = json_data.get('number')
-
-        return instance
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'name'),
+        F('description', 'description'),
+        F('number', 'number'),
+    )
 
 
 class ResourceServiceDeskRoleSynchronizer(Synchronizer):
@@ -841,42 +2133,36 @@ class ResourceServiceDeskRoleSynchronizer(Synchronizer):
     model_class = models.ResourceServiceDeskRoleTracker
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('active', 'isActive'),
+        F('default', 'isDefault'),
+    )
+
     related_meta = {
         'resourceID': (models.Resource, 'resource'),
         'roleID': (models.Role, 'role'),
     }
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.active = json_data.get('isActive')
-        instance.default = json_data.get('isDefault')
-
-        self.set_relations(instance, json_data)
-
-        return instance
-
 
 class ResourceRoleDepartmentSynchronizer(Synchronizer):
     client_class = api.ResourceRoleDepartmentsAPIClient
     model_class = models.ResourceRoleDepartmentTracker
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('active', 'isActive'),
+        F('default', 'isDefault'),
+        F('department_lead', 'isDepartmentLead'),
+    )
+
     related_meta = {
         'resourceID': (models.Resource, 'resource'),
         'roleID': (models.Role, 'role'),
         'departmentID': (models.Department, 'department'),
     }
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.active = json_data.get('isActive')
-        instance.default = json_data.get('isDefault')
-        instance.department_lead = json_data.get('isDepartmentLead')
-
-        self.set_relations(instance, json_data)
-
-        return instance
-
 
 class CompletedDateMixin:
     def __init__(self, *args, **kwargs):
@@ -885,17 +2171,22 @@ class CompletedDateMixin:
         completed_date = (timezone.now() - timezone.timedelta(
                 hours=request_settings.get('keep_completed_hours')
             )).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-        self.client.add_condition(
+        self.completed_condition = A(
             A(
-                A(
-                    op='gt',
-                    field=self.completed_date_field,
-                    value=completed_date
-                ),
-                A(op='noteq', field='status', value=models.Status.COMPLETE_ID),
-                op='or'
-            )
+                op='gt',
+                field=self.completed_date_field,
+                value=completed_date
+            ),
+            A(op='noteq', field='status', value=models.Status.COMPLETE_ID),
+            op='or'
         )
+        self.client.add_condition(self.completed_condition)
+
+    def watermark_conditions(self):
+        # The completed date cutoff moves with every sync, but not what's
+        # synced.
+        return [c for c in super().watermark_conditions()
+                if c is not self.completed_condition]
 
 
 class TicketSynchronizer(CreateRecordMixin,
@@ -908,6 +2199,40 @@ class TicketSynchronizer(CreateRecordMixin,
     model_class = models.TicketTracker
     udf_class = models.TicketUDF
     completed_date_field = 'completedDate'
+    field_map = (
+        F('id', 'id', required=True),
+        F('title', 'title', required=True),
+        F('ticket_number', 'ticketNumber'),
+        F('description', 'description'),
+        F('estimated_hours', 'estimatedHours', mapping.decimal(2)),
+        F('service_level_agreement', 'serviceLevelAgreementID'),
+        F('service_level_agreement_has_been_met',
+          'serviceLevelAgreementHasBeenMet', mapping.boolean),
+        # It's important to set the SLA paused field to zero if it's not
+        # present in the JSON data because we need to track when a ticket
+        # moves from a paused SLA state to one where the SLA timer is
+        # running.
+        F('service_level_agreement_paused_next_event_hours',
+          'serviceLevelAgreementPausedNextEventHours', mapping.decimal(2),
+          default=0),
+        F('first_response_date_time', 'firstResponseDateTime',
+          mapping.api_datetime()),
+        F('first_response_due_date_time', 'firstResponseDueDateTime',
+          mapping.api_datetime()),
+        F('resolution_plan_date_time', 'resolutionPlanDateTime',
+          mapping.api_datetime()),
+        F('resolution_plan_due_date_time', 'resolutionPlanDueDateTime',
+          mapping.api_datetime()),
+        F('resolved_date_time', 'resolvedDateTime', mapping.api_datetime()),
+        F('resolved_due_date_time', 'resolvedDueDateTime',
+          mapping.api_datetime()),
+        F('create_date', 'createDate', mapping.api_datetime()),
+        F('due_date_time', 'dueDateTime', mapping.api_datetime()),
+        F('completed_date', 'completedDate', mapping.api_datetime()),
+        F('last_activity_date', 'lastActivityDate', mapping.api_datetime()),
+        F('resolution', 'resolution'),
+    )
+    include_fields = mapping.source_fields(field_map)
 
     API_FIELD_NAMES = {
         'title': 'title',
@@ -971,75 +2296,7 @@ class TicketSynchronizer(CreateRecordMixin,
         'contactID': (models.Contact, 'contact'),
     }
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.title = json_data['title']
-
-        instance.ticket_number = json_data.get('ticketNumber')
-        instance.description = json_data.get('description')
-        instance.estimated_hours = json_data.get('estimatedHours')
-        instance.service_level_agreement = \
-            json_data.get('serviceLevelAgreementID')
-        instance.service_level_agreement_has_been_met = \
-            bool(json_data.get('serviceLevelAgreementHasBeenMet'))
-        sla_paused = \
-            json_data.get('serviceLevelAgreementPausedNextEventHours')
-        instance.first_response_date_time = \
-            json_data.get('firstResponseDateTime')
-        instance.first_response_due_date_time = \
-            json_data.get('firstResponseDueDateTime')
-        instance.resolution_plan_date_time = \
-            json_data.get('resolutionPlanDateTime')
-        instance.resolution_plan_due_date_time = \
-            json_data.get('resolutionPlanDueDateTime')
-        instance.resolved_date_time = \
-            json_data.get('resolvedDateTime')
-        instance.resolved_due_date_time = \
-            json_data.get('resolvedDueDateTime')
-        instance.create_date = json_data.get('createDate')
-        instance.due_date_time = json_data.get('dueDateTime')
-        instance.completed_date = json_data.get('completedDate')
-        instance.last_activity_date = json_data.get('lastActivityDate')
-        instance.resolution = json_data.get('resolution')
-
-        self._set_datetime_attribute(instance, 'first_response_date_time')
-        self._set_datetime_attribute(instance,
-                                     'first_response_due_date_time')
-        self._set_datetime_attribute(instance, 'resolution_plan_date_time')
-        self._set_datetime_attribute(instance,
-                                     'resolution_plan_due_date_time')
-        self._set_datetime_attribute(instance, 'resolved_date_time')
-        self._set_datetime_attribute(instance, 'resolved_due_date_time')
-        self._set_datetime_attribute(instance, 'create_date')
-        self._set_datetime_attribute(instance, 'due_date_time')
-        self._set_datetime_attribute(instance, 'completed_date')
-        self._set_datetime_attribute(instance, 'last_activity_date')
-
-        udfs = json_data.get('userDefinedFields')
-
-        # Refresh udf field to eliminate stale udfs
-        instance.udf = dict()
-
-        if len(udfs):
-            self._assign_udf_data(instance, udfs)
-
-        instance.udf_data = parse_udf(udfs)
-
-        # It's important to set the SLA paused field to zero if it's not
-        # present in the JSON data because we need to track when a ticket
-        # moves from a paused SLA state to one where the SLA timer is running.
-        if not sla_paused:
-            sla_paused = 0
-
-        instance.service_level_agreement_paused_next_event_hours = \
-            Decimal(str(round(sla_paused, 2)))
-        if instance.estimated_hours:
-            instance.estimated_hours = \
-                Decimal(str(round(instance.estimated_hours, 2)))
-
-        self.set_relations(instance, json_data)
-        return instance
-
+    @interactive_requests
     def fetch_sync_by_id(self, instance_id):
         if self.queue_sync_filter:
             api_instance = self.get_single(instance_id)
@@ -1090,8 +2347,9 @@ class TicketSynchronizer(CreateRecordMixin,
               )
         )
 
-        # Call Ticket API count method to make request
-        return tickets_api.count(next_url=None)
+        # This has always returned the query's first page of tickets, with
+        # its pageDetails, not the client's {'queryCount': n}.
+        return tickets_api.get(next_url=None)
 
 
 class TaskSynchronizer(ChildCreateRecordMixin, SyncRecordUDFMixin,
@@ -1102,6 +2360,27 @@ class TaskSynchronizer(ChildCreateRecordMixin, SyncRecordUDFMixin,
     completed_date_field = 'completedDateTime'
     condition_field_name = 'projectId'
     last_updated_field = 'lastActivityDateTime'
+    field_map = (
+        F('id', 'id', required=True),
+        F('title', 'title', required=True),
+        F('number', 'taskNumber'),
+        # Truncate the field to 8000 characters as per AT docs. Since we've
+        # received descriptions greater than 8000 we'll truncate here
+        # instead of catching the DataError that would be raised.
+        # It is preferred to keep the DB schema in-line with the
+        # AT specifications, even if they are wrong.
+        F('description', 'description',
+          mapping.truncate(models.Task.MAX_DESCRIPTION)),
+        F('create_date', 'createDateTime', mapping.api_datetime()),
+        F('completed_date', 'completedDateTime', mapping.api_datetime()),
+        F('start_date', 'startDateTime', mapping.api_datetime()),
+        F('end_date', 'endDateTime', mapping.api_datetime()),
+        F('estimated_hours', 'estimatedHours', mapping.decimal(2)),
+        F('remaining_hours', 'remainingHours', mapping.decimal(2)),
+        F('last_activity_date', 'lastActivityDateTime',
+          mapping.api_datetime()),
+    )
+    include_fields = mapping.source_fields(field_map)
 
     related_meta = {
         'taskCategoryID': (models.TaskCategory, 'category'),
@@ -1143,55 +2422,6 @@ class TaskSynchronizer(ChildCreateRecordMixin, SyncRecordUDFMixin,
 
         return active_projects
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.title = json_data['title']
-
-        instance.number = json_data.get('taskNumber')
-        instance.description = json_data.get('description')
-
-        if instance.description:
-            # Truncate the field to 8000 characters as per AT docs. Since we've
-            # received descriptions greater than 8000 we'll truncate here
-            # instead of catching the DataError that would be raised.
-            # It is preferred to keep the DB schema in-line with the
-            # AT specifications, even if they are wrong.
-            instance.description = \
-                instance.description[:models.Task.MAX_DESCRIPTION]
-        instance.create_date = json_data.get('createDateTime')
-        instance.completed_date = json_data.get('completedDateTime')
-        instance.start_date = json_data.get('startDateTime')
-        instance.end_date = json_data.get('endDateTime')
-        instance.estimated_hours = json_data.get('estimatedHours')
-        instance.remaining_hours = json_data.get('remainingHours')
-        instance.last_activity_date = json_data.get('lastActivityDateTime')
-
-        self._set_datetime_attribute(instance, 'create_date')
-        self._set_datetime_attribute(instance, 'completed_date')
-        self._set_datetime_attribute(instance, 'start_date')
-        self._set_datetime_attribute(instance, 'end_date')
-        self._set_datetime_attribute(instance, 'last_activity_date')
-
-        udfs = json_data.get('userDefinedFields')
-
-        # Refresh udf field to eliminate stale udfs
-        instance.udf = dict()
-
-        if len(udfs):
-            self._assign_udf_data(instance, udfs)
-
-        instance.udf_data = parse_udf(udfs)
-
-        if instance.estimated_hours:
-            instance.estimated_hours = \
-                Decimal(str(round(instance.estimated_hours, 2)))
-        if instance.remaining_hours:
-            instance.remaining_hours = \
-                Decimal(str(round(instance.remaining_hours, 2)))
-
-        self.set_relations(instance, json_data)
-        return instance
-
     def update(self, instance, **kwargs):
         """
         Make a request to Autotask to update an entity.
@@ -1208,6 +2438,18 @@ class TaskSynchronizer(ChildCreateRecordMixin, SyncRecordUDFMixin,
 
 
 class NoteSynchronizer(BatchQueryMixin, Synchronizer):
+    field_map = (
+        F('id', 'id', required=True),
+        F('title', 'title'),
+        # Autotask docs say the max description length is 3200 characters
+        # but we've seen descriptions that are longer than that. So
+        # truncate the field to 3200 characters just in case.
+        F('description', 'description', mapping.truncate(3200)),
+        F('create_date_time', 'createDateTime', mapping.api_datetime()),
+        F('last_activity_date', 'lastActivityDate', mapping.api_datetime()),
+        F('publish', 'publish', mapping.text),
+    )
+    include_fields = mapping.source_fields(field_map)
 
     API_FIELD_NAMES = {
         'title': 'title',
@@ -1224,28 +2466,6 @@ class NoteSynchronizer(BatchQueryMixin, Synchronizer):
               value=models.NoteType.WORKFLOW_RULE_NOTE_ID)
         )
 
-    def _assign_field_data(self, instance, object_data):
-
-        instance.id = object_data['id']
-        instance.title = object_data.get('title')
-        instance.description = object_data.get('description')
-        instance.create_date_time = object_data.get('createDateTime')
-        instance.last_activity_date = object_data.get('lastActivityDate')
-        instance.publish = str(object_data.get('publish'))
-
-        self._set_datetime_attribute(instance, 'create_date_time')
-        self._set_datetime_attribute(instance, 'last_activity_date')
-
-        if instance.description:
-            # Autotask docs say the max description length is 3200
-            # characters but we've seen descriptions that are longer than that.
-            # So truncate the field to 3200 characters just in case.
-            instance.description = instance.description[:3200]
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class TicketNoteSynchronizer(ChildCreateRecordMixin,
                              ChildUpdateRecordMixin,
@@ -1331,6 +2551,19 @@ class TimeEntrySynchronizer(CreateRecordMixin,
     client_class = api.TimeEntriesAPIClient
     model_class = models.TimeEntryTracker
     last_updated_field = 'lastModifiedDateTime'
+    field_map = (
+        F('id', 'id', required=True),
+        F('date_worked', 'dateWorked', mapping.api_datetime(cache=True)),
+        F('start_date_time', 'startDateTime', mapping.api_datetime()),
+        F('end_date_time', 'endDateTime', mapping.api_datetime()),
+        F('summary_notes', 'summaryNotes'),
+        F('internal_notes', 'internalNotes'),
+        F('non_billable', 'isNonBillable'),
+        F('hours_worked', 'hoursWorked', mapping.decimal(4)),
+        F('hours_to_bill', 'hoursToBill', mapping.decimal(4)),
+        F('offset_hours', 'offsetHours', mapping.decimal(4)),
+    )
+    include_fields = mapping.source_fields(field_map)
 
     related_meta = {
         'resourceID': (models.Resource, 'resource'),
@@ -1372,39 +2605,14 @@ class TimeEntrySynchronizer(CreateRecordMixin,
             active_ids.update({'taskID': list(active_tasks)})
         return active_ids
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.date_worked = object_data.get('dateWorked')
-        instance.start_date_time = object_data.get('startDateTime')
-        instance.end_date_time = object_data.get('endDateTime')
-        instance.summary_notes = object_data.get('summaryNotes')
-        instance.internal_notes = object_data.get('internalNotes')
-        instance.non_billable = object_data.get('isNonBillable')
-        instance.hours_worked = object_data.get('hoursWorked')
-        instance.hours_to_bill = object_data.get('hoursToBill')
-        instance.offset_hours = object_data.get('offsetHours')
-
-        self._set_datetime_attribute(instance, 'date_worked')
-        self._set_datetime_attribute(instance, 'start_date_time')
-        self._set_datetime_attribute(instance, 'end_date_time')
-
-        if instance.hours_worked:
-            instance.hours_worked = \
-                Decimal(str(round(instance.hours_worked, 4)))
-        if instance.hours_to_bill:
-            instance.hours_to_bill = \
-                Decimal(str(round(instance.hours_to_bill, 4)))
-        if instance.offset_hours:
-            instance.offset_hours = \
-                Decimal(str(round(instance.offset_hours, 4)))
-
-        self.set_relations(instance, object_data)
-        return instance
-
 
 class SecondaryResourceSynchronizer(ChildCreateRecordMixin, DeleteRecordMixin,
                                     BatchQueryMixin, Synchronizer):
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     def delete(self, instances, parent=None):
         """
         Make a request to Autotask to delete a SecondaryResource.
@@ -1412,11 +2620,6 @@ class SecondaryResourceSynchronizer(ChildCreateRecordMixin, DeleteRecordMixin,
         for instance in instances:
             super().delete(instance, parent)
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-        return instance
-
     @property
     def active_ids(self):
         active_ids = self.related_instance_model.objects.all(). \
@@ -1474,6 +2677,27 @@ class ProjectSynchronizer(CreateRecordMixin, UpdateRecordMixin,
     udf_class = models.ProjectUDF
     last_updated_field = 'lastActivityDateTime'
     completed_date_field = 'completedDateTime'
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'projectName'),
+        F('number', 'projectNumber'),
+        # Autotask docs say the max description length is 2000 characters
+        # but we've seen descriptions that are longer than that. So
+        # truncate the field to 2000 characters just in case.
+        F('description', 'description', mapping.truncate(2000)),
+        F('actual_hours', 'actualHours', mapping.decimal(2)),
+        F('completed_percentage', 'completedPercentage'),
+        F('duration', 'duration'),
+        F('estimated_time', 'estimatedTime', mapping.decimal(2)),
+        F('status_detail', 'statusDetail'),
+        F('completed_date', 'completedDateTime', mapping.api_date()),
+        F('end_date', 'endDateTime', mapping.api_date()),
+        F('start_date', 'startDateTime', mapping.api_date()),
+        F('last_activity_date_time', 'lastActivityDateTime',
+          mapping.api_datetime()),
+        F('create_date_time', 'createDateTime', mapping.api_datetime()),
+    )
+    include_fields = mapping.source_fields(field_map)
 
     related_meta = {
         'projectLeadResourceID': (models.Resource, 'project_lead_resource'),
@@ -1522,84 +2746,22 @@ class ProjectSynchronizer(CreateRecordMixin, UpdateRecordMixin,
 
         return active_project_statuses
 
-    def _assign_field_data(self, instance, object_data):
-
-        instance.id = object_data['id']
-        instance.name = object_data.get('projectName')
-        instance.number = object_data.get('projectNumber')
-        instance.description = object_data.get('description')
-        instance.actual_hours = object_data.get('actualHours')
-        instance.completed_percentage = object_data.get('completedPercentage')
-        instance.duration = object_data.get('duration')
-        instance.estimated_time = object_data.get('estimatedTime')
-        instance.status_detail = object_data.get('statusDetail')
-
-        instance.completed_date = object_data.get('completedDateTime')
-        instance.end_date = object_data.get('endDateTime')
-        instance.start_date = object_data.get('startDateTime')
-        instance.last_activity_date_time = \
-            object_data.get('lastActivityDateTime')
-        instance.create_date_time = object_data.get('createDateTime')
-
-        self._set_datetime_attribute(instance, 'completed_date')
-        self._set_datetime_attribute(instance, 'end_date')
-        self._set_datetime_attribute(instance, 'start_date')
-        self._set_datetime_attribute(instance, 'last_activity_date_time')
-        self._set_datetime_attribute(instance, 'create_date_time')
-
-        if instance.completed_date:
-            instance.completed_date = instance.completed_date.date()
-        if instance.end_date:
-            instance.end_date = instance.end_date.date()
-        if instance.start_date:
-            instance.start_date = instance.start_date.date()
-
-        udfs = object_data.get('userDefinedFields')
-
-        # Refresh udf field to eliminate stale udfs
-        instance.udf = dict()
-
-        if len(udfs):
-            self._assign_udf_data(instance, udfs)
-
-        instance.udf_data = parse_udf(udfs)
-
-        if instance.estimated_time:
-            instance.estimated_time = \
-                Decimal(str(round(instance.estimated_time, 2)))
-        if instance.actual_hours:
-            instance.actual_hours = \
-                Decimal(str(round(instance.actual_hours, 2)))
-
-        if instance.description:
-            # Autotask docs say the max description length is 2000
-            # characters but we've seen descriptions that are longer than that.
-            # So truncate the field to 2000 characters just in case.
-            instance.description = instance.description[:2000]
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class TicketCategorySynchronizer(Synchronizer):
     client_class = api.TicketCategoriesAPIClient
     model_class = models.TicketCategoryTracker
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'name'),
+        F('active', 'isActive'),
+    )
+
     related_meta = {
         'displayColorRGB': (models.DisplayColor, 'display_color')
     }
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.name = json_data.get('name')
-        instance.active = json_data.get('isActive')
-
-        self.set_relations(instance, json_data)
-
-        return instance
-
 
 class TaskPredecessorSynchronizer(
     ChildCreateRecordMixin,
@@ -1612,6 +2774,11 @@ class TaskPredecessorSynchronizer(
     condition_field_name = 'predecessorTaskID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('lag_days', 'lagDays'),
+    )
+
     related_meta = {
         'predecessorTaskID': (models.Task, 'predecessor_task'),
         'successorTaskID': (models.Task, 'successor_task'),
@@ -1632,14 +2799,6 @@ class TaskPredecessorSynchronizer(
 
         return active_tasks
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = json_data['id']
-        instance.lag_days = json_data.get('lagDays')
-
-        self.set_relations(instance, json_data)
-
-        return instance
-
     def update(self, instance, parent, **kwargs):
         updated_record_fields = self._translate_fields_to_api_format(kwargs)
         updated_id = self.client.update(
@@ -1664,6 +2823,19 @@ class ServiceCallSynchronizer(
     condition_field_name = 'companyID'
     last_updated_field = 'lastModifiedDateTime'
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('description', 'description'),
+        F('duration', 'duration', mapping.decimal()),
+        F('complete', 'isComplete'),
+        F('create_date_time', 'createDateTime', mapping.api_datetime()),
+        F('start_date_time', 'startDateTime', mapping.api_datetime()),
+        F('end_date_time', 'endDateTime', mapping.api_datetime()),
+        F('canceled_date_time', 'canceledDateTime', mapping.api_datetime()),
+        F('last_modified_date_time', 'lastModifiedDateTime',
+          mapping.api_datetime()),
+    )
+
     related_meta = {
         'companyID': (models.Account, 'account'),
         'companyLocationID':
@@ -1697,28 +2869,6 @@ class ServiceCallSynchronizer(
 
         return active_ids
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.description = object_data.get('description')
-        instance.duration = Decimal(str(object_data.get('duration')))
-        instance.complete = object_data.get('isComplete')
-        instance.create_date_time = object_data.get('createDateTime')
-        instance.start_date_time = object_data.get('startDateTime')
-        instance.end_date_time = object_data.get('endDateTime')
-        instance.canceled_date_time = object_data.get('canceledDateTime')
-        instance.last_modified_date_time = \
-            object_data.get('lastModifiedDateTime')
-
-        self._set_datetime_attribute(instance, 'create_date_time')
-        self._set_datetime_attribute(instance, 'start_date_time')
-        self._set_datetime_attribute(instance, 'end_date_time')
-        self._set_datetime_attribute(instance, 'canceled_date_time')
-        self._set_datetime_attribute(instance, 'last_modified_date_time')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
     def delete_entry(self, service_call_id: int):
         instance = self.model_class.objects.get(pk=service_call_id)
         self.delete(instance)
@@ -1732,6 +2882,10 @@ class ServiceCallTicketSynchronizer(
     condition_field_name = 'ticketID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     related_meta = {
         'serviceCallID': (models.ServiceCall, 'service_call'),
         'ticketID': (models.Ticket, 'ticket')
@@ -1748,12 +2902,6 @@ class ServiceCallTicketSynchronizer(
 
         return active_ids
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class ServiceCallTaskSynchronizer(
         ChildCreateRecordMixin, BatchQueryMixin, Synchronizer):
@@ -1763,6 +2911,10 @@ class ServiceCallTaskSynchronizer(
     condition_field_name = 'taskID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     related_meta = {
         'serviceCallID': (models.ServiceCall, 'service_call'),
         'taskID': (models.Task, 'task')
@@ -1780,12 +2932,6 @@ class ServiceCallTaskSynchronizer(
 
         return active_ids
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class ServiceCallTicketResourceSynchronizer(
         ChildCreateRecordMixin, BatchQueryMixin, Synchronizer):
@@ -1795,6 +2941,10 @@ class ServiceCallTicketResourceSynchronizer(
     condition_field_name = 'serviceCallTicketID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     related_meta = {
         'serviceCallTicketID':
             (models.ServiceCallTicket, 'service_call_ticket'),
@@ -1812,12 +2962,6 @@ class ServiceCallTicketResourceSynchronizer(
 
         return active_ids
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class ServiceCallTaskResourceSynchronizer(
         ChildCreateRecordMixin, BatchQueryMixin, Synchronizer):
@@ -1827,6 +2971,10 @@ class ServiceCallTaskResourceSynchronizer(
     condition_field_name = 'serviceCallTaskID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     related_meta = {
         'serviceCallTaskID':
             (models.ServiceCallTask, 'service_call_task'),
@@ -1844,12 +2992,6 @@ class ServiceCallTaskResourceSynchronizer(
 
         return active_ids
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class AttachmentSynchronizer(Synchronizer):
     client_class = api.AttachmentInfoAPIClient
@@ -1895,6 +3037,13 @@ class BillingCodeSynchronizer(Synchronizer):
     model_class = models.BillingCodeTracker
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'name'),
+        F('description', 'description'),
+        F('active', 'isActive'),
+    )
+
     related_meta = {
         'useType': (models.UseType, 'use_type'),
         'billingCodeType': (models.BillingCodeType, 'billing_code_type')
@@ -1904,22 +3053,20 @@ class BillingCodeSynchronizer(Synchronizer):
         super().__init__(*args, **kwargs)
         self.client.add_condition(A(op='eq', field='isActive', value=True))
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.name = object_data.get('name')
-        instance.description = object_data.get('description')
-        instance.active = object_data.get('isActive')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class ContractSynchronizer(Synchronizer):
     client_class = api.ContractsAPIClient
     model_class = models.ContractTracker
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'contractName'),
+        F('number', 'contractNumber'),
+        F('status', 'status', mapping.text),
+        F('contract_exclusion_set_id', 'contractExclusionSetID'),
+    )
+
     related_meta = {
         'companyID': (models.Account, 'account')
     }
@@ -1928,18 +3075,6 @@ class ContractSynchronizer(Synchronizer):
         super().__init__(*args, **kwargs)
         self.client.add_condition(A(op='eq', field='status', value='1'))
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.name = object_data.get('contractName')
-        instance.number = object_data.get('contractNumber')
-        instance.status = str(object_data.get('status'))
-        instance.contract_exclusion_set_id = \
-            object_data.get('contractExclusionSetID')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class AccountPhysicalLocationSynchronizer(BatchQueryMixin, Synchronizer):
     client_class = api.AccountPhysicalLocationsAPIClient
@@ -1947,19 +3082,17 @@ class AccountPhysicalLocationSynchronizer(BatchQueryMixin, Synchronizer):
     condition_field_name = 'companyID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'name'),
+        F('active', 'isActive'),
+        F('primary', 'isPrimary'),
+    )
+
     related_meta = {
         'companyID': (models.Account, 'account'),
     }
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.name = object_data.get('name')
-        instance.active = object_data.get('isActive')
-        instance.primary = object_data.get('isPrimary')
-        self.set_relations(instance, object_data)
-
-        return instance
-
     @property
     def active_ids(self):
         active_ids = models.Account.objects.all().\
@@ -1974,6 +3107,16 @@ class ResourceSynchronizer(Synchronizer):
     last_updated_field = None
     bulk_prune = False
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('user_name', 'userName'),
+        F('email', 'email'),
+        F('first_name', 'firstName'),
+        F('last_name', 'lastName'),
+        F('active', 'isActive'),
+        F('title', 'title'),
+    )
+
     related_meta = {
         'licenseType': (models.LicenseType, 'license_type'),
         'defaultServiceDeskRoleID': (models.Role, 'default_service_desk_role'),
@@ -1989,24 +3132,20 @@ class ResourceSynchronizer(Synchronizer):
             )
         )
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.user_name = object_data.get('userName')
-        instance.email = object_data.get('email')
-        instance.first_name = object_data.get('firstName')
-        instance.last_name = object_data.get('lastName')
-        instance.active = object_data.get('isActive')
-        instance.title = object_data.get('title')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class AccountSynchronizer(Synchronizer):
     client_class = api.AccountsAPIClient
     model_class = models.AccountTracker
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'companyName'),
+        F('number', 'companyNumber'),
+        F('active', 'isActive'),
+        F('last_activity_date', 'lastActivityDate', mapping.api_datetime()),
+        F('phone', 'phone'),
+    )
+
     related_meta = {
         'companyType': (models.AccountType, 'type'),
         'parentCompanyID': (models.Account, 'parent_account'),
@@ -2017,65 +3156,55 @@ class AccountSynchronizer(Synchronizer):
         super().__init__(*args, **kwargs)
         self.client.add_condition(A(op='eq', field='isActive', value=True))
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.name = object_data.get('companyName')
-        instance.number = object_data.get('companyNumber')
-        instance.active = object_data.get('isActive')
-        instance.last_activity_date = object_data.get('lastActivityDate')
-        instance.phone = object_data.get('phone')
-
-        self._set_datetime_attribute(instance, 'last_activity_date')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class PhaseSynchronizer(Synchronizer):
     client_class = api.PhasesAPIClient
     model_class = models.PhaseTracker
     last_updated_field = 'lastActivityDateTime'
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('title', 'title'),
+        F('number', 'phaseNumber'),
+        F('description', 'description'),
+        F('start_date', 'startDate', mapping.api_datetime()),
+        F('due_date', 'dueDate', mapping.api_datetime()),
+        F('last_activity_date', 'lastActivityDateTime',
+          mapping.api_datetime()),
+        F('estimated_hours', 'estimatedHours', mapping.decimal()),
+    )
+
     related_meta = {
         'projectID': (models.Project, 'project'),
         'parentPhaseID': (models.Phase, 'parent_phase'),
     }
 
-    def _assign_field_data(self, instance, object_data):
-
-        instance.id = object_data['id']
-        instance.title = object_data.get('title')
-        instance.number = object_data.get('phaseNumber')
-        instance.description = object_data.get('description')
-        instance.start_date = object_data.get('startDate')
-        instance.due_date = object_data.get('dueDate')
-        instance.last_activity_date = object_data.get('lastActivityDateTime')
-
-        estimated_hours = object_data.get('estimatedHours')
-        instance.estimated_hours = Decimal(str(estimated_hours)) \
-            if estimated_hours is not None else None
-
-        self._set_datetime_attribute(instance, 'start_date')
-        self._set_datetime_attribute(instance, 'due_date')
-        self._set_datetime_attribute(instance, 'last_activity_date')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
 
 class PicklistSynchronizer(Synchronizer):
     lookup_name = None
     lookup_key = 'value'
     last_updated_field = None
+    partition_supported = False
+    request_priority = api.PRIORITY_LOW
+
+    field_map = (
+        F('id', 'value', mapping.integer, required=True),
+        F('label', 'label'),
+        F('is_default_value', 'isDefaultValue'),
+        F('sort_order', 'sortOrder'),
+        F('is_active', 'isActive'),
+        F('is_system', 'isSystem'),
+    )
 
     def fetch_records(self, results):
         logger.info(
             'Fetching {} records'.format(
                 self.model_class.__bases__[0].__name__)
         )
-        api_return = self.get_page()
+        # The fields document of an entity holds all of its picklists, so
+        # share it between the picklist synchronizers of this run.
+        api_return = self.metadata_cache.get(
+            self.client.get_api_url(), self.get_page)
         fields = api_return.get("fields")
         page = None
 
@@ -2093,18 +3222,6 @@ class PicklistSynchronizer(Synchronizer):
 
         return results
 
-    def _assign_field_data(self, instance, json_data):
-        instance.id = int(json_data[self.lookup_key])
-        instance.label = json_data.get('label')
-        instance.is_default_value = json_data.get('isDefaultValue')
-        instance.sort_order = json_data.get('sortOrder')
-        instance.is_active = json_data.get('isActive')
-        instance.is_system = json_data.get('isSystem')
-
-        if hasattr(self, 'related_meta'):
-            self.set_relations(instance, json_data)
-        return instance
-
 
 class CompanyAlertSynchronizer(BatchQueryMixin, Synchronizer):
     client_class = api.CompanyAlertAPIClient
@@ -2112,19 +3229,16 @@ class CompanyAlertSynchronizer(BatchQueryMixin, Synchronizer):
     condition_field_name = 'companyID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+        F('alert_text', 'alertText'),
+        F('alert_type', 'alertTypeID'),
+    )
+
     related_meta = {
         'companyID': (models.Account, 'account'),
     }
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.alert_text = object_data.get('alertText')
-        instance.alert_type = object_data.get('alertTypeID')
-
-        self.set_relations(instance, object_data)
-
-        return instance
-
     @property
     def active_ids(self):
         active_ids = models.Account.objects.all().\
@@ -2138,13 +3252,12 @@ class ContractExclusionSetSynchronizer(Synchronizer):
     model_class = models.ContractExclusionSetTracker
     last_updated_field = None
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        instance.name = object_data['name']
-        instance.is_active = object_data['isActive']
-        instance.description = object_data['description']
-
-        return instance
+    field_map = (
+        F('id', 'id', required=True),
+        F('name', 'name', required=True),
+        F('is_active', 'isActive', required=True),
+        F('description', 'description', required=True),
+    )
 
 
 class ContractExcludedWorkTypeSynchronizer(BatchQueryMixin, Synchronizer):
@@ -2153,18 +3266,16 @@ class ContractExcludedWorkTypeSynchronizer(BatchQueryMixin, Synchronizer):
     condition_field_name = 'contractExclusionSetID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     related_meta = {
         'contractExclusionSetID':
             (models.ContractExclusionSet, 'contract_exclusion_set'),
         'excludedWorkTypeID': (models.BillingCode, 'excluded_work_type')
     }
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-
-        return instance
-
     @property
     def active_ids(self):
         active_ids = models.ContractExclusionSet.objects.exclude(
@@ -2181,18 +3292,16 @@ class ContractExcludedRoleSynchronizer(BatchQueryMixin, Synchronizer):
     condition_field_name = 'contractExclusionSetID'
     last_updated_field = None
 
+    field_map = (
+        F('id', 'id', required=True),
+    )
+
     related_meta = {
         'contractExclusionSetID':
             (models.ContractExclusionSet, 'contract_exclusion_set'),
         'excludedRoleID': (models.Role, 'excluded_role')
     }
 
-    def _assign_field_data(self, instance, object_data):
-        instance.id = object_data['id']
-        self.set_relations(instance, object_data)
-
-        return instance
-
     @property
     def active_ids(self):
         active_ids = models.ContractExclusionSet.objects.exclude(
@@ -2748,3 +3857,62 @@ class TicketChecklistItemsSynchronizer(DummySynchronizer):
             self.client.add_condition(condition)
 
         return self.client.get(next_url, conditions)
+
+
+def claim_shard(run_key):
+    """
+    Claim the next pending shard of a sharded sync for this process, or
+    return None if there are none left. Shards locked by other workers are
+    skipped where the database supports SKIP LOCKED; the conditional status
+    update makes sure a shard is only ever claimed once.
+    """
+    while True:
+        with transaction.atomic():
+            pending = models.SyncShard.objects.filter(
+                run_key=run_key, status=models.SyncShard.PENDING
+            ).order_by('index')
+            if connection.features.has_select_for_update_skip_locked:
+                pending = pending.select_for_update(skip_locked=True)
+            shard = pending.first()
+            if shard is None:
+                return None
+            claimed = models.SyncShard.objects.filter(
+                pk=shard.pk, status=models.SyncShard.PENDING
+            ).update(status=models.SyncShard.RUNNING, worker=os.getpid())
+
+        if claimed:
+            shard.status = models.SyncShard.RUNNING
+            shard.worker = os.getpid()
+            return shard
+
+
+def run_shard_worker(run_key):
+    """
+    Sync the shards of a sharded sync until none are left. Each worker
+    process of the sync runs this; see Synchronizer.get_sharded.
+    """
+    metadata_cache = MetadataCache()
+    while True:
+        shard = claim_shard(run_key)
+        if shard is None:
+            return
+
+        try:
+            synchronizer = globals()[shard.synchronizer](
+                full=shard.full, metadata_cache=metadata_cache,
+                force_reassign=shard.spec.get('force_reassign', False))
+            results = synchronizer.sync_shard(shard)
+        except Exception as e:
+            logger.exception('Shard {} of {} failed.'.format(
+                shard.index, shard.synchronizer))
+            shard.status = models.SyncShard.FAILED
+            shard.message = str(e)
+            shard.save()
+            return
+
+        shard.status = models.SyncShard.DONE
+        shard.added = results.created_count
+        shard.updated = results.updated_count
+        shard.skipped = results.skipped_count
+        shard.last_updated = results.last_updated
+        shard.save()
@@ -1,3 +1,9 @@
+import decimal
+import io
+import json
+import threading
+import time
+
 import responses
 import requests
 
@@ -8,6 +14,7 @@ from django.utils import timezone
 from . import mocks as mk
 
 from .. import api
+from ..utils import DjautotaskSettings
 from ..api import AutotaskAPIError, AutotaskAPIClientError, \
     ApiConditionList
 from ..api import ApiCondition as A
@@ -52,6 +59,37 @@ class TestApiConditionList(TestCase):
         self.assertEqual(endpoint, 'query')
         self.assertEqual(filters, str_built)
 
+    def test_build_query_count(self):
+        self.conditions.add(A(op='eq', field='isActive', value='true'))
+        filters = '{"filter": [{"op": "eq", "field": "isActive", ' \
+                  '"value": "true"}]}'
+
+        endpoint, body = self.conditions.build_query(record_count=True)
+        self.assertEqual(endpoint, 'query/count?search=' + filters)
+        self.assertIsNone(body)
+
+        endpoint, body = self.conditions.build_query(
+            method='post', record_count=True)
+        self.assertEqual(endpoint, 'query/count')
+        self.assertEqual(body, filters)
+
+    def test_build_query_include_fields(self):
+        self.conditions.add(A(op='eq', field='isActive', value='true'))
+
+        endpoint, body = self.conditions.build_query(
+            method='post', include_fields=['id', 'title'])
+        self.assertEqual(endpoint, 'query')
+        self.assertEqual(
+            body,
+            '{"filter": [{"op": "eq", "field": "isActive", '
+            '"value": "true"}], "IncludeFields": ["id", "title"]}'
+        )
+
+        # Projection doesn't apply to counts
+        endpoint, body = self.conditions.build_query(
+            method='post', include_fields=['id'], record_count=True)
+        self.assertNotIn('IncludeFields', body)
+
 
 class TestAutotaskAPIClient(TestCase):
     API_URL = 'https://localhost/'
@@ -196,3 +234,387 @@ class TestAPISettings(TestCase):
                 tested_status_codes.append(status_code)
 
         self.assertEqual(tested_status_codes, http_400_range)
+
+
+class TestSessionPool(TestCase):
+
+    def setUp(self):
+        api.close_all_sessions()
+
+    def tearDown(self):
+        api.close_all_sessions()
+
+    def test_session_shared_per_zone(self):
+        session = api.get_session('https://webservices1.autotask.net/a/')
+        self.assertIs(
+            session, api.get_session('https://webservices1.autotask.net/b/'))
+        self.assertIsNot(
+            session, api.get_session('https://webservices2.autotask.net/a/'))
+
+    def test_idle_session_is_rebuilt(self):
+        url = 'https://webservices1.autotask.net/'
+        session = api.get_session(url, idle_timeout=300)
+        api._sessions[api._session_key(url)].last_used -= 301
+
+        self.assertIsNot(session, api.get_session(url, idle_timeout=300))
+
+    def test_close_session(self):
+        url = 'https://webservices1.autotask.net/'
+        session = api.get_session(url)
+        api.close_session(url)
+
+        self.assertIsNot(session, api.get_session(url))
+
+    @responses.activate
+    def test_zone_change_rebuilds_session(self):
+        cache.clear()
+        mk.init_zone_info_connection(return_value={
+            'url': 'https://localhost/',
+            'webUrl': 'https://localhost/',
+        })
+        client = api.ContactsAPIClient()
+        endpoint = client.get_api_url()
+        session = client.get_session(endpoint)
+        cache.set('zone_url', 'https://old-zone/')
+        mk.get(endpoint, {}, status=401)
+
+        with self.assertRaises(AutotaskAPIClientError):
+            client.fetch_resource(endpoint)
+        self.assertIsNot(session, client.get_session(endpoint))
+
+
+class TestResponseDecoder(TestCase):
+
+    def test_strip_nulls(self):
+        decoder = api.ResponseDecoder()
+        self.assertEqual(
+            decoder.decode(b'{"a": "x\\u0000y\\u0000", "b": "\\\\u0000"}'),
+            {'a': 'xy', 'b': '\\u0000'}
+        )
+
+    def test_keep_nulls(self):
+        decoder = api.ResponseDecoder(strip_nulls=False)
+        self.assertEqual(
+            decoder.decode(b'{"a": "x\\u0000y"}'), {'a': 'x\x00y'})
+
+    def test_decimals(self):
+        decoder = api.ResponseDecoder(decimals=True)
+        result = decoder.decode(b'{"hours": 1.1, "id": 2}')
+
+        self.assertFalse(decoder.fast)
+        self.assertEqual(result, {'hours': decimal.Decimal('1.1'), 'id': 2})
+        self.assertIsInstance(result['hours'], decimal.Decimal)
+        self.assertIsInstance(result['id'], int)
+
+    def test_same_result_with_and_without_fast_json(self):
+        content = b'{"items": [{"id": 1, "title": "\\u00e9", "h": 0.25}]}'
+        self.assertEqual(
+            api.ResponseDecoder(fast=True).decode(content),
+            api.ResponseDecoder(fast=False).decode(content)
+        )
+
+    def test_off_by_default(self):
+        self.assertFalse(api.ResponseDecoder().fast)
+        self.assertFalse(api.ResponseDecoder.from_settings(
+            DjautotaskSettings().get_settings()).fast)
+
+    def test_fast_json_falls_back(self):
+        decoder = api.ResponseDecoder(fast=True)
+        if not decoder.fast:
+            self.skipTest('orjson is not installed')
+        # Both are rejected by orjson, but not by json.
+        content = b'{"title": "\\ud800", "id": 18446744073709551616}'
+
+        self.assertEqual(decoder.decode(content),
+                         {'title': '\ud800', 'id': 18446744073709551616})
+
+    @responses.activate
+    def test_fetch_resource_decodes(self):
+        cache.clear()
+        mk.init_zone_info_connection(return_value={
+            'url': 'https://localhost/',
+            'webUrl': 'https://localhost/',
+        })
+        client = api.ContactsAPIClient()
+        endpoint = client.get_api_url()
+        mk.get_raw(endpoint, b'{"item": {"firstName": "a\\u0000b"}}',
+                   'application/json')
+
+        self.assertEqual(client.fetch_resource(endpoint),
+                         {'item': {'firstName': 'ab'}})
+
+    @responses.activate
+    def test_fetch_resource_invalid_json(self):
+        cache.clear()
+        mk.init_zone_info_connection(return_value={
+            'url': 'https://localhost/',
+            'webUrl': 'https://localhost/',
+        })
+        client = api.ContactsAPIClient()
+        endpoint = client.get_api_url()
+        client.request_settings['max_attempts'] = 1
+        mk.get_raw(endpoint, b'{"item": ', 'application/json')
+
+        with self.assertRaises(AutotaskAPIError):
+            client.fetch_resource(endpoint)
+
+
+class TestStreamedPage(TestCase):
+    ITEMS = [{'id': i, 'title': 'Ticket {}'.format(i), 'hours': 0.5 * i}
+             for i in range(10)]
+
+    def stream(self, body, chunk_size=7, decoder=None):
+        response = requests.Response()
+        response.raw = io.BytesIO(body)
+        return api.StreamedPage(
+            response, decoder or api.ResponseDecoder(), chunk_size)
+
+    def test_items_then_page_details(self):
+        body = json.dumps({
+            'items': self.ITEMS,
+            'pageDetails': {'count': 10, 'nextPageUrl': 'next'},
+        }).encode()
+        page = self.stream(body)
+
+        self.assertEqual(list(page.items()), self.ITEMS)
+        self.assertEqual(page.get('pageDetails')['nextPageUrl'], 'next')
+
+    def test_page_details_first(self):
+        body = json.dumps({
+            'pageDetails': {'count': 10, 'nextPageUrl': None},
+            'items': self.ITEMS,
+        }, indent=2).encode()
+        page = self.stream(body)
+
+        self.assertEqual(page.get('pageDetails')['count'], 10)
+        self.assertEqual(page.get('items'), self.ITEMS)
+
+    def test_items_decoded_one_at_a_time(self):
+        body = json.dumps({'items': self.ITEMS}).encode()
+        page = self.stream(body, chunk_size=16)
+        items = page.items()
+        next(items)
+
+        self.assertLess(len(page._buffer), len(body) // 2)
+
+    def test_decoder_options(self):
+        body = b'{"items": [{"title": "a\\u0000b", "hours": 1.1}]}'
+        page = self.stream(body, decoder=api.ResponseDecoder(decimals=True))
+
+        self.assertEqual(list(page.items()),
+                         [{'title': 'ab', 'hours': decimal.Decimal('1.1')}])
+
+    def test_truncated_page(self):
+        page = self.stream(b'{"items": [{"id": 1}, {"id": ')
+        items = page.items()
+
+        self.assertEqual(next(items), {'id': 1})
+        with self.assertRaises(AutotaskAPIError):
+            next(items)
+
+    @responses.activate
+    def test_fetch_resource_stream(self):
+        cache.clear()
+        mk.init_zone_info_connection(return_value={
+            'url': 'https://localhost/',
+            'webUrl': 'https://localhost/',
+        })
+        client = api.ContactsAPIClient()
+        endpoint = client.get_api_url()
+        mk.get(endpoint, {'items': self.ITEMS, 'pageDetails': {}})
+
+        page = client.fetch_resource(endpoint, stream=True)
+
+        self.assertIsInstance(page, api.StreamedPage)
+        self.assertEqual(list(page.items()), self.ITEMS)
+
+
+class TestAdaptiveLimiter(TestCase):
+
+    def setUp(self):
+        api.reset_limiters()
+
+    def tearDown(self):
+        api.reset_limiters()
+
+    def test_limit_grows_while_latency_is_healthy(self):
+        limiter = api.AdaptiveLimiter(initial=2, maximum=3,
+                                      latency_target=1.0)
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release(0.1)
+
+        self.assertEqual(int(limiter.limit), 3)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.1)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_throttle_halves_limit_and_pauses(self):
+        limiter = api.AdaptiveLimiter(initial=8)
+        limiter.acquire()
+        limiter.release(0.1, throttled=True, retry_after=30)
+
+        self.assertEqual(limiter.limit, 4)
+        self.assertGreater(limiter.resume_at - time.monotonic(), 29)
+
+    def test_slow_responses_cut_limit_once_per_window(self):
+        limiter = api.AdaptiveLimiter(initial=8, latency_target=60)
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(61)
+
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limit_never_drops_below_minimum(self):
+        limiter = api.AdaptiveLimiter(initial=2, minimum=1)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(0.1, throttled=True, retry_after=0)
+
+        self.assertEqual(limiter.limit, 1)
+
+    def test_acquire_blocks_at_limit(self):
+        limiter = api.AdaptiveLimiter(initial=1, maximum=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def take_slot():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=take_slot)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+
+        limiter.release(0.1)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(limiter.in_flight, 1)
+
+    def test_limiter_shared_per_zone(self):
+        limiter = api.get_limiter('https://webservices1.autotask.net/a/')
+        self.assertIs(
+            limiter, api.get_limiter('https://webservices1.autotask.net/b/'))
+        self.assertIsNot(
+            limiter, api.get_limiter('https://webservices2.autotask.net/a/'))
+
+    @responses.activate
+    def test_throttled_response_reduces_zone_limit(self):
+        mk.init_zone_info_connection(return_value={
+            'url': 'https://localhost/',
+            'webUrl': 'https://localhost/',
+        })
+        client = api.ContactsAPIClient()
+        endpoint = client.get_api_url()
+        limiter = api.get_limiter(endpoint)
+        initial_limit = limiter.limit
+        mk.get(endpoint, {'errors': ['Too many requests']},
+               headers={'Retry-After': '0'}, status=429)
+
+        with self.assertRaises(api.AutotaskAPIThrottledError):
+            client.fetch_resource(endpoint)
+        self.assertLess(limiter.limit, initial_limit)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class TestRequestBudget(TestCase):
+    API_URL = 'https://localhost/'
+
+    def setUp(self):
+        api.reset_budgets()
+        cache.clear()
+        mk.init_zone_info_connection(return_value={
+            'url': self.API_URL,
+            'webUrl': self.API_URL,
+        })
+        self.client = api.ContactsAPIClient()
+        self.budget = api.RequestBudget(
+            share=0.8, low_priority_share=0.5, max_wait=0)
+        self.budget.update({
+            'externalRequestThreshold': 100,
+            'currentTimeframeRequestCount': 0,
+        })
+
+    def tearDown(self):
+        api.reset_budgets()
+
+    def use(self, count, priority):
+        for _ in range(count):
+            self.budget.reserve(self.client, priority)
+
+    def test_low_priority_deferred_at_its_share(self):
+        self.use(50, api.PRIORITY_LOW)
+
+        with self.assertRaises(api.AutotaskRequestBudgetExceeded):
+            self.budget.reserve(self.client, api.PRIORITY_LOW)
+        self.use(30, api.PRIORITY_NORMAL)
+        with self.assertRaises(api.AutotaskRequestBudgetExceeded):
+            self.budget.reserve(self.client, api.PRIORITY_NORMAL)
+
+    def test_interactive_uses_reserved_share(self):
+        self.use(80, api.PRIORITY_NORMAL)
+        self.use(30, api.PRIORITY_INTERACTIVE)
+
+        self.assertEqual(self.budget.used, 110)
+
+    def test_priority_from_context(self):
+        self.use(50, api.PRIORITY_LOW)
+
+        with api.request_priority(api.PRIORITY_LOW):
+            with self.assertRaises(api.AutotaskRequestBudgetExceeded):
+                self.budget.reserve(self.client)
+        self.budget.reserve(self.client)
+        self.assertEqual(api.get_request_priority(), api.PRIORITY_NORMAL)
+
+    def test_normal_priority_waits_for_timeframe(self):
+        self.budget.max_wait = 5
+        self.budget.poll_interval = 0
+        self.use(80, api.PRIORITY_NORMAL)
+        polls = [{'externalRequestThreshold': 100,
+                  'currentTimeframeRequestCount': 80},
+                 {'externalRequestThreshold': 100,
+                  'currentTimeframeRequestCount': 10}]
+        _, _patch = mk.create_mock_call(
+            'djautotask.api.ContactsAPIClient.fetch_threshold_information',
+            None, side_effect=lambda: polls.pop(0))
+        self.addCleanup(_patch.stop)
+
+        self.budget.reserve(self.client, api.PRIORITY_NORMAL)
+        self.assertEqual(polls, [])
+        self.assertEqual(self.budget.used, 11)
+
+    def test_unknown_threshold_allows_requests(self):
+        budget = api.RequestBudget()
+        _, _patch = mk.create_mock_call(
+            'djautotask.api.ContactsAPIClient.fetch_threshold_information',
+            None, side_effect=AutotaskAPIError('unavailable'))
+        self.addCleanup(_patch.stop)
+
+        budget.reserve(self.client, api.PRIORITY_LOW)
+        self.assertIsNone(budget.threshold)
+        self.assertEqual(budget.used, 1)
+
+    @responses.activate
+    def test_requests_counted_against_budget(self):
+        endpoint = self.client.get_api_url()
+        mk.get('{}v{}/ThresholdInformation'.format(
+            self.API_URL, self.client.rest_api_version),
+            {'externalRequestThreshold': 10000,
+             'requestThresholdTimeframe': 60,
+             'currentTimeframeRequestCount': 42})
+        mk.get(endpoint, {'items': []})
+        settings = api.DjautotaskSettings().get_settings()
+        settings['request_budget'] = True
+        _, _patch = mk.create_mock_call(
+            'djautotask.utils.DjautotaskSettings.get_settings', settings)
+        self.addCleanup(_patch.stop)
+
+        self.client.fetch_resource(endpoint)
+        self.client.fetch_resource(endpoint)
+        budget = api._budgets[api._session_key(endpoint)]
+        self.assertEqual(budget.threshold, 10000)
+        self.assertEqual(budget.used, 44)
+
+    def test_budget_disabled_by_default(self):
+        self.assertIsNone(api.get_budget(self.client.get_api_url()))
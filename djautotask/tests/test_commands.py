@@ -1,8 +1,17 @@
 import io
+import os
+import signal
+import sys
+import threading
+from collections import OrderedDict
+
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from mock import Mock, patch
+from djautotask.management.commands import atsync, atsync_daemon
 from djautotask.tests import fixtures, mocks, fixture_utils
-from djautotask import models
+from djautotask import api, models, sync
 
 
 def sync_summary(class_name, created_count, updated_count=0):
@@ -16,6 +25,10 @@ def full_sync_summary(class_name, deleted_count, updated_count=0):
         'Deleted: {}'.format(class_name, updated_count, deleted_count)
 
 
+def patch_env(**values):
+    return patch.dict(os.environ, values)
+
+
 def slug_to_title(slug):
     return slug.title().replace('_', ' ')
 
@@ -967,9 +980,14 @@ class TestSyncAllCommand(TestCase):
             fixtures.API_RESOURCE_ROLE_DEPARTMENT)
         mocks.service_api_get_license_types_call(
             fixtures.API_LICENSE_TYPE_FIELD)
-        mocks.service_api_get_use_types_call(fixtures.API_USE_TYPE_FIELD)
-        mocks.service_api_get_billing_code_types_call(
-            fixtures.API_BILLING_CODE_TYPE_FIELD)
+        # Use types and billing code types are both picklists of the
+        # BillingCodes fields document, which is fetched once per run.
+        billing_code_fields = {
+            'fields': fixtures.API_USE_TYPE_FIELD['fields'] +
+            fixtures.API_BILLING_CODE_TYPE_FIELD['fields']
+        }
+        mocks.service_api_get_use_types_call(billing_code_fields)
+        mocks.service_api_get_billing_code_types_call(billing_code_fields)
         mocks.service_api_get_task_type_links_call(
             fixtures.API_TASK_TYPE_LINK_FIELD)
         mocks.service_api_get_account_types_call(
@@ -1092,3 +1110,331 @@ class TestSyncAllCommand(TestCase):
             fixtures.API_EMPTY)
         mocks.service_api_get_contract_excluded_work_types_call(
             fixtures.API_EMPTY)
+
+
+class TestParallelSyncCommand(TestCase):
+
+    def setUp(self):
+        self.command = atsync.Command()
+        self.sync_items = list(self.command.synchronizer_map.items())
+
+    def test_build_dependency_graph(self):
+        graph = atsync.build_dependency_graph(self.sync_items)
+
+        self.assertEqual(set(graph), set(self.command.synchronizer_map))
+        self.assertTrue(
+            {'status', 'priority', 'queue', 'account', 'contact',
+             'ticket_udf'} <= graph['ticket'])
+        self.assertIn('ticket', graph['ticket_note'])
+        self.assertIn('project', graph['task'])
+        self.assertEqual(graph['role'], set())
+        # Self-references don't create a dependency
+        self.assertNotIn('account', graph['account'])
+        self.assertNotIn('phase', graph['phase'])
+
+    def test_run_in_dependency_order(self):
+        graph = atsync.build_dependency_graph(self.sync_items)
+        finished = []
+        lock = threading.Lock()
+
+        def run(name):
+            with lock:
+                for dependency in graph[name]:
+                    self.assertIn(dependency, finished)
+            with lock:
+                finished.append(name)
+
+        atsync.run_in_dependency_order(graph, run, 4)
+        self.assertEqual(set(finished), set(graph))
+
+    def test_run_in_dependency_order_breaks_cycles(self):
+        graph = OrderedDict([('a', {'b'}), ('b', {'a'}), ('c', {'b'})])
+        finished = []
+
+        atsync.run_in_dependency_order(graph, finished.append, 2)
+        self.assertEqual(finished, ['a', 'b', 'c'])
+
+    def test_parallel_sync_errors(self):
+        synced = []
+
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            synced.append(obj_name)
+            if sync_class in (sync.StatusSynchronizer, sync.RoleSynchronizer):
+                raise api.AutotaskAPIError('API error')
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        err = io.StringIO()
+        with self.assertRaises(CommandError) as cm:
+            call_command('atsync', '--parallel', '4', stdout=io.StringIO(),
+                         stderr=err)
+        patch.stop()
+
+        self.assertEqual(len(synced), len(self.sync_items))
+        msg = str(cm.exception)
+        self.assertIn('2 classes failed to sync.', msg)
+        # Errors are listed in synchronizer_map order
+        self.assertLess(msg.index('Failed to sync Status'),
+                        msg.index('Failed to sync Role'))
+        self.assertIn('Failed to sync Role', err.getvalue())
+
+    def test_sync_deferred_on_request_budget(self):
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            if sync_class is sync.StatusSynchronizer:
+                raise api.AutotaskRequestBudgetExceeded('Budget used up.')
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        out = io.StringIO()
+        call_command('atsync', stdout=out, stderr=io.StringIO())
+        patch.stop()
+
+        self.assertIn('Status Sync deferred: Budget used up.', out.getvalue())
+
+    def test_force_reassign(self):
+        calls = []
+
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            calls.append(kwargs['force_reassign'])
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        call_command('atsync', 'ticket', '--force-reassign',
+                     stdout=io.StringIO())
+        patch.stop()
+
+        self.assertEqual(calls, [True])
+
+    def test_resume(self):
+        calls = []
+
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            calls.append((kwargs['full_option'], kwargs['resume']))
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        call_command('atsync', 'ticket', '--resume', stdout=io.StringIO())
+        patch.stop()
+
+        # Resuming is always a full sync
+        self.assertEqual(calls, [(True, True)])
+
+    def test_workers(self):
+        calls = []
+
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            calls.append(kwargs['workers'])
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        with patch_env(DJANGO_SETTINGS_MODULE='project.settings'):
+            call_command('atsync', 'ticket', '--workers', '4',
+                         stdout=io.StringIO())
+        patch.stop()
+
+        self.assertEqual(calls, [4])
+
+        with self.assertRaises(CommandError):
+            call_command('atsync', 'ticket', '--workers', '4', '--resume',
+                         stdout=io.StringIO())
+
+    def test_workers_need_settings_module(self):
+        with patch_env(DJANGO_SETTINGS_MODULE=''):
+            with self.assertRaises(CommandError):
+                call_command('atsync', 'ticket', '--workers', '4',
+                             stdout=io.StringIO())
+
+    def test_workers_through_call_command(self):
+        mocks.init_api_rest_connection()
+        spawned = []
+
+        def popen(args, env):
+            # Run the worker in this process, as the worker process would.
+            spawned.append((args, env['DJANGO_SETTINGS_MODULE']))
+            sync.run_shard_worker(args[-1])
+            return Mock(pid=1, **{'wait.return_value': 0})
+
+        def sync_shard(synchronizer, shard):
+            return sync.SyncResults()
+
+        out = io.StringIO()
+        with patch_env(DJANGO_SETTINGS_MODULE='project.settings'), \
+                patch('sys.argv', ['celery', 'worker']), \
+                patch('djautotask.management.commands.atsync.subprocess.'
+                      'Popen', side_effect=popen), \
+                patch.object(sync.ContactSynchronizer, 'shard_specs',
+                             return_value=[{'id_range': [None, 5]},
+                                           {'id_range': [5, None]}]), \
+                patch.object(sync.ContactSynchronizer, 'sync_shard',
+                             sync_shard):
+            call_command('atsync', 'contact', '--workers', '2', stdout=out)
+
+        self.assertEqual(len(spawned), 2)
+        for args, settings_module in spawned:
+            # The workers don't depend on how this process was started.
+            self.assertEqual(args[:5], [
+                sys.executable, '-m', 'django', 'atsync', '--shard-worker'])
+            self.assertEqual(settings_module, 'project.settings')
+        self.assertIn(sync_summary('Contact', 0), out.getvalue())
+        self.assertFalse(models.SyncShard.objects.exists())
+
+    def test_failed_shards_reported(self):
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            if sync_class is sync.TicketSynchronizer:
+                raise sync.ShardSyncError('1 of 2 Ticket shards failed')
+            return 0, 0, 0, 0
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        err = io.StringIO()
+        with self.assertRaises(CommandError) as cm, \
+                patch_env(DJANGO_SETTINGS_MODULE='project.settings'):
+            call_command('atsync', '--workers', '2', stdout=io.StringIO(),
+                         stderr=err)
+        patch.stop()
+
+        self.assertIn('1 class failed to sync.', str(cm.exception))
+        self.assertIn('Failed to sync Ticket: 1 of 2 Ticket shards failed.',
+                      err.getvalue())
+
+    def test_failed_shard_workers_reported(self):
+        process = Mock(pid=123)
+        process.wait.return_value = 1
+        popen_mock, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.subprocess.Popen',
+            process
+        )
+        command = atsync.Command(stderr=io.StringIO())
+        with patch_env(DJANGO_SETTINGS_MODULE='project.settings'):
+            command.spawn_shard_workers('abc', 2)
+        patch.stop()
+
+        self.assertEqual(popen_mock.call_count, 2)
+        self.assertIn('Shard worker 123 exited with code 1.',
+                      command.stderr._out.getvalue())
+
+    def test_shard_worker(self):
+        worker_mock, patch = mocks.create_mock_call(
+            'djautotask.sync.run_shard_worker', None)
+        call_command('atsync', '--shard-worker', 'abc', stdout=io.StringIO())
+        patch.stop()
+
+        worker_mock.assert_called_once_with('abc')
+
+
+class TestSyncDaemonCommand(TestCase):
+
+    def setUp(self):
+        self.command = atsync_daemon.Command()
+
+    def test_get_intervals(self):
+        settings = {
+            'daemon_interval': 300,
+            'daemon_metadata_interval': 3600,
+            'daemon_intervals': {'account': 60, 'task': 0},
+        }
+        intervals = self.command.get_intervals(
+            settings, ['ticket=30', 'role=0'])
+
+        self.assertEqual(intervals['ticket'], 30)
+        self.assertEqual(intervals['account'], 60)
+        self.assertEqual(intervals['contact'], 300)
+        self.assertEqual(intervals['status'], 3600)
+        self.assertEqual(intervals['ticket_udf'], 3600)
+        # An interval of 0 turns a synchronizer off
+        self.assertNotIn('task', intervals)
+        self.assertNotIn('role', intervals)
+
+        with self.assertRaises(CommandError):
+            self.command.get_intervals(settings, ['nothing=30'])
+        with self.assertRaises(CommandError):
+            self.command.get_intervals(settings, ['ticket=often'])
+
+    def test_scheduler(self):
+        release = threading.Event()
+        lock = threading.Lock()
+        runs = {'fast': 0, 'slow': 0}
+        running = set()
+
+        def run(name):
+            with lock:
+                self.assertNotIn(name, running)
+                running.add(name)
+                runs[name] += 1
+            if name == 'slow':
+                release.wait(5)
+            elif runs['fast'] == 3:
+                # The fast job keeps going while the slow one is busy.
+                release.set()
+                scheduler.stop()
+            with lock:
+                running.discard(name)
+
+        scheduler = atsync_daemon.Scheduler(
+            {'fast': (0.01, run), 'slow': (0.01, run)}, threads=2,
+            jitter=0)
+        scheduler.run()
+
+        self.assertEqual(runs['fast'], 3)
+        self.assertEqual(runs['slow'], 1)
+        self.assertEqual(running, set())
+
+    def test_stops_on_sigterm(self):
+        calls = []
+
+        def sync_by_class(sync_class, obj_name, **kwargs):
+            calls.append(obj_name)
+            os.kill(os.getpid(), signal.SIGTERM)
+            return 0, 0, 0, 0
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.management.commands.atsync.Command.sync_by_class',
+            None, side_effect=sync_by_class
+        )
+        intervals = ['{}=0'.format(name)
+                     for name in self.command.synchronizer_map
+                     if name != 'ticket']
+        out = io.StringIO()
+        previous = signal.getsignal(signal.SIGTERM)
+        call_command('atsync_daemon', '--interval', 'ticket=1',
+                     *['--interval={}'.format(i) for i in intervals],
+                     stdout=out)
+        patch.stop()
+
+        self.assertEqual(calls, ['Ticket'])
+        self.assertIn('Stopping once the running syncs have finished.',
+                      out.getvalue())
+        self.assertIs(signal.getsignal(signal.SIGTERM), previous)
+
+    def test_relations_not_kept_between_runs(self):
+        resolvers = []
+
+        def contact_sync(synchronizer):
+            resolvers.append(synchronizer.relations)
+            if len(resolvers) == 2:
+                os.kill(os.getpid(), signal.SIGTERM)
+            return 0, 0, 0, 0
+
+        intervals = ['--interval={}=0'.format(name)
+                     for name in self.command.synchronizer_map
+                     if name != 'contact']
+        with patch.object(sync.ContactSynchronizer, 'sync', autospec=True,
+                          side_effect=contact_sync):
+            call_command('atsync_daemon', '--interval', 'contact=0.01',
+                         *intervals, stdout=io.StringIO())
+
+        # Records may have been deleted elsewhere between the runs.
+        self.assertEqual(len(resolvers), 2)
+        self.assertIsNot(resolvers[0], resolvers[1])
@@ -1,11 +1,27 @@
+import io
+import json
+import threading
+import time
+from decimal import Decimal
+
 from dateutil.parser import parse
+import requests
+from mock import patch
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from copy import deepcopy
+from djautotask import api
+from djautotask import mapping
 from djautotask import models
 from djautotask import sync
+from djautotask.mapping import Field as F
 from djautotask.sync import SyncResults
+from djautotask.utils import CompactIDSet, DjautotaskSettings, \
+    parse_api_datetime, parse_api_datetime_cached
 from djautotask.tests import fixtures, mocks, fixture_utils
 
 
@@ -362,6 +378,15 @@ class TestTicketSynchronizer(
     def _call_api(self, return_data):
         return mocks.service_api_get_tickets_call(return_data)
 
+    def test_count(self):
+        # The query's response is returned whole, as it always has been.
+        get_mock, patch = self._call_api(fixtures.API_TICKET)
+        response = self.synchronizer_class().count(queue_id=8)
+        patch.stop()
+
+        self.assertEqual(response, fixtures.API_TICKET)
+        get_mock.assert_called_once_with(next_url=None)
+
     def _assert_fields(self, instance, object_data):
         self.assertEqual(instance.id, object_data['id'])
         self.assertEqual(instance.title, object_data['title'])
@@ -385,6 +410,163 @@ class TestTicketSynchronizer(
         self.assertEqual(instance.account_physical_location.id,
                          object_data['companyLocationID'])
 
+    def test_relations_resolved_once_per_page(self):
+        """
+        Related records referenced by a page should be looked up with one
+        query per related model, not one per record.
+        """
+        records = []
+        for i in range(3):
+            record = deepcopy(self.fixture_items[0])
+            record['id'] = record['id'] + i + 1
+            records.append(record)
+
+        synchronizer = self.synchronizer_class()
+        with CaptureQueriesContext(connection) as queries:
+            synchronizer.persist_page(records, SyncResults())
+
+        status_table = models.Status._meta.db_table
+        status_queries = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and
+            'FROM "{}"'.format(status_table) in q['sql']
+        ]
+        self.assertEqual(len(status_queries), 1)
+
+    def test_sync_missing_relation(self):
+        """
+        A reference to a related record that doesn't exist locally should be
+        logged and assigned null, as before.
+        """
+        record = deepcopy(self.fixture_items[0])
+        record['assignedResourceID'] = 999999
+
+        synchronizer = self.synchronizer_class()
+        with self.assertLogs('djautotask.sync', level='WARNING'):
+            synchronizer.persist_page([record], SyncResults())
+
+        instance = self.model_class.objects.get(id=record['id'])
+        self.assertIsNone(instance.assigned_resource)
+        # The record is assigned again next sync, in case the resource
+        # has been synced by then.
+        self.assertIsNone(instance.sync_fingerprint)
+
+    def _persist_with_assign_mock(self, synchronizer, records):
+        assign_mock, patch = mocks.create_mock_call(
+            'djautotask.sync.TicketSynchronizer._assign_field_data', None,
+            side_effect=synchronizer._assign_field_data
+        )
+        self.addCleanup(patch.stop)
+        results = synchronizer.persist_page(records, SyncResults())
+        patch.stop()
+        return assign_mock, results
+
+    def _resolved_record(self):
+        """
+        Return a ticket record that only references synced records, so
+        its fingerprint is stored, after syncing it once.
+        """
+        record = deepcopy(self.fixture_items[0])
+        for json_field, (model_class, _) in \
+                self.synchronizer_class.related_meta.items():
+            uid = record.get(json_field)
+            if uid and not model_class.objects.filter(pk=uid).exists():
+                record[json_field] = None
+        self.synchronizer_class().persist_page(
+            [deepcopy(record)], SyncResults())
+        return record
+
+    def test_unchanged_records_skipped_before_assignment(self):
+        record = self._resolved_record()
+        self.assertIsNotNone(
+            self.model_class.objects.get(id=record['id']).sync_fingerprint)
+
+        assign_mock, results = self._persist_with_assign_mock(
+            self.synchronizer_class(), [record])
+
+        self.assertEqual(assign_mock.call_count, 0)
+        self.assertEqual(results.skipped_count, 1)
+        self.assertEqual(results.synced_ids, {record['id']})
+
+    def test_relation_deleted_and_synced_back(self):
+        record = self._resolved_record()
+        resource_id = record['assignedResourceID']
+        self.assertIsNotNone(resource_id)
+        # Deleting the resource nulls the ticket's FK, but not its
+        # fingerprint.
+        models.Resource.objects.filter(id=resource_id).delete()
+        fixture_utils.init_resources()
+
+        results = self.synchronizer_class().persist_page(
+            [deepcopy(record)], SyncResults())
+
+        self.assertEqual(results.skipped_count, 0)
+        instance = self.model_class.objects.get(id=record['id'])
+        self.assertEqual(instance.assigned_resource_id, resource_id)
+
+        # Also when a single record is synced
+        models.Resource.objects.filter(id=resource_id).delete()
+        fixture_utils.init_resources()
+        _, result = self.synchronizer_class().update_or_create_instance(
+            deepcopy(record))
+
+        self.assertEqual(result, sync.UPDATED)
+        instance = self.model_class.objects.get(id=record['id'])
+        self.assertEqual(instance.assigned_resource_id, resource_id)
+
+    def test_changed_record_fingerprint_updated(self):
+        record = self._resolved_record()
+        fingerprint = self.model_class.objects.get(
+            id=record['id']).sync_fingerprint
+        record['title'] = 'Changed title'
+        assign_mock, results = self._persist_with_assign_mock(
+            self.synchronizer_class(), [record])
+
+        self.assertEqual(assign_mock.call_count, 1)
+        self.assertEqual(results.updated_count, 1)
+        instance = self.model_class.objects.get(id=record['id'])
+        self.assertIsNotNone(instance.sync_fingerprint)
+        self.assertNotEqual(instance.sync_fingerprint, fingerprint)
+
+    def test_force_reassign(self):
+        record = self._resolved_record()
+        assign_mock, results = self._persist_with_assign_mock(
+            self.synchronizer_class(force_reassign=True), [record])
+
+        self.assertEqual(assign_mock.call_count, 1)
+        self.assertEqual(results.skipped_count, 1)
+
+    def test_update_writes_changed_fields(self):
+        record = deepcopy(self.fixture_items[0])
+        record['title'] = 'Changed title'
+
+        with CaptureQueriesContext(connection) as queries:
+            results = self.synchronizer_class().persist_page(
+                [record], SyncResults())
+
+        self.assertEqual(results.updated_count, 1)
+        updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE "{}"'.format(
+                models.Ticket._meta.db_table))
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertIn('"modified"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+        self.assertNotIn('"udf_data"', updates[0])
+        instance = self.model_class.objects.get(id=record['id'])
+        self.assertEqual(instance.title, 'Changed title')
+
+    def test_fingerprint_salted_with_udf_definitions(self):
+        synchronizer = self.synchronizer_class()
+        record = self.fixture_items[0]
+        fingerprint = synchronizer.fingerprint(record)
+        models.TicketUDF.objects.create(name='New UDF', label='New UDF')
+        sync.bump_udf_generation(models.TicketUDF)
+
+        self.assertNotEqual(fingerprint, synchronizer.fingerprint(record))
+
     def test_sync_ticket_related_records(self):
         """
         Test to ensure that a ticket will sync related objects,
@@ -449,6 +631,53 @@ class TestProjectUDFSynchronizer(UDFSynchronizerTestMixin, TestCase):
         return mocks.service_api_get_project_udf_call(return_data)
 
 
+class TestSyncRecordUDFMixin(TestCase):
+
+    def setUp(self):
+        mocks.init_api_rest_connection()
+        fixture_utils.init_ticket_udfs()
+        self.udf = models.TicketUDF.objects.get(name='Test UDF')
+        self.synchronizer = sync.TicketSynchronizer()
+
+    def test_assign_udf_data(self):
+        instance = models.Ticket()
+        self.synchronizer._assign_udf_data(
+            instance, [{'name': 'Test UDF', 'value': '1'}])
+
+        self.assertEqual(instance.udf[str(self.udf.id)], {
+            'name': 'Test UDF',
+            'value': '1',
+            'label': 'One',
+            'type': 'string',
+            'is_picklist': True,
+        })
+
+    def test_udf_map_loaded_once(self):
+        udfs = [
+            {'name': 'Test UDF', 'value': '1'},
+            {'name': 'Unknown UDF', 'value': 'x'},
+        ]
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                instance = models.Ticket()
+                self.synchronizer._assign_udf_data(instance, udfs)
+        self.assertEqual(list(instance.udf), [str(self.udf.id)])
+
+    def test_udf_map_refreshed_after_udf_sync(self):
+        self.synchronizer._assign_udf_data(models.Ticket(), [])
+
+        fixture = deepcopy(fixtures.API_UDF)
+        fixture['fields'][0]['picklistValues'][0]['label'] = 'Uno'
+        _, patch = mocks.service_api_get_ticket_udf_call(fixture)
+        sync.TicketUDFSynchronizer().sync()
+        patch.stop()
+
+        instance = models.Ticket()
+        self.synchronizer._assign_udf_data(
+            instance, [{'name': 'Test UDF', 'value': '1'}])
+        self.assertEqual(instance.udf[str(self.udf.id)]['label'], 'Uno')
+
+
 class TestStatusSynchronizer(PicklistSynchronizerTestMixin, TestCase):
     synchronizer_class = sync.StatusSynchronizer
     model_class = models.StatusTracker
@@ -1448,3 +1677,1304 @@ class TestTaskPredecessorSynchronizer(SynchronizerTestMixin, TestCase):
                          object_data['predecessorTaskID'])
         self.assertEqual(instance.successor_task.id,
                          object_data['successorTaskID'])
+
+
+class SyncSettingsTestMixin:
+    """Run a synchronizer test case with sync_settings applied."""
+    sync_settings = {}
+
+    def setUp(self):
+        request_settings = DjautotaskSettings().get_settings()
+        request_settings.update(self.sync_settings)
+        _, settings_patch = mocks.create_mock_call(
+            'djautotask.utils.DjautotaskSettings.get_settings',
+            request_settings
+        )
+        self.addCleanup(settings_patch.stop)
+        super().setUp()
+
+
+class BulkPersistTestMixin(SyncSettingsTestMixin):
+    sync_settings = {'bulk_persist': True}
+
+
+class TestBulkTicketSynchronizer(BulkPersistTestMixin,
+                                 TestTicketSynchronizer):
+
+    def test_bulk_persist_counts(self):
+        self.assertTrue(self.synchronizer.bulk_persist)
+
+        new_json = deepcopy(self.fixture_items[0])
+        new_json['title'] = 'Some New Value'
+        new_json_list = [new_json, deepcopy(self.fixture_items[0])]
+        new_json_list[1]['id'] = 999999
+
+        created_count, updated_count, skipped_count, _ = \
+            self._sync_with_results(self._get_return_value(new_json_list))
+
+        self.assertEqual(created_count, 1)
+        self.assertEqual(updated_count, 1)
+        self.assertEqual(skipped_count, 0)
+        self.assertEqual(
+            models.Ticket.objects.get(id=new_json['id']).title,
+            'Some New Value'
+        )
+
+    def test_bulk_persist_integrity_error_falls_back(self):
+        new_json = deepcopy(self.fixture_items[0])
+        new_json['title'] = 'Some New Value'
+        _, bulk_patch = mocks.create_mock_call(
+            'djautotask.sync.Synchronizer._bulk_write', None,
+            side_effect=sync.IntegrityError('conflict')
+        )
+
+        _, updated_count, _, _ = \
+            self._sync_with_results(self._get_return_value([new_json]))
+        bulk_patch.stop()
+
+        self.assertEqual(updated_count, 1)
+        self.assertEqual(
+            models.Ticket.objects.get(id=new_json['id']).title,
+            'Some New Value'
+        )
+
+    def test_one_write_per_page(self):
+        records = []
+        for i in range(5):
+            record = deepcopy(self.fixture_items[0])
+            record['id'] = 999990 + i
+            records.append(record)
+        with CaptureQueriesContext(connection) as queries:
+            results = self.synchronizer_class().persist_page(
+                records, SyncResults())
+
+        self.assertEqual(results.created_count, 5)
+        inserts = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('INSERT INTO "{}"'.format(
+                models.Ticket._meta.db_table))
+        ]
+        self.assertEqual(len(inserts), 1)
+
+    def test_bulk_persist_not_supported(self):
+        self.assertFalse(sync.TicketUDFSynchronizer().bulk_persist)
+
+    def test_conflicting_insert_keeps_created(self):
+        if not connection.features.supports_update_conflicts_with_target:
+            self.skipTest('No INSERT ... ON CONFLICT support')
+        record = deepcopy(self.fixture_items[0])
+        created = timezone.now() - timezone.timedelta(days=30)
+        self.model_class.objects.filter(id=record['id']).update(
+            created=created)
+        # As if another process created the row after in_bulk ran.
+        synchronizer = self.synchronizer_class()
+        instance = self.model_class()
+        record['title'] = 'Some New Value'
+        synchronizer._assign_field_data(instance, record)
+        synchronizer._bulk_write([instance], [])
+
+        instance = self.model_class.objects.get(id=record['id'])
+        self.assertEqual(instance.title, 'Some New Value')
+        self.assertEqual(instance.created, created)
+
+    def test_bulk_update_grouped_by_changed_fields(self):
+        second_json = deepcopy(self.fixture_items[0])
+        second_json['id'] = 999999
+        self.synchronizer_class().persist_page(
+            [deepcopy(second_json)], SyncResults())
+
+        first_json = deepcopy(self.fixture_items[0])
+        first_json['title'] = 'Some New Value'
+        second_json['description'] = 'Some new description'
+        with CaptureQueriesContext(connection) as queries:
+            results = self.synchronizer_class().persist_page(
+                [first_json, second_json], SyncResults())
+
+        self.assertEqual(results.updated_count, 2)
+        updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE "{}"'.format(
+                models.Ticket._meta.db_table))
+        ]
+        self.assertEqual(len(updates), 2)
+        title_update, description_update = sorted(
+            updates, key=lambda sql: '"description"' in sql)
+        self.assertNotIn('"description"', title_update)
+        self.assertNotIn('"title"', description_update)
+
+
+class TestRelationResolver(TestCase):
+
+    def setUp(self):
+        fixture_utils.init_statuses()
+        self.status_id = models.Status.objects.first().id
+        self.resolver = sync.RelationResolver()
+
+    def test_prime(self):
+        with self.assertNumQueries(1):
+            self.resolver.prime({models.Status: {self.status_id, 999999}})
+
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                self.resolver.exists(models.Status, self.status_id))
+            self.assertFalse(self.resolver.exists(models.Status, 999999))
+
+    def test_exists_without_prime(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                self.resolver.exists(models.Status, self.status_id))
+            self.assertTrue(
+                self.resolver.exists(models.StatusTracker, self.status_id))
+
+    def test_add(self):
+        self.resolver.prime({models.Status: {999999}})
+        self.resolver.add(models.StatusTracker, 999999)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.resolver.exists(models.Status, 999999))
+
+    def test_to_pk(self):
+        self.assertEqual(
+            self.resolver.to_pk(models.Status, str(self.status_id)),
+            self.status_id
+        )
+        self.assertIsNone(self.resolver.to_pk(models.Status, 'abc'))
+
+
+class TestMetadataCache(TestCase):
+
+    def test_get(self):
+        cache = sync.MetadataCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {'fields': []}
+
+        self.assertEqual(cache.get('url', fetch), {'fields': []})
+        self.assertIs(cache.get('url', fetch), cache.get('url', fetch))
+        self.assertEqual(len(calls), 1)
+
+        cache.get('other url', fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_picklist_synchronizers_share_fields_document(self):
+        mocks.init_api_rest_connection()
+        get_mock, patch = mocks.service_api_get_ticket_picklist_call(
+            fixtures.API_TICKET_PICKLIST_FIELD)
+        metadata_cache = sync.MetadataCache()
+
+        sync.StatusSynchronizer(metadata_cache=metadata_cache).sync()
+        sync.PrioritySynchronizer(metadata_cache=metadata_cache).sync()
+        sync.QueueSynchronizer(metadata_cache=metadata_cache).sync()
+        patch.stop()
+
+        self.assertEqual(get_mock.call_count, 1)
+        self.assertTrue(models.Status.objects.exists())
+        self.assertTrue(models.Priority.objects.exists())
+        self.assertTrue(models.Queue.objects.exists())
+
+
+class StagedPruneTestMixin(SyncSettingsTestMixin):
+    sync_settings = {'staged_prune': True}
+
+
+class TestStagedPruneContactSynchronizer(StagedPruneTestMixin,
+                                         TestContactSynchronizer):
+    pass
+
+
+class TestStagedPrune(StagedPruneTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        fixture_utils.init_accounts()
+        self.items = []
+        for i in range(10):
+            item = deepcopy(fixtures.API_CONTACT['items'][0])
+            item['id'] = item['id'] + i
+            self.items.append(item)
+        self._sync(self.items)
+
+    def _sync(self, items, full=False):
+        _, get_patch = mocks.service_api_get_contacts_call(
+            {'items': items, 'pageDetails': fixtures.API_PAGE_DETAILS})
+        self.addCleanup(get_patch.stop)
+        results = sync.ContactSynchronizer(full=full).sync()
+        get_patch.stop()
+        return results
+
+    def test_prune_stale(self):
+        _, _, _, deleted_count = self._sync(self.items[:4], full=True)
+
+        self.assertEqual(deleted_count, 6)
+        self.assertEqual(
+            set(models.Contact.objects.values_list('id', flat=True)),
+            {item['id'] for item in self.items[:4]}
+        )
+        self.assertFalse(models.SyncStagingID.objects.exists())
+
+    def test_synced_ids_not_held_in_memory(self):
+        synchronizer = sync.ContactSynchronizer(full=True)
+        staged = sync.StagedIDSet()
+        staged.flush_size = 3
+        for item in self.items:
+            staged.add(item['id'])
+
+        self.assertLess(len(staged._pending), 3)
+        self.assertEqual(
+            models.SyncStagingID.objects.filter(
+                sync_key=staged.sync_key).count(), 9)
+
+        staged.stage_initial(models.Contact.objects.all())
+        self.assertEqual(staged.initial_count(), 10)
+        self.assertEqual(list(staged.stale_ids()), [])
+        self.assertEqual(
+            synchronizer.prune_stale_records(staged, staged), 0)
+
+    def test_stale_ids_anti_join(self):
+        staged = sync.StagedIDSet()
+        staged.stage_initial(models.Contact.objects.all())
+        other = sync.StagedIDSet()
+        other.stage_initial(models.Contact.objects.all())
+        ids = [item['id'] for item in self.items]
+        for record_id in ids[:4] + [123456]:
+            staged.add(record_id)
+        for record_id in ids[4:]:
+            other.add(record_id)
+
+        # Only the initial IDs this sync didn't stage are stale, however
+        # another sync's IDs are staged.
+        self.assertEqual(sorted(staged.stale_ids()), ids[4:])
+        self.assertEqual(sorted(other.stale_ids()), ids[:4])
+
+    def test_mass_delete_protection(self):
+        request_settings = DjautotaskSettings().get_settings()
+        request_settings.update(
+            {'staged_prune': True, 'mass_delete_protection': True})
+        _, settings_patch = mocks.create_mock_call(
+            'djautotask.utils.DjautotaskSettings.get_settings',
+            request_settings
+        )
+        self.addCleanup(settings_patch.stop)
+
+        _, _, _, deleted_count = self._sync([], full=True)
+
+        self.assertEqual(deleted_count, 0)
+        self.assertEqual(models.Contact.objects.count(), 10)
+        self.assertFalse(models.SyncStagingID.objects.exists())
+
+
+class PipelineFetchTestMixin(SyncSettingsTestMixin):
+    sync_settings = {'pipeline_fetch': True, 'pipeline_queue_pages': 1}
+
+
+class TestPipelinedTicketSynchronizer(PipelineFetchTestMixin,
+                                      TestTicketSynchronizer):
+    pass
+
+
+class TestPipelinedFetch(PipelineFetchTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        fixture_utils.init_accounts()
+
+    def _pages(self, count):
+        pages = []
+        for i in range(count):
+            item = deepcopy(fixtures.API_CONTACT['items'][0])
+            item['id'] = item['id'] + i
+            page_details = deepcopy(fixtures.API_PAGE_DETAILS)
+            if i < count - 1:
+                page_details['nextPageUrl'] = 'next-page-{}'.format(i + 1)
+            pages.append({'items': [item], 'pageDetails': page_details})
+        return pages
+
+    def _sync(self, side_effect):
+        _, patch = mocks.create_mock_call(
+            'djautotask.api.ContactsAPIClient.get', None,
+            side_effect=side_effect
+        )
+        self.addCleanup(patch.stop)
+        return sync.ContactSynchronizer().sync()
+
+    def test_sync_pages(self):
+        pages = self._pages(4)
+        created_count, _, _, _ = self._sync(pages)
+
+        self.assertEqual(created_count, 4)
+        self.assertEqual(models.Contact.objects.count(), 4)
+
+    def test_queue_bounded(self):
+        pages = self._pages(10)
+        fetched = []
+        ahead = []
+        persist_page = sync.Synchronizer.persist_page
+
+        def get(next_url=None, *args, **kwargs):
+            fetched.append(next_url)
+            return pages[len(fetched) - 1]
+
+        def persist(synchronizer, records, results):
+            if not ahead:
+                # Give the producer time to run ahead of the first page.
+                time.sleep(0.2)
+                ahead.append(len(fetched))
+            return persist_page(synchronizer, records, results)
+
+        _, get_patch = mocks.create_mock_call(
+            'djautotask.api.ContactsAPIClient.get', None, side_effect=get)
+        self.addCleanup(get_patch.stop)
+        with patch.object(sync.Synchronizer, 'persist_page', persist):
+            created_count, _, _, _ = sync.ContactSynchronizer().sync()
+
+        self.assertEqual(created_count, 10)
+        # The page being persisted, the one queued, and the one the
+        # producer waits to queue.
+        self.assertLessEqual(ahead[0], 3)
+
+    def test_fetch_error(self):
+        pages = self._pages(2)
+        pages[1] = api.AutotaskAPIError('API error')
+
+        with self.assertRaises(api.AutotaskAPIError):
+            self._sync(pages)
+
+        # The page fetched before the error is still persisted
+        self.assertEqual(models.Contact.objects.count(), 1)
+        sync_job = models.SyncJob.objects.get(entity_name='Contact')
+        self.assertFalse(sync_job.success)
+
+    def test_persist_error_stops_producer(self):
+        persist_mock, patch = mocks.create_mock_call(
+            'djautotask.sync.Synchronizer.persist_page', None,
+            side_effect=ValueError('DB error')
+        )
+        self.addCleanup(patch.stop)
+
+        with self.assertRaises(ValueError):
+            self._sync(self._pages(10))
+
+        self.assertEqual(persist_mock.call_count, 1)
+        sync_job = models.SyncJob.objects.get(entity_name='Contact')
+        self.assertFalse(sync_job.success)
+
+    def test_producer_keeps_request_priority(self):
+        priorities = []
+
+        def get(next_url=None, *args, **kwargs):
+            priorities.append(api.get_request_priority())
+            return self._pages(1)[0]
+
+        _, patch = mocks.create_mock_call(
+            'djautotask.api.ContactsAPIClient.get', None, side_effect=get)
+        self.addCleanup(patch.stop)
+        sync.ContactSynchronizer(full=True).sync()
+
+        self.assertEqual(priorities, [api.PRIORITY_LOW])
+
+
+class TestStreamedFetch(SyncSettingsTestMixin, TestCase):
+    sync_settings = {'stream_pages': True, 'stream_batch_size': 2}
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        fixture_utils.init_accounts()
+
+    def _page(self, first_id, count, next_url=None):
+        items = []
+        for i in range(count):
+            item = deepcopy(fixtures.API_CONTACT['items'][0])
+            item['id'] = first_id + i
+            items.append(item)
+        page_details = dict(fixtures.API_PAGE_DETAILS, nextPageUrl=next_url)
+        response = requests.Response()
+        response.raw = io.BytesIO(json.dumps(
+            {'items': items, 'pageDetails': page_details}).encode())
+        return api.StreamedPage(response, api.ResponseDecoder(), 64)
+
+    def test_sync_streamed_pages(self):
+        mock_get, get_patch = mocks.create_mock_call(
+            'djautotask.api.ContactsAPIClient.get', None,
+            side_effect=[self._page(1, 3, 'next-page'), self._page(4, 2)]
+        )
+        self.addCleanup(get_patch.stop)
+        synchronizer = sync.ContactSynchronizer()
+
+        with patch.object(synchronizer, 'persist_page',
+                          wraps=synchronizer.persist_page) as persist_page:
+            created_count, _, _, _ = synchronizer.sync()
+
+        self.assertEqual(created_count, 5)
+        self.assertEqual(models.Contact.objects.count(), 5)
+        self.assertEqual(
+            [len(c.args[0]) for c in persist_page.call_args_list],
+            [2, 1, 2])
+        mock_get.assert_called_with('next-page', stream=True)
+
+
+class TestRequestPriority(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        self.priorities = []
+
+    def _record_priority(self, method_name, return_value):
+        def record(*args, **kwargs):
+            self.priorities.append(api.get_request_priority())
+            return return_value
+
+        _, patch = mocks.create_mock_call(
+            method_name, None, side_effect=record)
+        self.addCleanup(patch.stop)
+
+    def test_partial_sync_normal_priority(self):
+        fixture_utils.init_accounts()
+        self._record_priority(
+            'djautotask.api.ContactsAPIClient.get', fixtures.API_CONTACT)
+        sync.ContactSynchronizer().sync()
+
+        self.assertEqual(self.priorities, [api.PRIORITY_NORMAL])
+
+    def test_full_sync_low_priority(self):
+        fixture_utils.init_accounts()
+        self._record_priority(
+            'djautotask.api.ContactsAPIClient.get', fixtures.API_CONTACT)
+        sync.ContactSynchronizer(full=True).sync()
+
+        self.assertEqual(self.priorities, [api.PRIORITY_LOW])
+
+    def test_picklist_sync_low_priority(self):
+        self._record_priority(
+            'djautotask.api.TicketPicklistAPIClient.get',
+            fixtures.API_STATUS_FIELD)
+        sync.StatusSynchronizer().sync()
+
+        self.assertEqual(self.priorities, [api.PRIORITY_LOW])
+
+    def test_fetch_sync_by_id_interactive_priority(self):
+        fixture_utils.init_accounts()
+        self._record_priority(
+            'djautotask.api.ContactsAPIClient.get_single',
+            {'item': fixtures.API_CONTACT['items'][0]})
+        sync.ContactSynchronizer().fetch_sync_by_id(
+            fixtures.API_CONTACT['items'][0]['id'])
+
+        self.assertEqual(self.priorities, [api.PRIORITY_INTERACTIVE])
+        self.assertEqual(api.get_request_priority(), api.PRIORITY_NORMAL)
+
+
+class TestConcurrentBatchQuery(SyncSettingsTestMixin, TestCase):
+    sync_settings = {'batch_query_size': 2, 'batch_query_workers': 3}
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        fixture_utils.init_resources()
+        fixture_utils.init_tickets()
+        fixture_utils.init_note_types()
+        self.ticket_id = models.Ticket.objects.first().id
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def _get(self, client, next_url):
+        # Return one note per batch, identified by the batch's first ID.
+        batch_ids = [
+            c.value for c in client.conditions if c.field == 'ticketID'][0]
+        with self.lock:
+            self.batches.append(list(batch_ids))
+        item = deepcopy(fixtures.API_TICKET_NOTE_ITEMS[0])
+        item['id'] = batch_ids[0]
+        item['ticketID'] = self.ticket_id
+        return {'items': [item], 'pageDetails': fixtures.API_PAGE_DETAILS}
+
+    def test_batches_fetched_concurrently(self):
+        synchronizer = sync.TicketNoteSynchronizer()
+        synchronizer.condition_pool.clear()
+        synchronizer.condition_pool.update(range(1, 10))
+
+        with patch.object(api.TicketNotesAPIClient, 'get',
+                          lambda client, next_url: self._get(client,
+                                                             next_url)):
+            results = synchronizer.get(SyncResults())
+
+        self.assertEqual(
+            sorted(self.batches), [[1, 2], [3, 4], [5, 6], [7, 8], [9]])
+        self.assertEqual(results.created_count, 5)
+        self.assertEqual(results.synced_ids, {1, 3, 5, 7, 9})
+        # Batches don't replace the condition on the synchronizer's client
+        condition = [c for c in synchronizer.client.conditions
+                     if c.field == 'ticketID'][0]
+        self.assertIs(condition.value, synchronizer.condition_pool)
+
+    def _fetch_in_order(self, order):
+        # Fetch a page per note ID, persisting them in the given order.
+        models.TicketNote.objects.all().delete()
+        synchronizer = sync.TicketNoteSynchronizer()
+        persisted = []
+        ready = threading.Condition()
+        persist_page = synchronizer.persist_page
+
+        def persist(page, results):
+            persist_page(page, results)
+            with ready:
+                persisted.append(page[0]['id'])
+                ready.notify_all()
+
+        def page_getter(note_id):
+            def get_page(next_url):
+                with ready:
+                    ready.wait_for(
+                        lambda: len(persisted) >= order.index(note_id),
+                        timeout=5)
+                item = deepcopy(fixtures.API_TICKET_NOTE_ITEMS[0])
+                item['id'] = note_id
+                item['ticketID'] = self.ticket_id
+                item['title'] = 'Note {}'.format(note_id)
+                return {'items': [item],
+                        'pageDetails': fixtures.API_PAGE_DETAILS}
+            return get_page
+
+        synchronizer.persist_page = persist
+        results = synchronizer.fetch_concurrently(
+            SyncResults(), [page_getter(i) for i in sorted(order)],
+            workers=len(order))
+
+        self.assertEqual(persisted, order)
+        return (
+            results.created_count, set(results.synced_ids),
+            list(models.TicketNote.objects.order_by('id').values_list(
+                'id', 'title', 'ticket_id')),
+        )
+
+    def test_persist_order_doesnt_matter(self):
+        # Pages are persisted as they arrive, not in batch order.
+        self.assertEqual(self._fetch_in_order([1, 2, 3, 4, 5]),
+                         self._fetch_in_order([5, 3, 1, 4, 2]))
+
+    def test_batch_error(self):
+        synchronizer = sync.TicketNoteSynchronizer()
+        synchronizer.condition_pool.clear()
+        synchronizer.condition_pool.update(range(1, 10))
+
+        def get(client, next_url):
+            raise api.AutotaskAPIError('API error')
+
+        with patch.object(api.TicketNotesAPIClient, 'get', get):
+            with self.assertRaises(api.AutotaskAPIError):
+                synchronizer.get(SyncResults())
+
+    def test_multi_condition_batches(self):
+        fixture_utils.init_projects()
+        fixture_utils.init_tasks()
+        synchronizer = sync.TimeEntrySynchronizer()
+        synchronizer.multi_conditions['ticketID'].value = \
+            CompactIDSet([1, 2, 3])
+        synchronizer.multi_conditions['taskID'].value = CompactIDSet([4])
+        batches = []
+
+        def get(client, next_url):
+            with self.lock:
+                batches.append([(c.field, c.value) for c in client.conditions
+                                if c.op == 'in'])
+            return fixtures.API_EMPTY
+
+        with patch.object(api.TimeEntriesAPIClient, 'get', get):
+            synchronizer.get(SyncResults())
+
+        self.assertEqual(sorted(batches), [
+            [('taskID', [4])],
+            [('ticketID', [1, 2])],
+            [('ticketID', [3])],
+        ])
+
+
+class TestPartitionedFetch(SyncSettingsTestMixin, TestCase):
+    sync_settings = {'partition_workers': 3, 'partition_min_records': 10}
+    page_size = 7
+
+    def setUp(self):
+        mocks.init_api_rest_connection()
+        fixture_utils.init_accounts()
+        super().setUp()
+        # Unevenly spread IDs, like a real tenant's.
+        self.record_ids = list(range(1, 40)) + list(range(5000, 5020, 2)) + \
+            list(range(90000, 90011))
+        self.queried_ranges = []
+        self.lock = threading.Lock()
+
+    def _matching_ids(self, conditions):
+        ids = self.record_ids
+        for c in conditions:
+            if c.field == 'id' and c.op == 'gte':
+                ids = [i for i in ids if i >= c.value]
+            elif c.field == 'id' and c.op == 'lt':
+                ids = [i for i in ids if i < c.value]
+        return ids
+
+    def _count(self, client, *args, **kwargs):
+        return {'queryCount': len(self._matching_ids(client.conditions))}
+
+    def _get(self, client, next_url):
+        ids = self._matching_ids(client.conditions)
+        offset = int(next_url) if next_url else 0
+        if not offset:
+            with self.lock:
+                self.queried_ranges.append(ids)
+
+        items = []
+        for record_id in ids[offset:offset + self.page_size]:
+            item = deepcopy(fixtures.API_CONTACT['items'][0])
+            item['id'] = record_id
+            items.append(item)
+        page_details = deepcopy(fixtures.API_PAGE_DETAILS)
+        if offset + self.page_size < len(ids):
+            page_details['nextPageUrl'] = str(offset + self.page_size)
+        return {'items': items, 'pageDetails': page_details}
+
+    def _patch_client(self):
+        get_patch = patch.object(
+            api.ContactsAPIClient, 'get',
+            lambda client, next_url: self._get(client, next_url))
+        count_patch = patch.object(
+            api.ContactsAPIClient, 'count',
+            lambda client, *args, **kwargs: self._count(client))
+        get_patch.start()
+        count_patch.start()
+        self.addCleanup(get_patch.stop)
+        self.addCleanup(count_patch.stop)
+
+    def test_partition_conditions(self):
+        self._patch_client()
+        synchronizer = sync.ContactSynchronizer()
+        partitions = synchronizer.partition_conditions(3)
+
+        self.assertEqual(len(partitions), 3)
+        partition_ids = [self._matching_ids(p) for p in partitions]
+        self.assertEqual(sum(partition_ids, []), self.record_ids)
+        for ids in partition_ids:
+            self.assertAlmostEqual(len(ids), len(self.record_ids) / 3,
+                                   delta=len(self.record_ids) / 10)
+        # The original conditions are kept in every partition
+        for p in partitions:
+            self.assertIn('isActive', [c.field for c in p])
+
+    def test_sync_partitions(self):
+        self._patch_client()
+        created_count, _, _, _ = sync.ContactSynchronizer().sync()
+
+        self.assertEqual(created_count, len(self.record_ids))
+        self.assertEqual(
+            sorted(models.Contact.objects.values_list('id', flat=True)),
+            self.record_ids
+        )
+        self.assertEqual(len(self.queried_ranges), 3)
+
+    def test_small_sync_not_partitioned(self):
+        self.record_ids = self.record_ids[:5]
+        self._patch_client()
+        created_count, _, _, _ = sync.ContactSynchronizer().sync()
+
+        self.assertEqual(created_count, 5)
+        self.assertEqual(len(self.queried_ranges), 1)
+
+
+class TestShardedSync(TestPartitionedFetch):
+
+    def setUp(self):
+        super().setUp()
+        self.spawned = []
+
+    def _spawn(self, run_key, workers):
+        # Run the worker in this process, instead of in workers processes.
+        self.spawned.append(workers)
+        sync.run_shard_worker(run_key)
+
+    def test_sharded_full_sync(self):
+        self._patch_client()
+        models.Contact.objects.create(
+            id=70000, first_name='Stale', account_id=174)
+
+        counts = sync.ContactSynchronizer(full=True).sync(
+            workers=3, spawn=self._spawn)
+
+        self.assertEqual(counts, (len(self.record_ids), 0, 0, 1))
+        self.assertEqual(self.spawned, [3])
+        self.assertEqual(len(self.queried_ranges), 3)
+        self.assertEqual(
+            sorted(models.Contact.objects.values_list('id', flat=True)),
+            self.record_ids
+        )
+        # The shards' counts are merged into the one sync job
+        sync_job = models.SyncJob.objects.get(entity_name='Contact')
+        self.assertEqual(sync_job.added, len(self.record_ids))
+        self.assertEqual(sync_job.deleted, 1)
+        self.assertFalse(models.SyncShard.objects.exists())
+        self.assertFalse(models.SyncStagingID.objects.exists())
+
+    def test_failed_shard(self):
+        self._patch_client()
+        models.Contact.objects.create(
+            id=70000, first_name='Stale', account_id=174)
+        _, patch = mocks.create_mock_call(
+            'djautotask.sync.Synchronizer.persist_page', None,
+            side_effect=ValueError('DB error')
+        )
+        self.addCleanup(patch.stop)
+
+        with self.assertRaisesRegex(sync.ShardSyncError, 'DB error'):
+            sync.ContactSynchronizer(full=True).sync(
+                workers=3, spawn=self._spawn)
+
+        self.assertTrue(models.Contact.objects.filter(id=70000).exists())
+        sync_job = models.SyncJob.objects.get(entity_name='Contact')
+        self.assertFalse(sync_job.success)
+        self.assertFalse(models.SyncShard.objects.exists())
+
+    def test_unclaimed_shards(self):
+        self._patch_client()
+
+        def spawn(run_key, workers):
+            # The workers died before claiming a shard.
+            self.spawned.append(workers)
+
+        with self.assertRaisesRegex(sync.ShardSyncError,
+                                    'shard 0 was never claimed'):
+            sync.ContactSynchronizer(full=True).sync(workers=3, spawn=spawn)
+        self.assertFalse(models.SyncShard.objects.exists())
+
+    def test_small_sync_not_sharded(self):
+        self.record_ids = self.record_ids[:5]
+        self._patch_client()
+
+        created_count, _, _, _ = sync.ContactSynchronizer().sync(
+            workers=3, spawn=self._spawn)
+
+        self.assertEqual(created_count, 5)
+        self.assertEqual(self.spawned, [])
+
+    def test_claim_shard(self):
+        for index in range(2):
+            models.SyncShard.objects.create(
+                run_key='run', index=index, synchronizer='Synchronizer')
+
+        claimed = [sync.claim_shard('run') for _ in range(3)]
+
+        self.assertEqual([s.index for s in claimed[:2]], [0, 1])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(
+            set(models.SyncShard.objects.values_list('status', flat=True)),
+            {models.SyncShard.RUNNING}
+        )
+
+    def test_batch_shard_specs(self):
+        synchronizer = sync.TicketNoteSynchronizer()
+        synchronizer.batch_query_size = 2
+        synchronizer.condition_pool.clear()
+        synchronizer.condition_pool.update(range(1, 10))
+
+        self.assertEqual(synchronizer.shard_specs(2), [
+            {'ids': [1, 2, 3, 4, 5, 6]}, {'ids': [7, 8, 9]}])
+
+        synchronizer = sync.TimeEntrySynchronizer()
+        synchronizer.batch_query_size = 2
+        synchronizer.multi_conditions = {
+            field: api.ApiCondition(
+                op='in', field=field, value=CompactIDSet(ids))
+            for field, ids in (('ticketID', [1, 2, 3]), ('taskID', [4]))
+        }
+
+        self.assertEqual(synchronizer.shard_specs(2), [
+            {'fields': {'ticketID': [1, 2, 3]}},
+            {'fields': {'taskID': [4]}},
+        ])
+
+
+class RecordingDict(dict):
+    """A dict that remembers which keys were read from it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_keys = set()
+
+    def __getitem__(self, key):
+        self.read_keys.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.read_keys.add(key)
+        return super().get(key, default)
+
+
+class IncludeFieldsTestMixin(SyncSettingsTestMixin):
+    sync_settings = {'include_fields': True}
+
+
+class TestIncludeFieldsTicketSynchronizer(IncludeFieldsTestMixin,
+                                          TestTicketSynchronizer):
+    pass
+
+
+class TestIncludeFields(IncludeFieldsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+
+    def assert_fields_included(self, sync_class, record):
+        synchronizer = sync_class()
+        json_data = RecordingDict(deepcopy(record))
+        synchronizer._assign_field_data(
+            synchronizer.model_class(), json_data)
+
+        include_fields = synchronizer.get_include_fields()
+        self.assertEqual(synchronizer.client.include_fields, include_fields)
+        self.assertEqual(
+            json_data.read_keys - set(include_fields), set())
+
+    def test_ticket_fields(self):
+        self.assert_fields_included(
+            sync.TicketSynchronizer, fixtures.API_TICKET['items'][0])
+
+    def test_task_fields(self):
+        self.assert_fields_included(
+            sync.TaskSynchronizer, fixtures.API_TASK['items'][0])
+
+    def test_project_fields(self):
+        self.assert_fields_included(
+            sync.ProjectSynchronizer, fixtures.API_PROJECT['items'][0])
+
+    def test_time_entry_fields(self):
+        self.assert_fields_included(
+            sync.TimeEntrySynchronizer, fixtures.API_TIME_ENTRY_TICKET_ITEM)
+
+    def test_note_fields(self):
+        self.assert_fields_included(
+            sync.TicketNoteSynchronizer, fixtures.API_TICKET_NOTE['items'][0])
+        self.assert_fields_included(
+            sync.TaskNoteSynchronizer, fixtures.API_TASK_NOTE['items'][0])
+
+    def test_include_fields_sent_with_query(self):
+        synchronizer = sync.TicketSynchronizer()
+        endpoint, _ = synchronizer.client.conditions.build_query(
+            include_fields=synchronizer.client.include_fields)
+
+        self.assertIn('"IncludeFields": [', endpoint)
+        self.assertIn('"userDefinedFields"', endpoint)
+        self.assertIn('"queueID"', endpoint)
+
+    def test_undeclared_fields_not_projected(self):
+        self.assertIsNone(sync.ContactSynchronizer().client.include_fields)
+
+
+class TestIncludeFieldsSetting(TestCase):
+
+    def test_off_by_default(self):
+        # Subclasses may read fields that aren't declared, so projecting
+        # queries is opt-in.
+        mocks.init_api_rest_connection()
+        self.assertIsNone(sync.TicketSynchronizer().client.include_fields)
+
+
+class TestParseApiDatetime(TestCase):
+
+    def test_matches_dateutil(self):
+        for value in ('2019-06-22T02:00:00Z', '2019-06-22T02:00:00.12Z',
+                      '2019-06-22T02:00:00.123Z',
+                      '2019-06-22T02:00:00.1234567Z',
+                      '2019-06-22T02:00:00', '2019-06-22T02:00:00-05:00',
+                      '2019-06-22T02:00:00.5+05:30'):
+            parsed = parse_api_datetime(value)
+            self.assertEqual(parsed, parse(value))
+            self.assertEqual(parsed.utcoffset(), parse(value).utcoffset())
+
+    def test_falls_back_to_dateutil(self):
+        self.assertEqual(parse_api_datetime('June 22 2019 2:00 AM'),
+                         parse('June 22 2019 2:00 AM'))
+
+    def test_invalid_value(self):
+        with self.assertRaises(ValueError):
+            parse_api_datetime('2019-02-30T02:00:00Z')
+
+    def test_cached(self):
+        value = '2020-01-27T00:00:00'
+        self.assertIs(parse_api_datetime_cached(value),
+                      parse_api_datetime_cached(value))
+
+
+class TestFieldMapper(TestCase):
+
+    def assign(self, field, record):
+        instance = models.Ticket()
+        mapping.FieldMapper([field]).assign(instance, record)
+        return getattr(instance, field.target)
+
+    def test_missing_and_required(self):
+        self.assertIsNone(self.assign(F('title', 'title'), {}))
+        with self.assertRaises(KeyError):
+            self.assign(F('title', 'title', required=True), {})
+
+    def test_null_characters_stripped(self):
+        self.assertEqual(
+            self.assign(F('title', 'title'), {'title': 'a\x00b'}), 'ab')
+
+    def test_empty_values_not_converted(self):
+        field = F('estimated_hours', 'estimatedHours', mapping.decimal(2))
+        self.assertEqual(
+            self.assign(field, {'estimatedHours': 1.2345}), Decimal('1.23'))
+        self.assertIsNone(self.assign(field, {'estimatedHours': None}))
+        self.assertEqual(
+            self.assign(F('create_date', 'createDate',
+                          mapping.api_datetime()), {'createDate': ''}), '')
+
+    def test_decoded_decimals(self):
+        field = F('estimated_hours', 'estimatedHours', mapping.decimal(2))
+        self.assertEqual(
+            self.assign(field, {'estimatedHours': Decimal('1.2345')}),
+            Decimal('1.23'))
+
+    def test_convert_empty(self):
+        self.assertIs(
+            self.assign(F('service_level_agreement_has_been_met', 'met',
+                          mapping.boolean), {}), False)
+        self.assertEqual(
+            self.assign(F('title', 'publish', mapping.text), {}), 'None')
+
+    def test_default(self):
+        field = F('estimated_hours', 'estimatedHours', mapping.decimal(2),
+                  default=0)
+        self.assertEqual(self.assign(field, {}), 0)
+
+    def test_date(self):
+        field = F('title', 'startDateTime', mapping.api_date())
+        self.assertEqual(
+            self.assign(field, {'startDateTime': '2019-06-22T02:00:00Z'}),
+            parse('2019-06-22').date())
+
+    def test_compiled_once_per_class(self):
+        self.assertIs(sync.TicketSynchronizer.get_field_mapper(),
+                      sync.TicketSynchronizer.get_field_mapper())
+        self.assertIsNot(sync.TicketNoteSynchronizer.get_field_mapper(),
+                         sync.TicketSynchronizer.get_field_mapper())
+
+    def test_include_fields_from_field_map(self):
+        self.assertEqual(
+            sync.NoteSynchronizer.include_fields,
+            ('id', 'title', 'description', 'createDateTime',
+             'lastActivityDate', 'publish')
+        )
+
+
+class TestCompactIDSet(TestCase):
+
+    def test_add_and_membership(self):
+        ids = CompactIDSet()
+        ids.buffer_size = 3
+        for record_id in [5, 1, 9, 1, 3, None, 7, 5, 2]:
+            ids.add(record_id)
+
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(list(ids), [1, 2, 3, 5, 7, 9])
+        self.assertIn(7, ids)
+        self.assertNotIn(4, ids)
+        self.assertNotIn(None, ids)
+        self.assertEqual(ids, {1, 2, 3, 5, 7, 9})
+
+    def test_difference(self):
+        ids = CompactIDSet(range(10))
+        self.assertEqual(ids - {2, 3, 11}, {0, 1, 4, 5, 6, 7, 8, 9})
+        self.assertEqual(
+            ids - CompactIDSet([0, 3, 4, 12]), {1, 2, 5, 6, 7, 8, 9})
+        self.assertEqual({3, 11} - ids, {11})
+
+    def test_chunks(self):
+        ids = CompactIDSet([9, 3, 1, 7, 5])
+        self.assertEqual(list(ids.chunks(2)), [[1, 3], [5, 7], [9]])
+        self.assertEqual(list(CompactIDSet().chunks(2)), [])
+
+
+class TestSyncWatermark(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        fixture_utils.init_accounts()
+
+    def _sync(self, dates, full=False):
+        items = []
+        for i, date in enumerate(dates):
+            item = deepcopy(fixtures.API_CONTACT['items'][0])
+            item['id'] = item['id'] + i
+            item['lastActivityDate'] = date
+            items.append(item)
+        mocks.service_api_get_contacts_call(
+            {'items': items, 'pageDetails': fixtures.API_PAGE_DETAILS})
+        synchronizer = sync.ContactSynchronizer(full=full)
+        synchronizer.sync()
+        return synchronizer
+
+    def _cutoff(self, synchronizer):
+        return [c.value for c in synchronizer.client.conditions
+                if c.field == 'lastActivityDate' and c.op == 'gt']
+
+    def _watermark(self):
+        return models.SyncWatermark.objects.get(
+            synchronizer='ContactSynchronizer',
+            scope=sync.ContactSynchronizer().watermark_scope(),
+        ).watermark
+
+    def test_watermark_from_data(self):
+        self._sync(['2020-01-01T10:00:00.000Z', '2020-01-02T10:00:00.5Z'])
+
+        self.assertEqual(
+            self._watermark(), parse('2020-01-02T09:55:00.5Z'))
+
+    def test_partial_sync_reads_watermark(self):
+        self._sync(['2020-01-02T10:00:00.000Z'], full=True)
+        synchronizer = self._sync(['2020-01-02T09:58:00.000Z'])
+
+        self.assertEqual(
+            self._cutoff(synchronizer), ['2020-01-02T09:55:00.000000Z'])
+        # A partial sync doesn't move the watermark back
+        self.assertEqual(self._watermark(), parse('2020-01-02T09:55:00Z'))
+
+    def test_full_sync_ignores_watermark(self):
+        self._sync(['2020-01-02T10:00:00.000Z'])
+        synchronizer = self._sync(['2020-01-01T10:00:00.000Z'], full=True)
+
+        self.assertEqual(self._cutoff(synchronizer), [])
+        self.assertEqual(self._watermark(), parse('2020-01-01T09:55:00Z'))
+
+    def test_watermark_not_after_sync_start(self):
+        self._sync(['2999-01-01T00:00:00.000Z'])
+        self.assertLess(self._watermark(), timezone.now())
+
+    def test_sync_job_fallback(self):
+        for _ in range(2):
+            models.SyncJob.objects.create(
+                entity_name='Contact', start_time=timezone.now(),
+                success=True)
+        last_job = models.SyncJob.objects.last()
+
+        synchronizer = self._sync([])
+
+        self.assertEqual(self._cutoff(synchronizer), [
+            last_job.start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')])
+        self.assertFalse(models.SyncWatermark.objects.filter(
+            synchronizer='ContactSynchronizer').exists())
+
+    def test_new_scope_synced_in_full(self):
+        models.SyncWatermark.objects.create(
+            synchronizer='ContactSynchronizer', scope='other',
+            watermark=parse('2020-01-02T10:00:00Z'))
+        for _ in range(2):
+            models.SyncJob.objects.create(
+                entity_name='Contact', start_time=timezone.now(),
+                success=True)
+
+        synchronizer = self._sync(['2020-01-02T10:00:00.000Z'])
+
+        self.assertEqual(self._cutoff(synchronizer), [])
+        self.assertEqual(self._watermark(), parse('2020-01-02T09:55:00Z'))
+
+    def test_scope_of_filter_conditions(self):
+        synchronizer = sync.ContactSynchronizer()
+        scope = synchronizer.watermark_scope()
+        self.assertEqual(len(scope), 32)
+
+        synchronizer.client.add_condition(
+            api.ApiCondition(op='eq', field='companyID', value=174))
+        self.assertNotEqual(synchronizer.watermark_scope(), scope)
+        synchronizer.client.clear_conditions()
+        self.assertEqual(synchronizer.watermark_scope(), '')
+
+        # Batch query ID pools don't change the scope
+        note_synchronizer = sync.TicketNoteSynchronizer()
+        note_scope = note_synchronizer.watermark_scope()
+        note_synchronizer.condition_pool.add(12345)
+        self.assertEqual(note_synchronizer.watermark_scope(), note_scope)
+
+    def test_scope_ignores_completed_date(self):
+        scope = sync.TicketSynchronizer().watermark_scope()
+        later = timezone.now() + timezone.timedelta(minutes=10)
+        with patch('djautotask.sync.timezone.now', return_value=later):
+            synchronizer = sync.TicketSynchronizer()
+
+        self.assertEqual(synchronizer.watermark_scope(), scope)
+        # The other conditions still count
+        synchronizer.client.add_condition(
+            api.ApiCondition(op='eq', field='queueID', value=8))
+        self.assertNotEqual(synchronizer.watermark_scope(), scope)
+
+
+class CheckpointTestMixin(SyncSettingsTestMixin):
+    sync_settings = {'sync_checkpoints': True}
+
+
+class TestCheckpointContactSynchronizer(CheckpointTestMixin,
+                                        TestContactSynchronizer):
+    pass
+
+
+class TestSyncCheckpoint(CheckpointTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mocks.init_api_rest_connection()
+        fixture_utils.init_accounts()
+        # A contact that's no longer in Autotask
+        self.stale_id = 1
+        models.Contact.objects.create(
+            id=self.stale_id, first_name='Stale', account_id=174)
+
+    def _pages(self, count):
+        pages = []
+        for i in range(count):
+            item = deepcopy(fixtures.API_CONTACT['items'][0])
+            item['id'] = item['id'] + i
+            page_details = deepcopy(fixtures.API_PAGE_DETAILS)
+            if i < count - 1:
+                page_details['nextPageUrl'] = 'next-page-{}'.format(i + 1)
+            pages.append({'items': [item], 'pageDetails': page_details})
+        return pages
+
+    def _sync(self, side_effect, **kwargs):
+        get_mock, patch = mocks.create_mock_call(
+            'djautotask.api.ContactsAPIClient.get', None,
+            side_effect=side_effect
+        )
+        self.addCleanup(patch.stop)
+        sync.ContactSynchronizer(full=True, **kwargs).sync()
+        return [c.args[0] for c in get_mock.call_args_list]
+
+    def _fail_at_page(self, index):
+        pages = self._pages(4)
+        pages[index] = api.AutotaskAPIError('API error')
+        with self.assertRaises(api.AutotaskAPIError):
+            self._sync(pages)
+        return self._pages(4)
+
+    def test_resume_from_checkpoint(self):
+        pages = self._fail_at_page(2)
+
+        checkpoint = models.SyncCheckpoint.objects.get()
+        self.assertEqual(checkpoint.cursor, {'next_url': 'next-page-2'})
+        # Nothing is pruned until the sync completes
+        self.assertTrue(
+            models.Contact.objects.filter(id=self.stale_id).exists())
+
+        urls = self._sync(pages[2:], resume=True)
+
+        self.assertEqual(urls, ['next-page-2', 'next-page-3'])
+        # The contacts synced before the failure aren't pruned
+        self.assertEqual(models.Contact.objects.count(), 4)
+        self.assertFalse(
+            models.Contact.objects.filter(id=self.stale_id).exists())
+        self.assertFalse(models.SyncCheckpoint.objects.exists())
+        self.assertFalse(models.SyncStagingID.objects.exists())
+
+    def test_expired_checkpoint(self):
+        pages = self._fail_at_page(2)
+        models.SyncCheckpoint.objects.update(
+            updated=timezone.now() - timezone.timedelta(hours=25))
+
+        urls = self._sync(pages, resume=True)
+
+        self.assertEqual(urls, [None, 'next-page-1', 'next-page-2',
+                                'next-page-3'])
+        self.assertFalse(models.SyncCheckpoint.objects.exists())
+        self.assertFalse(models.SyncStagingID.objects.exists())
+
+    def test_expired_checkpoints_of_other_scopes(self):
+        for scope, hours in (('old', 25), ('recent', 1)):
+            staged_ids = sync.StagedIDSet()
+            staged_ids.stage_initial(models.Contact.objects.all())
+            models.SyncCheckpoint.objects.create(
+                synchronizer='ContactSynchronizer', scope=scope,
+                sync_key=staged_ids.sync_key, started=timezone.now())
+            models.SyncCheckpoint.objects.filter(scope=scope).update(
+                updated=timezone.now() - timezone.timedelta(hours=hours))
+
+        self._sync(self._pages(1))
+
+        checkpoint = models.SyncCheckpoint.objects.get()
+        self.assertEqual(checkpoint.scope, 'recent')
+        self.assertEqual(
+            set(models.SyncStagingID.objects.values_list(
+                'sync_key', flat=True)),
+            {checkpoint.sync_key})
+
+    def test_checkpoint_discarded_without_resume(self):
+        pages = self._fail_at_page(1)
+
+        urls = self._sync(pages)
+
+        self.assertEqual(urls[0], None)
+        self.assertFalse(models.SyncCheckpoint.objects.exists())
+        self.assertFalse(models.SyncStagingID.objects.exists())
+
+    def test_batch_cursor(self):
+        fixture_utils.init_resources()
+        fixture_utils.init_tickets()
+        fixture_utils.init_note_types()
+        synchronizer = sync.TicketNoteSynchronizer(full=True)
+        synchronizer.batch_query_size = 2
+        synchronizer.condition_pool.clear()
+        synchronizer.condition_pool.update(range(1, 10))
+        synchronizer.resume_cursor = {'after_id': 4}
+        synchronizer.checkpoint = models.SyncCheckpoint.objects.create(
+            synchronizer='TicketNoteSynchronizer', sync_key='key',
+            started=timezone.now())
+        results = SyncResults()
+        results.synced_ids = sync.StagedIDSet('key')
+        batches = []
+        cursors = []
+
+        def get(client, next_url):
+            batches.append(list([
+                c.value for c in client.conditions
+                if c.field == 'ticketID'][0]))
+            cursors.append(synchronizer.checkpoint.cursor)
+            return fixtures.API_EMPTY
+
+        with patch.object(api.TicketNotesAPIClient, 'get', get):
+            synchronizer.get(results)
+
+        self.assertEqual(batches, [[5, 6], [7, 8], [9]])
+        # The cursor moves past each batch once it's fetched
+        self.assertEqual(cursors, [{}, {'after_id': 6}, {'after_id': 8}])
+        self.assertEqual(synchronizer.checkpoint.cursor, {'after_id': 9})
+
+    def test_multi_condition_cursor(self):
+        synchronizer = sync.TimeEntrySynchronizer(full=True)
+        synchronizer.batch_query_size = 2
+        synchronizer.multi_conditions = {
+            field: api.ApiCondition(
+                op='in', field=field, value=CompactIDSet(ids))
+            for field, ids in (('ticketID', [1, 2, 3]), ('taskID', [4, 5]))
+        }
+        synchronizer.resume_cursor = {'field': 'taskID', 'after_id': 4}
+        synchronizer.checkpoint = models.SyncCheckpoint.objects.create(
+            synchronizer='TimeEntrySynchronizer', sync_key='key',
+            started=timezone.now())
+        results = SyncResults()
+        results.synced_ids = sync.StagedIDSet('key')
+        batches = []
+
+        def get(client, next_url):
+            batches.append([(c.field, list(c.value))
+                            for c in client.conditions if c.op == 'in'])
+            return fixtures.API_EMPTY
+
+        with patch.object(api.TimeEntriesAPIClient, 'get', get):
+            synchronizer.get(results)
+
+        # The ticket batches were all fetched before the sync stopped
+        self.assertEqual(batches, [[('taskID', [5])]])
+        self.assertEqual(synchronizer.checkpoint.cursor,
+                         {'field': 'taskID', 'after_id': 5})
@@ -1,11 +1,23 @@
+import threading
+
 from django.urls import reverse
 from django.test import Client, TestCase
 
 from djautotask.models import Ticket
 from djautotask.tests import fixtures, mocks, fixture_utils
+from djautotask.views import CallbackQueue
 
 
 class TestCallBackView(TestCase):
+    def setUp(self):
+        # No workers, so callbacks are refreshed in this thread on flush().
+        self.queue = CallbackQueue(workers=0)
+        _, self.queue_patch = mocks.create_mock_call(
+            'djautotask.views.get_callback_queue', self.queue)
+
+    def tearDown(self):
+        self.queue_patch.stop()
+
     def post_data(self):
         client = Client()
         body = b'id=7865&number=T20191029.0002&status=New&created_datetime=' \
@@ -23,6 +35,8 @@ class TestCallBackView(TestCase):
 
     def _test_synced(self, entity):
         response = self.post_data()
+        self.assertEqual(self.queue.depth(), 1)
+        self.queue.flush()
 
         instances = list(Ticket.objects.all())
         instance = Ticket.objects.all()[0]
@@ -65,3 +79,97 @@ class TestCallBackView(TestCase):
         self._test_synced(fixtures.API_TICKET_BY_ID['item'])
         patch.stop()
         _checklist_patch.stop()
+
+    def test_callbacks_merged(self):
+        handle_mock, patch = mocks.create_mock_call(
+            'djautotask.views.CallBackView.handle', None)
+        for _ in range(3):
+            response = self.post_data()
+            self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.queue.depth(), 1)
+        self.queue.flush()
+        patch.stop()
+
+        self.assertEqual(handle_mock.call_count, 1)
+        stats = self.queue.stats()
+        self.assertEqual(stats['received'], 3)
+        self.assertEqual(stats['merged'], 2)
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(stats['depth'], 0)
+
+    def test_without_workers(self):
+        self.queue_patch.stop()
+        _, self.queue_patch = mocks.create_mock_call(
+            'djautotask.views.get_callback_queue', None)
+        fixture_utils.init_statuses()
+        _, patch = mocks.service_api_get_ticket_call(fixtures.API_TICKET_BY_ID)
+        _, _checklist_patch = mocks.create_mock_call(
+            "djautotask.sync.TicketChecklistItemsSynchronizer.sync_items",
+            None
+        )
+
+        self.post_data()
+        patch.stop()
+        _checklist_patch.stop()
+
+        # Refreshed in the request
+        self.assertEqual(Ticket.objects.count(), 1)
+
+
+class TestCallbackQueue(TestCase):
+
+    def test_debounce(self):
+        now = [100.0]
+        queue = CallbackQueue(workers=0, debounce=5, clock=lambda: now[0])
+        calls = []
+
+        queue.put('a', lambda: calls.append('a1'))
+        now[0] += 2
+        queue.put('a', lambda: calls.append('a2'))
+        queue.put('b', lambda: calls.append('b'))
+        now[0] += 1
+
+        self.assertEqual(queue.depth(), 2)
+        self.assertEqual(queue.lag(), 3)
+        queue.flush()
+        # The latest callable for a key is used
+        self.assertEqual(calls, ['a2', 'b'])
+        self.assertEqual(queue.depth(), 0)
+        self.assertEqual(queue.lag(), 0)
+        self.assertEqual(queue.stats()['last_lag'], 1)
+
+    def test_workers(self):
+        queue = CallbackQueue(workers=2, debounce=0.05)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def refresh():
+            calls.append('a')
+            started.set()
+            release.wait(5)
+
+        for _ in range(3):
+            queue.put('a', refresh)
+        self.assertTrue(started.wait(5))
+        # Queued again while running, so refreshed again afterwards
+        queue.put('a', refresh)
+        self.assertEqual(queue.stats()['running'], 1)
+        release.set()
+        queue.flush()
+
+        self.assertEqual(calls, ['a', 'a'])
+        stats = queue.stats()
+        self.assertEqual(stats['merged'], 2)
+        self.assertEqual(stats['processed'], 2)
+
+    def test_failures_counted(self):
+        queue = CallbackQueue(workers=0)
+
+        def refresh():
+            raise ValueError('Oops')
+
+        queue.put('a', refresh)
+        queue.flush()
+
+        self.assertEqual(queue.stats()['failed'], 1)
@@ -1,17 +1,188 @@
+import functools
+import heapq
+import itertools
 import json
 import logging
+import threading
+import time
 
 from braces import views
 from django import forms
+from django.db import connections
 from django.views.generic import View
 from django.http import HttpResponse, HttpResponseBadRequest
 
 from djautotask import sync, models
-from djautotask.api import AutotaskAPIError
+from djautotask.api import AutotaskAPIError, PRIORITY_INTERACTIVE, \
+    request_priority
+from djautotask.utils import DjautotaskSettings
 
 logger = logging.getLogger(__name__)
 
 
+class CallbackQueue:
+    """
+    Run callback refreshes on a pool of background threads.
+
+    A refresh is held for debounce seconds after it's first queued, and the
+    same key queued again in that time is merged into it, so a burst of
+    callbacks for one entity refreshes it once. A key queued while it's
+    being refreshed is refreshed again afterwards, since the running
+    refresh may have read the entity before it changed. With no workers,
+    refreshes wait for flush().
+    """
+
+    def __init__(self, workers=4, debounce=5.0, clock=time.monotonic):
+        self.workers = workers
+        self.debounce = debounce
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        # key: [queued, due, func], for keys not yet refreshed.
+        self._pending = {}
+        # (due, seq, key) for pending keys that aren't running.
+        self._heap = []
+        self._running = set()
+        self._threads = []
+        self.received = 0
+        self.merged = 0
+        self.processed = 0
+        self.failed = 0
+        self.last_lag = None
+
+    def put(self, key, func):
+        """Queue func to refresh key, unless key is already queued."""
+        with self._cond:
+            self.received += 1
+            if key in self._pending:
+                self.merged += 1
+                self._pending[key][2] = func
+                return
+            now = self.clock()
+            due = now + self.debounce
+            self._pending[key] = [now, due, func]
+            if key not in self._running:
+                heapq.heappush(self._heap, (due, next(self._seq), key))
+            self._start_workers()
+            self._cond.notify()
+
+    def depth(self):
+        """Return the number of keys waiting to be refreshed."""
+        with self._cond:
+            return len(self._pending)
+
+    def lag(self):
+        """Return how long the oldest waiting key has been queued."""
+        with self._cond:
+            if not self._pending:
+                return 0.0
+            oldest = min(queued for queued, _, _ in self._pending.values())
+            return self.clock() - oldest
+
+    def stats(self):
+        with self._cond:
+            counts = {
+                'depth': len(self._pending),
+                'running': len(self._running),
+                'received': self.received,
+                'merged': self.merged,
+                'processed': self.processed,
+                'failed': self.failed,
+                'last_lag': self.last_lag,
+            }
+        counts['lag'] = self.lag()
+        return counts
+
+    def flush(self):
+        """
+        Refresh every waiting key now, in this thread, and return once
+        nothing is queued or running.
+        """
+        while True:
+            with self._cond:
+                if self._heap:
+                    item = self._take()
+                elif self._running:
+                    self._cond.wait()
+                    continue
+                else:
+                    return
+            self._run(*item)
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, daemon=True,
+                name='djautotask-callback-{}'.format(len(self._threads)))
+            self._threads.append(thread)
+            thread.start()
+
+    def _take(self):
+        due, seq, key = heapq.heappop(self._heap)
+        queued, due, func = self._pending.pop(key)
+        self._running.add(key)
+        return key, queued, func
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = self.clock()
+                    if self._heap and self._heap[0][0] <= now:
+                        item = self._take()
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._cond.wait(timeout)
+            self._run(*item)
+            # Django only closes connections at the end of a request, not
+            # in threads of our own.
+            connections.close_all()
+
+    def _run(self, key, queued, func):
+        lag = self.clock() - queued
+        failed = False
+        try:
+            func()
+        except Exception:
+            failed = True
+            logger.exception('Callback refresh of {} failed.'.format(key))
+        finally:
+            with self._cond:
+                self._running.discard(key)
+                self.processed += 1
+                self.failed += failed
+                self.last_lag = lag
+                if key in self._pending:
+                    due = self._pending[key][1]
+                    heapq.heappush(self._heap, (due, next(self._seq), key))
+                self._cond.notify_all()
+        logger.debug('Refreshed {} {:.1f}s after its callback.'.format(
+            key, lag))
+
+
+_callback_queue = None
+_callback_queue_lock = threading.Lock()
+
+
+def get_callback_queue():
+    """
+    Return the process's callback queue, or None if the callback_workers
+    setting is 0, in which case callbacks are handled in the request.
+    """
+    global _callback_queue
+    with _callback_queue_lock:
+        if _callback_queue is None:
+            settings = DjautotaskSettings().get_settings()
+            workers = settings.get('callback_workers', 4)
+            if not workers:
+                return None
+            _callback_queue = CallbackQueue(
+                workers=workers,
+                debounce=settings.get('callback_debounce_seconds', 5),
+            )
+        return _callback_queue
+
+
 class CallBackView(views.CsrfExemptMixin,
                    views.JsonRequestResponseMixin, View):
 
@@ -47,6 +218,19 @@ class CallBackView(views.CsrfExemptMixin,
         entity_id = form.cleaned_data['id']
         synchronizer = sync.TicketSynchronizer
 
+        # Autotask doesn't need to wait for the refresh, so queue it.
+        queue = get_callback_queue()
+        if queue is None:
+            self.refresh(entity_id, synchronizer)
+        else:
+            queue.put(
+                (synchronizer.__name__, entity_id),
+                functools.partial(self.refresh, entity_id, synchronizer)
+            )
+
+        return HttpResponse(status=204)
+
+    def refresh(self, entity_id, synchronizer):
         try:
             self.handle(entity_id, synchronizer)
         except AutotaskAPIError as e:
@@ -55,14 +239,13 @@ class CallBackView(views.CsrfExemptMixin,
                 '{}'.format(entity_id, e)
             )
 
-        return HttpResponse(status=204)
-
     def handle(self, entity_id, synchronizer):
         """
         Do the interesting stuff here, so that it can be overridden in
         a child class if needed.
         """
-        synchronizer().fetch_sync_by_id(entity_id)
+        with request_priority(PRIORITY_INTERACTIVE):
+            synchronizer().fetch_sync_by_id(entity_id)
 
 
 class CallBackForm(forms.Form):